@@ -1,573 +1,463 @@
 import streamlit as st
-import pickle
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-from streamlit_option_menu import option_menu
 
-# Load ML Models
-MODEL_DIR = 'models'
-def load_model(filename):
+from diagnosis import metrics
+from diagnosis.charts import render_baseline_chart
+from diagnosis.features import (ANGINA_MAP, CP_MAP, DATASETS, ECG_MAP, FEATURE_COLUMNS, SEX_MAP, SLOPE_MAP,
+                                input_columns)
+from diagnosis.inference import predict, stats as inference_stats
+from diagnosis.registry import get_registry
+from diagnosis.specs import SPECS
+
+# Stage timings are no-ops unless METRICS_ENABLED is set
+metrics.start_exporter()
+rerun_timer = metrics.timer("rerun")
+
+# ML models are shared across sessions and loaded on first use by their page
+registry = get_registry()
+def load_model(disease):
     try:
-        with open(os.path.join(MODEL_DIR, filename), 'rb') as f:
-            return pickle.load(f)
+        return registry.get(disease)
     except FileNotFoundError:
-        st.error(f"❌ Model '{filename}' not found in models folder.")
+        metrics.inc("errors", disease=disease, stage="load")
+        st.error(f"❌ Model '{os.path.basename(registry.path(disease))}' not found in models folder.")
         st.stop()
 
-diabetes_model = load_model('diabetes_model.pkl')
-hypertension_model = load_model('hypertension_model.pkl')
-heart_model = load_model('heart_model.pkl')
+# Apply custom dark theme CSS.  The shared styles (theme, Home cards, result
+# tips) live in static/style.css; with static serving on (.streamlit/config.toml)
+# a rerun only sends a <link> and the browser fetches the file once
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+
+@st.cache_resource
+def stylesheet_tag(static_serving):
+    if static_serving:
+        return f'<link rel="stylesheet" href="app/static/style.css?v={int(os.path.getmtime(STYLESHEET))}">'
+    with open(STYLESHEET, encoding="utf-8") as f:
+        return f"<style>{f.read()}</style>"
 
-# Apply custom dark theme CSS
 def add_bg():
-    st.markdown(
-        """
-        <style>
-        html, body, .stApp {
-            background-color: #1e1e1e;
-            color: #ffffff;
-        }
-        .main {
-            background-color: #2c2f33;
-            padding: 2rem;
-            border-radius: 10px;
-            box-shadow: 0 0 10px rgba(255,255,255,0.1);
-        }
-        label, .stTextInput>div>div>input, .stNumberInput>div>div>input, .stSelectbox>div>div>div {
-            color: white !important;
-            background-color: #2c2f33 !important;
-        }
-        .stButton>button {
-            background-color: #7289da;
-            color: white;
-            border-radius: 8px;
-            padding: 0.4rem 0.8rem;
-            font-weight: 600;
-        }
-        .stButton>button:hover {
-            background-color: #99aab5;
-        }
-        .stSidebar {
-            background-color: #23272a;
-        }
-        .stSelectbox label, .stNumberInput label, .stTextInput label {
-            color: #ffffff;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(stylesheet_tag(st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 add_bg()
 
 # Sidebar navigation
+# A native radio rather than a custom component: every custom component call
+# imports pyarrow (and with it numpy) before Home can render
+PAGES = {
+    "Home": ":material/home:",
+    "Screen All": ":material/checklist:",
+    **{spec.page: spec.icon for spec in SPECS.values()},
+    "Batch Screening": ":material/table_view:",
+    "History": ":material/history:",
+    "Drift Monitor": ":material/monitoring:",
+}
+DISEASE_PAGES = {spec.page: spec for spec in SPECS.values()}
 with st.sidebar:
-    selected = option_menu("🔬 Disease Predictor",
-        ["Home", "Diabetes", "Hypertension", "Heart Disease"],
-        icons=["house", "droplet", "thermometer-high", "heart-pulse"],
-        default_index=0)
-
-# Prediction result with chart
-def predict_result(model, features, label_pos, feature_labels, healthy_vals):
-    # Check for shape match
-    if hasattr(model, 'n_features_in_'):
-        if len(features) != model.n_features_in_:
-            st.error(f"🚫 Feature shape mismatch! Model expects {model.n_features_in_} features, but got {len(features)}.")
-            return
-
-    prediction = model.predict([features])[0]
-    if prediction == 1:
-        st.error(f"⚠️ {label_pos} likely. Please consult your doctor.")
-    else:
-        st.success("✅ No significant risk detected based on current inputs.")
-
-    fig, ax = plt.subplots(figsize=(10, 4))
-    index = np.arange(len(feature_labels))
-    ax.plot(index, healthy_vals, label='Healthy', color='lime', marker='o', linewidth=2)
-    ax.plot(index, features, label='You', color='red', linestyle='--', marker='x', linewidth=2)
-    ax.set_xticks(index)
-    ax.set_xticklabels(feature_labels, rotation=45, color='white')
-    ax.set_ylabel("Values", color='white')
-    ax.set_title("Comparison with Healthy Baseline", color='white')
-    ax.tick_params(colors='white')
-    ax.legend(facecolor="#2c2f33", edgecolor='white')
-    fig.patch.set_facecolor('#2c2f33')
-    ax.set_facecolor('#2c2f33')
-    st.pyplot(fig)
-
-# Home Page
-if selected == "Home":
-    st.markdown(
-        """
-        <style>
-        .home-container {
-            margin-top: 2rem;
-            display: flex;
-            justify-content: space-between;
-            gap: 32px;
-            flex-wrap: nowrap;
-        }
-        .disease-card {
-            flex: 1 1 auto;
-            width: 100%;
-            background-color: #2c2f33;
-            border: 1px solid #444;
-            border-radius: 16px;
-            padding: 1.8rem;
-            transition: 0.3s ease;
-        }
-        .disease-card:nth-child(1) {
-            min-height: 420px; /* Stretch Diabetes card */
-        }
-        .disease-card:hover {
-            background-color: #3a3f47;
-            transform: scale(1.02);
-            border-color: #7289da;
-        }
-        .disease-title {
-            display: flex;
-            align-items: center;
-            gap: 0.6rem;
-            color: #7289da;
-            font-size: 1.6rem;
-            font-weight: 700;
-            margin-bottom: 1rem;
-            white-space: nowrap;
-        }
-        .disease-text {
-            color: #ffffff;
-            font-size: 1rem;
-            line-height: 1.7;
-        }
-        .disease-text p {
-            margin: 0.4rem 0 0.8rem 0;
-        }
-        .disease-text strong {
-            font-family: 'Segoe UI Semibold', sans-serif;
-            color: #00bcd4;
-        }
-        @media screen and (max-width: 1200px) {
-            .home-container {
-                flex-wrap: wrap;
-            }
-            .disease-card {
-                flex: 1 1 100%;
-                max-width: 100%;
-            }
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
+    selected = st.radio("🔬 Disease Predictor", list(PAGES), format_func=lambda page: f"{PAGES[page]} {page}")
+
+    if registry.loaded():
+        with st.expander("⚙️ Model status"):
+            for disease, info in registry.stats().items():
+                st.caption(
+                    f"**{disease}** {info['format']} v{info['version']} · load {info['load_ms']:.1f} ms · "
+                    f"warm {info['warm_ms']:.1f} ms · +{info['rss_delta_bytes'] / 2**20:.1f} MB"
+                )
+            cache = inference_stats()
+            lookups = cache['hits'] + cache['misses']
+            st.caption(
+                f"**prediction cache** {cache['size']:,}/{cache['maxsize']:,} entries · "
+                f"{cache['hits'] / lookups if lookups else 0:.0%} hits · {cache['evictions']:,} evicted"
+            )
+
+# Disease pages are rendered from their specs in diagnosis/specs.py
+def field_input(field):
+    if field.options is not None:
+        return st.selectbox(field.label, field.options)
+    return st.number_input(field.label, field.min_value, field.max_value, field.default)
+
+def tips_box(spec):
+    tips = "".join(f"<li>{icon} <strong>{heading}:</strong> {text}</li>" for icon, heading, text in spec.tips)
+    consult = "".join(f"<li>{icon} <strong>{role}:</strong> {text}</li>" for icon, role, text in spec.consult)
+    return (
+        f'<div class="tips-box"><h4>{spec.tips_icon} General Wellness Tips</h4><ul>{tips}</ul>'
+        f'<div style="margin-top: 1.5rem;"><h4>👨‍⚕️ Who to Consult</h4><ul>{consult}</ul></div></div>'
     )
 
-    st.markdown("<h1 style='color:#7289da;'>🩺 Your Smart Health Predictor</h1>", unsafe_allow_html=True)
-    st.write("Stay one step ahead of illness with intelligent, personalized health predictions.")
+def disease_page(spec):
+    key = spec.key
+    st.header(spec.title)
+    model = load_model(key)
+    try:
+        spec.encode.check(model)
+    except ValueError as e:
+        st.error(f"🚫 {e}")
+        st.stop()
 
-    st.markdown("""
-    <div class="home-container">
-        <div class="disease-card">
-            <div class="disease-title">🩸 <span>Diabetes</span></div>
-            <div class="disease-text">
-                <p>A long-term condition that disrupts how your body regulates blood sugar and insulin.</p>
-                <p><strong>Causes:</strong> Insulin resistance, unhealthy diet, genetic factors</p>
-                <p><strong>Risks:</strong> Vision loss, nerve damage, kidney dysfunction</p>
-                <p><strong>Precautions:</strong> Balanced eating, regular exercise, blood sugar tracking</p>
-                <p><strong>Consultation:</strong> Endocrinologist</p>
-            </div>
-        </div>
-        <div class="disease-card">
-            <div class="disease-title">💢 <span>Hypertension</span></div>
-            <div class="disease-text">
-                <p>A silent condition where blood pressure stays high, placing strain on your cardiovascular system.</p>
-                <p><strong>Causes:</strong> High sodium diet, obesity, chronic stress</p>
-                <p><strong>Risks:</strong> Stroke, aneurysms, heart attack</p>
-                <p><strong>Precautions:</strong> Low-salt meals, stress relief, routine BP checks</p>
-                <p><strong>Consultation:</strong> Cardiologist / General Practitioner</p>
-            </div>
-        </div>
-        <div class="disease-card">
-            <div class="disease-title">❤️ <span>Heart&nbsp;Disease</span></div>
-            <div class="disease-text">
-                <p>A broad range of heart-related issues that interfere with normal cardiac function.</p>
-                <p><strong>Causes:</strong> Smoking, elevated cholesterol, sedentary habits</p>
-                <p><strong>Risks:</strong> Arrhythmia, cardiac arrest, congestive heart failure</p>
-                <p><strong>Precautions:</strong> Heart-healthy diet, regular movement, quit smoking</p>
-                <p><strong>Consultation:</strong> Cardiologist</p>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-
-# Diabetes Page
-elif selected == "Diabetes":
-    st.header("🧪 Diabetes Risk Prediction")
+    st.markdown("  \n".join(spec.requires))
+    st.markdown(spec.intro)
+
+    # A form keeps edits in the browser until Predict, so changing a field
+    # costs no rerun
+    with st.form(f"{key}_form"):
+        # Hidden fields keep their default
+        values = [field.default for field in spec.fields]
+        for side, column in enumerate(st.columns(2)):
+            with column:
+                for i, field in enumerate(spec.fields):
+                    if field.side == side:
+                        values[i] = field_input(field)
+        submitted = st.form_submit_button(f"Predict {spec.page}")
+
+    with metrics.timer("features", key):
+        # Encoded in place into one row per session and page
+        row = st.session_state.get(f"{key}_row")
+        if row is None:
+            row = st.session_state[f"{key}_row"] = spec.encode.row()
+        features = spec.encode(values, row)
+
+    if submitted:
+        with metrics.timer("predict", key):
+            prediction = predict(registry, key, features)
+        metrics.inc("predictions", disease=key, outcome="positive" if prediction == 1 else "negative")
+        attributions = request_attributions(key, features)
+        result_timer = metrics.timer("result", key)
 
-    st.markdown("""
-    **It Requires:**  
-    🩸 Fasting Blood Sugar (FBS), 🍽️ Oral Glucose Tolerance Test (OGTT), 💉 Hemoglobin A1c (HbA1c),  
-    ⚖️ Body Mass Index (BMI), 🧬 Family Medical History  
-    These assessments help understand how your body processes sugar and stores energy.
-    """)
+        if prediction == 1:
+            st.error(f"⚠️ {spec.page} likely. Please consult your doctor.")
+        else:
+            st.success("✅ No significant risk detected based on current inputs.")
 
-    st.markdown("Fill out your health information below:")
+        with metrics.timer("render", key):
+            render_baseline_chart(key, spec.labels, spec.healthy, features[spec.shown])
+        st.markdown(tips_box(spec), unsafe_allow_html=True)
+        result_timer.stop()
+        attribution_panel(key, attributions, spec)
+
+    whatif_panel(key, model, features, dict(zip(spec.shown, spec.labels)))
+
+# Why this result: attributions are computed on a background thread while the
+# verdict and chart render, and the bar chart fills in last
+def request_attributions(disease, features):
+    from diagnosis import explain
+    future = explain.explain(registry, disease, features)
+    explain.reference(registry, disease)  # queues the reference band behind it on first use
+    return future
+
+def attribution_panel(disease, future, spec):
+    if future is None:
+        return
+    from diagnosis import explain
+
+    st.markdown("#### 🧭 What Drove This Result")
+    placeholder = st.empty()
+    placeholder.caption("Working out which inputs mattered most...")
+    with metrics.timer("explain_wait", disease):
+        values = explain.wait(future)
+    if values is None:
+        placeholder.caption("⏳ The breakdown is taking longer than usual; it will show on your next prediction.")
+        return
+    placeholder.plotly_chart(explain.figure(spec.labels, values, explain.reference(registry, disease), spec.shown),
+                             use_container_width=True)
+
+# What-if curves: the risk as one or two inputs change, the rest held at the user's values.
+# A fragment, so its toggle and selectboxes rerun only this panel.  ``labels``
+# maps the position of each shown feature to its label
+@st.fragment
+def whatif_panel(disease, model, features, labels):
+    if not st.toggle("🔍 What-if analysis", key=f"whatif_{disease}"):
+        return
+    from diagnosis import whatif
 
     col1, col2 = st.columns(2)
     with col1:
-        pregnancies = st.number_input("👶 Pregnancies", 0, 20, 1)
-        bp = st.number_input("💓 Blood Pressure", 0, 200, 70)
-        insulin = st.number_input("💉 Insulin", 0, 900, 85)
-        diabetes_func = st.number_input("📊 Diabetes Pedigree Function", 0.0, 2.5, 0.5)
+        first = st.selectbox("Vary", list(labels), format_func=labels.__getitem__,
+                             key=f"whatif_{disease}_x")
     with col2:
-        glucose = st.number_input("🩸 Glucose", 0, 300, 110)
-        skin_thick = st.number_input("🧫 Skin Thickness", 0, 100, 20)
-        bmi = st.number_input("⚖️ BMI", 0.0, 70.0, 20.0)
-        age = st.number_input("🎂 Age", 10, 100, 25)
+        second = st.selectbox("Against (heatmap)", [None] + [i for i in labels if i != first],
+                              format_func=lambda i: "—" if i is None else labels[i], key=f"whatif_{disease}_y")
+    with metrics.timer("whatif", disease):
+        if second is None:
+            whatif.show_curve(disease, model, features, labels, first)
+        else:
+            whatif.show_heatmap(disease, model, features, labels, first, second)
 
-    if st.button("Predict Diabetes"):
-        features = [pregnancies, glucose, bp, skin_thick, insulin, bmi, diabetes_func, age]
-        labels = ["Pregnancies", "Glucose", "BP", "Skin", "Insulin", "BMI", "Function", "Age"]
-        healthy_vals = [0, 110, 70, 20, 85, 20.0, 0.5, 25]
+# Home Page
+if selected == "Home":
+    st.markdown("<h1 style='color:#7289da;'>🩺 Your Smart Health Predictor</h1>", unsafe_allow_html=True)
+    st.write("Stay one step ahead of illness with intelligent, personalized health predictions.")
 
-        prediction = diabetes_model.predict([features])[0]
+    cards = "".join(
+        f'<div class="disease-card"><div class="disease-title">{spec.card["icon"]} '
+        f'<span>{spec.page.replace(" ", "&nbsp;")}</span></div><div class="disease-text">'
+        f'<p>{spec.card["about"]}</p>'
+        f'<p><strong>Causes:</strong> {spec.card["causes"]}</p>'
+        f'<p><strong>Risks:</strong> {spec.card["risks"]}</p>'
+        f'<p><strong>Precautions:</strong> {spec.card["precautions"]}</p>'
+        f'<p><strong>Consultation:</strong> {spec.card["consultation"]}</p></div></div>'
+        for spec in SPECS.values()
+    )
+    st.markdown(f'<div class="home-container">{cards}</div>', unsafe_allow_html=True)
 
-        if prediction == 1:
-            st.error("⚠️ Diabetes likely. Please consult your doctor.")
-        else:
-            st.success("✅ No significant risk detected based on current inputs.")
 
-        # Inject CSS
-        st.markdown("""
-        <style>
-        .result-section {
-            display: flex;
-            gap: 2rem;
-            margin-top: 1.5rem;
-            flex-wrap: wrap;
-        }
-        .chart-box {
-            flex: 2;
-            min-width: 300px;
-        }
-        .tips-box {
-            flex: 1;
-            background-color: #2c2f33;
-            border: 1px solid #444;
-            border-radius: 10px;
-            padding: 1rem 1.2rem;
-            color: white;
-        }
-        .tips-box h4 {
-            color: #7289da;
-            margin-bottom: 0.8rem;
-        }
-        .tips-box ul {
-            padding-left: 1.2rem;
-        }
-        .tips-box li {
-            margin-bottom: 0.6rem;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        # Result Section
-        st.markdown('<div class="result-section">', unsafe_allow_html=True)
-
-        # Chart Box
-        st.markdown('<div class="chart-box">', unsafe_allow_html=True)
-        fig, ax = plt.subplots(figsize=(8, 4))
-        index = np.arange(len(labels))
-        ax.plot(index, healthy_vals, label='Healthy', color='lime', marker='o', linewidth=2)
-        ax.plot(index, features, label='You', color='red', linestyle='--', marker='x', linewidth=2)
-        ax.set_xticks(index)
-        ax.set_xticklabels(labels, rotation=45, color='white')
-        ax.set_ylabel("Values", color='white')
-        ax.set_title("Comparison with Healthy Baseline", color='white')
-        ax.tick_params(colors='white')
-        ax.legend(facecolor="#2c2f33", edgecolor='white')
-        fig.patch.set_facecolor('#2c2f33')
-        ax.set_facecolor('#2c2f33')
-        st.pyplot(fig)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Tips Box
-        st.markdown("""
-        <div class="tips-box">
-        <h4>🌿 General Wellness Tips</h4>
-        <ul>
-            <li>🥗 <strong>Eat whole & colorful meals:</strong> Add veggies, fruits & whole grains daily.</li>
-            <li>💧 <strong>Hydrate consistently:</strong> Water supports digestion & energy balance.</li>
-            <li>🧘 <strong>Stress less, breathe more:</strong> Use meditation, journaling, or music therapy.</li>
-            <li>🏃 <strong>Move your body:</strong> Even light walks can help balance blood sugar.</li>
-            <li>😴 <strong>Sleep is self-care:</strong> Aim for 7–8 hours to reset and repair.</li>
-        </ul>
-
-        <div style="margin-top: 1.5rem;">
-            <h4>👨‍⚕️ Who to Consult</h4>
-            <ul>
-                <li>💡 <strong>Primary Recommendation:</strong> Endocrinologist — expert in hormonal and metabolic disorders including diabetes.</li>
-                <li>🩺 <strong>Alternate Recommendation:</strong> Diabetologist or General Physician — for routine management and lifestyle guidance.</li>
-            </ul>
-        </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown('</div>', unsafe_allow_html=True)  # closes .result-section
-
-            
-# Hypertension Page
-elif selected == "Hypertension":
-    st.header("💢 Hypertension Risk Prediction")
+# Disease Pages
+elif selected in DISEASE_PAGES:
+    disease_page(DISEASE_PAGES[selected])
+
+
+# Screen All Page
+elif selected == "Screen All":
+    import time
+    from diagnosis.screening import build_rows, screen
+
+    st.header("🩺 Full Check-up")
 
     st.markdown("""
-    **It Requires:**  
-    🩺 Systolic & Diastolic Blood Pressure, 💓 Heart Rate, ⚖️ Body Mass Index (BMI),  
-    🚬 Lifestyle Factors (Smoking & Activity), 📁 Medical History  
-    These help evaluate your cardiovascular strain and overall blood pressure trends.
+    Answer once and get the diabetes, hypertension and heart disease checks together.  
+    Shared values such as age, BMI and blood pressure are only asked for once.
     """)
 
-    st.markdown("Fill out your health information below:")
-
-    gender_map = {"Female": 0, "Male": 1}
+    with st.form("screen_all"):
+        st.markdown("**👤 About You**")
+        col1, col2 = st.columns(2)
+        with col1:
+            age = st.number_input("🎂 Age", 10, 100, 30)
+            bmi = st.number_input("⚖️ BMI", 10.0, 70.0, 21.5)
+            sys_bp = st.number_input("🔺 Systolic BP", 80, 200, 120)
+        with col2:
+            sex = st.selectbox("🧑 Sex", list(SEX_MAP.keys()))
+            dia_bp = st.number_input("🔻 Diastolic BP", 40, 150, 75)
+            heart_rate = st.number_input("💓 Resting Heart Rate", 50, 200, 72)
+
+        st.markdown("**🩸 Blood Sugar**")
+        col1, col2 = st.columns(2)
+        with col1:
+            glucose = st.number_input("🩸 Glucose", 0, 300, 110)
+            insulin = st.number_input("💉 Insulin", 0, 900, 85)
+            pregnancies = st.number_input("👶 Pregnancies", 0, 20, 0)
+        with col2:
+            skin_thick = st.number_input("🧫 Skin Thickness", 0, 100, 20)
+            diabetes_func = st.number_input("📊 Diabetes Pedigree Function", 0.0, 2.5, 0.5)
+            fbs = st.selectbox("🍬 Fasting Blood Sugar > 120", [0, 1])
+
+        st.markdown("**❤️ Heart**")
+        col1, col2 = st.columns(2)
+        with col1:
+            cp = st.selectbox("💥 Chest Pain Type", list(CP_MAP.keys()))
+            chol = st.number_input("🥩 Cholesterol", 100, 400, 180)
+            ecg = st.selectbox("📉 Resting ECG", list(ECG_MAP.keys()))
+            thalach = st.number_input("🏃 Max Heart Rate", 70, 220, 160)
+        with col2:
+            exang = st.selectbox("🏋️ Exercise Induced Angina", list(ANGINA_MAP.keys()))
+            oldpeak = st.number_input("📉 Oldpeak", 0.0, 6.0, 0.0)
+            slope = st.selectbox("📈 ST Slope", list(SLOPE_MAP.keys()))
+
+        st.markdown("**📁 History & Lifestyle**")
+        col1, col2 = st.columns(2)
+        with col1:
+            med_history = st.selectbox("📁 Medical History (1=Yes)", [0, 1])
+            smoking = st.selectbox("🚬 Smoking", [0, 1])
+        with col2:
+            sporting = st.selectbox("🏃 Physically Active", [0, 1])
+
+        submitted = st.form_submit_button("Run Full Check-up")
+
+    if submitted:
+        with metrics.timer("features", "all"):
+            rows = build_rows({
+                "age": age, "sex": sex, "bmi": bmi, "systolic_bp": sys_bp, "diastolic_bp": dia_bp,
+                "heart_rate": heart_rate, "glucose": glucose, "insulin": insulin,
+                "pregnancies": pregnancies, "skin_thickness": skin_thick, "pedigree": diabetes_func,
+                "fasting_bs": fbs, "chest_pain": cp, "cholesterol": chol, "ecg": ecg, "max_hr": thalach,
+                "angina": exang, "oldpeak": oldpeak, "slope": slope, "medical_history": med_history,
+                "smoking": smoking, "sporting": sporting,
+            })
+
+        start = time.perf_counter()
+        try:
+            with metrics.timer("predict", "all"):
+                results = screen(registry, rows)
+        except FileNotFoundError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+        elapsed = time.perf_counter() - start
+
+        names = {"diabetes": "🩸 Diabetes", "hypertension": "💢 Hypertension", "heart": "❤️ Heart Disease"}
+        for col, result in zip(st.columns(len(results)), results):
+            with col:
+                st.metric(names[result.disease], f"{result.probability:.0%} risk")
+                if result.prediction == 1:
+                    st.error("⚠️ Likely. Please consult your doctor.")
+                else:
+                    st.success("✅ No significant risk detected.")
+        st.caption(
+            f"All three checks took {elapsed * 1000:.0f} ms "
+            f"(slowest single model: {max(r.seconds for r in results) * 1000:.0f} ms)."
+        )
+
+
+# Batch Screening Page
+elif selected == "Batch Screening":
+    import tempfile
+    from diagnosis.batch import DEFAULT_CHUNKSIZE, score_csv
+
+    st.header("📂 Batch Screening")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        age = st.number_input("🎂 Age", 10, 100, 25)
-        bmi = st.number_input("⚖️ BMI", 10.0, 50.0, 21.5)
-        sys_bp = st.number_input("🔺 Systolic BP", 80, 200, 115)
-        dia_bp = st.number_input("🔻 Diastolic BP", 50, 150, 75)
-        heart_rate = st.number_input("💓 Heart Rate", 50, 200, 72)
-    with col2:
-        gender = st.selectbox("🧑 Gender", list(gender_map.keys()))
-        gender = gender_map[gender]
-        med_history = st.selectbox("📁 Medical History (1=Yes)", [0, 1])
-        smoking = st.selectbox("🚬 Smoking", [0, 1])
-        sporting = st.selectbox("🏃 Physically Active", [0, 1])
-        hypertension_tests = st.selectbox("🧪 Hypertension Tests Done? (1=Yes)", [0, 1])
-
-    if st.button("Predict Hypertension"):
-        features = [
-            age, gender, bmi, sys_bp, dia_bp,
-            heart_rate, med_history, smoking, sporting, hypertension_tests
-        ]
-        labels = [
-            "Age", "Gender", "BMI", "SysBP", "DiaBP",
-            "HeartRate", "History", "Smoking", "Active", "Tests"
-        ]
-        healthy_vals = [25, 1, 21.5, 115, 75, 72, 0, 0, 1, 1]
-
-        prediction = hypertension_model.predict([features])[0]
+    st.markdown("""
+    Upload a clinic export with one patient per row, in the same column layout as the training data.
+    The file is scored in fixed-size chunks, so exports with tens of thousands of rows are fine.
+    """)
 
-        if prediction == 1:
-            st.error("⚠️ Hypertension likely. Please consult your doctor.")
+    disease_names = {spec.page: key for key, spec in SPECS.items()}
+    disease = disease_names[st.selectbox("🩺 Model", list(disease_names.keys()))]
+    st.caption(f"Expected columns (as in `data/{DATASETS[disease]}`): " + ", ".join(input_columns(disease)))
+    upload = st.file_uploader("📄 CSV file", type="csv")
+    chunksize = st.number_input("📦 Rows per chunk", 500, 100000, DEFAULT_CHUNKSIZE, step=500)
+
+    if upload is not None and st.button("Score File"):
+        model = load_model(disease)
+        bar = st.progress(0.0, text="Scoring...")
+        previous = st.session_state.pop("batch_output", None)
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as dst:
+            try:
+                result = score_csv(
+                    disease, upload, dst, model, int(chunksize),
+                    progress=lambda rows, fraction: bar.progress(fraction, text=f"{rows:,} rows scored"),
+                )
+            except ValueError as e:
+                result = None
+                st.error(f"🚫 {e}")
+        if result is None:
+            os.remove(dst.name)
         else:
-            st.success("✅ No significant risk detected based on current inputs.")
+            st.session_state["batch_output"] = {
+                "path": dst.name,
+                "name": os.path.splitext(upload.name)[0] + "_scored.csv",
+                "summary": (
+                    f"✅ {result.rows:,} rows scored, {result.positives:,} flagged, in "
+                    f"{result.seconds:.2f} s ({result.rows_per_second:,.0f} rows/s)"
+                ),
+            }
 
-        # Inject CSS
-        st.markdown("""
-        <style>
-        .result-section {
-            display: flex;
-            gap: 2rem;
-            margin-top: 1.5rem;
-            flex-wrap: wrap;
-        }
-        .chart-box {
-            flex: 2;
-            min-width: 300px;
-        }
-        .tips-box {
-            flex: 1;
-            background-color: #2c2f33;
-            border: 1px solid #444;
-            border-radius: 10px;
-            padding: 1rem 1.2rem;
-            color: white;
-        }
-        .tips-box h4 {
-            color: #7289da;
-            margin-bottom: 0.8rem;
-        }
-        .tips-box ul {
-            padding-left: 1.2rem;
-        }
-        .tips-box li {
-            margin-bottom: 0.6rem;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        # Result Section
-        st.markdown('<div class="result-section">', unsafe_allow_html=True)
-
-        # Chart Box
-        st.markdown('<div class="chart-box">', unsafe_allow_html=True)
-        fig, ax = plt.subplots(figsize=(8, 4))
-        index = np.arange(len(labels))
-        ax.plot(index, healthy_vals, label='Healthy', color='lime', marker='o', linewidth=2)
-        ax.plot(index, features, label='You', color='red', linestyle='--', marker='x', linewidth=2)
-        ax.set_xticks(index)
-        ax.set_xticklabels(labels, rotation=45, color='white')
-        ax.set_ylabel("Values", color='white')
-        ax.set_title("Comparison with Healthy Baseline", color='white')
-        ax.tick_params(colors='white')
-        ax.legend(facecolor="#2c2f33", edgecolor='white')
-        fig.patch.set_facecolor('#2c2f33')
-        ax.set_facecolor('#2c2f33')
-        st.pyplot(fig)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Tips Box
-        st.markdown("""
-        <div class="tips-box">
-        <h4>🍏 General Wellness Tips</h4>
-        <ul>
-            <li>🍌 <strong>Eat potassium-rich foods:</strong> Bananas, greens, and lentils support healthy pressure.</li>
-            <li>🏃 <strong>Stay active:</strong> Aim for 30 minutes of walking or light cardio daily.</li>
-            <li>🧘 <strong>Manage stress gently:</strong> Try mindful breathing, music, or nature time.</li>
-            <li>💧 <strong>Stay hydrated:</strong> Balanced fluids help regulate pressure and circulation.</li>
-            <li>🩺 <strong>Monitor regularly:</strong> Know your numbers and get routine checkups.</li>
-        </ul>
-
-        <div style="margin-top: 1.5rem;">
-            <h4>👨‍⚕️ Who to Consult</h4>
-            <ul>
-                <li>💡 <strong>Primary Recommendation:</strong> Cardiologist — for advanced evaluation and blood pressure management.</li>
-                <li>🩺 <strong>Alternate Recommendation:</strong> Internal Medicine Specialist or General Physician — for ongoing monitoring and medication adjustments.</li>
-            </ul>
-        </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown('</div>', unsafe_allow_html=True)  # closes .result-section
-
-
-# Heart Disease Page  
-elif selected == "Heart Disease":
-    st.header("❤️ Heart Disease Prediction")
+    output = st.session_state.get("batch_output")
+    if output and os.path.exists(output["path"]):
+        st.success(output["summary"])
+        with open(output["path"], "rb") as f:
+            st.download_button("⬇️ Download Results", f, file_name=output["name"], mime="text/csv")
 
-    st.markdown("""
-    **It Requires:**  
-    🧪 ECG or EKG, 🩸 Cholesterol & Blood Pressure readings, 🧬 Family History, 🍬 Fasting Blood Sugar,  
-    🏃 Stress Test & Physical Activity Assessment  
-    These help evaluate your cardiac function, rhythm patterns, and risk profile.
-    """)
+elif selected == "History":
+    import datetime
+    import tempfile
+    from diagnosis import history
 
-    st.markdown("Fill out the fields below:")
+    st.header("🗂️ Prediction History")
 
-    sex_map = {"Female": 0, "Male": 1}
-    slope_map = {"Up": 0, "Flat": 1, "Down": 2}
-    cp_map = {"Typical Angina": 0, "Atypical Angina": 1, "Non-anginal": 2, "Asymptomatic": 3}
-    ecg_map = {"Normal": 0, "ST-T abnormality": 1, "Left ventricular hypertrophy": 2}
-    angina_map = {"No": 0, "Yes": 1}
+    st.markdown("""
+    Every prediction made on this server, newest first: its inputs, risk and the model version that produced it.
+    """)
 
-    col1, col2 = st.columns(2)
-    with col1:
-        age = st.number_input("🎂 Age", 10, 100, 30)
-        cp = st.selectbox("💥 Chest Pain Type", list(cp_map.keys()))
-        trestbps = st.number_input("🔴 Resting BP", 80, 200, 120)
-        ecg = st.selectbox("📉 Resting ECG", list(ecg_map.keys()))
-        exang = st.selectbox("🏋️ Exercise Induced Angina", list(angina_map.keys()))
-        slope = st.selectbox("📈 ST Slope", list(slope_map.keys()))
-    with col2:
-        sex = st.selectbox("🧑 Sex", list(sex_map.keys()))
-        chol = st.number_input("🥩 Cholesterol", 100, 400, 180)
-        fbs = st.selectbox("🍬 Fasting Blood Sugar > 120", [0, 1])
-        thalach = st.number_input("🏃 Max Heart Rate", 70, 220, 160)
-        oldpeak = st.number_input("📉 Oldpeak", 0.0, 6.0, 0.0)
-
-    if st.button("Predict Heart Disease"):
-        features = [
-            age, sex_map[sex], cp_map[cp], trestbps, chol, fbs,
-            ecg_map[ecg], thalach, angina_map[exang], oldpeak,
-            slope_map[slope]
-        ]
-        labels = ["Age", "Sex", "CP", "BP", "Chol", "FBS", "ECG", "MaxHR", "Angina", "Oldpeak", "Slope"]
-        healthy_vals = [30, 1, 0, 120, 180, 0, 0, 160, 0, 0.0, 1]
-
-        prediction = heart_model.predict([features])[0]
+    if not history.ENABLED:
+        st.info("The prediction history is off (`HISTORY_ENABLED=0`).")
+    else:
+        store = history.get_store()
+        store.flush()  # include predictions still waiting in the write queue
+
+        disease_names = {"All": None, **{spec.page: key for key, spec in SPECS.items()}}
+        bands = {"All": None, "Low (≤ 30%)": "low", "Medium (30-50%)": "medium", "High (> 50%)": "high"}
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            disease = disease_names[st.selectbox("🩺 Model", list(disease_names))]
+        with col2:
+            band = bands[st.selectbox("🎯 Risk", list(bands))]
+        with col3:
+            today = datetime.date.today()
+            dates = st.date_input("📅 Dates", (today - datetime.timedelta(days=7), today))
+        start, end = (dates + (dates[-1],))[:2] if dates else (today, today)
+        filters = {
+            "disease": disease,
+            "band": band,
+            "since": datetime.datetime.combine(start, datetime.time.min).timestamp(),
+            "until": datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min).timestamp(),
+        }
+
+        with metrics.timer("history_query", disease or ""):
+            total = store.count(**filters)
+            rows = store.query(limit=200, **filters)
+        st.caption(f"{total:,} matching predictions" + (", showing the newest 200" if total > 200 else ""))
+        if rows:
+            st.dataframe(
+                [
+                    {
+                        "Time": datetime.datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S"),
+                        "Model": row["disease"],
+                        "Risk": f"{row['probability']:.0%}",
+                        "Result": "⚠️ at risk" if row["prediction"] else "✅ no risk",
+                        "Source": row["source"],
+                        "Version": row["model_version"],
+                        **(dict(zip(FEATURE_COLUMNS[disease], row["features"])) if disease
+                           else {"Inputs": ", ".join(f"{x:g}" for x in row["features"])}),
+                    }
+                    for row in rows
+                ],
+                hide_index=True, use_container_width=True,
+            )
+
+        if total and st.button("📦 Prepare CSV Export"):
+            previous = st.session_state.pop("history_export", None)
+            if previous and os.path.exists(previous):
+                os.remove(previous)
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as dst:
+                store.export_csv(dst, **filters)
+            st.session_state["history_export"] = dst.name
+
+        export = st.session_state.get("history_export")
+        if export and os.path.exists(export):
+            with open(export, "rb") as f:
+                st.download_button("⬇️ Download CSV", f, file_name="prediction_history.csv", mime="text/csv")
+
+elif selected == "Drift Monitor":
+    from diagnosis import drift
+
+    st.header("📡 Drift Monitor")
 
-        if prediction == 1:
-            st.error("⚠️ Heart Disease likely. Please consult your doctor.")
-        else:
-            st.success("✅ No significant risk detected based on current inputs.")
+    st.markdown("""
+    How the inputs seen since the server started compare with the training data.
+    Only running statistics are kept per feature, never the inputs themselves.
+    """)
 
-        # Inject CSS
-        st.markdown("""
-        <style>
-        .result-section {
-            display: flex;
-            gap: 2rem;
-            margin-top: 1.5rem;
-            flex-wrap: wrap;
-        }
-        .chart-box {
-            flex: 2;
-            min-width: 300px;
-        }
-        .tips-box {
-            flex: 1;
-            background-color: #2c2f33;
-            border: 1px solid #444;
-            border-radius: 10px;
-            padding: 1rem 1.2rem;
-            color: white;
-        }
-        .tips-box h4 {
-            color: #7289da;
-            margin-bottom: 0.8rem;
-        }
-        .tips-box ul {
-            padding-left: 1.2rem;
-        }
-        .tips-box li {
-            margin-bottom: 0.6rem;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        # Result Section
-        st.markdown('<div class="result-section">', unsafe_allow_html=True)
-
-        # Chart Box
-        st.markdown('<div class="chart-box">', unsafe_allow_html=True)
-        import matplotlib.pyplot as plt
-        import numpy as np
-        fig, ax = plt.subplots(figsize=(8, 4))
-        index = np.arange(len(labels))
-        ax.plot(index, healthy_vals, label='Healthy', color='lime', marker='o', linewidth=2)
-        ax.plot(index, features, label='You', color='red', linestyle='--', marker='x', linewidth=2)
-        ax.set_xticks(index)
-        ax.set_xticklabels(labels, rotation=45, color='white')
-        ax.set_ylabel("Values", color='white')
-        ax.set_title("Comparison with Healthy Baseline", color='white')
-        ax.tick_params(colors='white')
-        ax.legend(facecolor="#2c2f33", edgecolor='white')
-        fig.patch.set_facecolor('#2c2f33')
-        ax.set_facecolor('#2c2f33')
-        st.pyplot(fig)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Tips Box
-        st.markdown("""
-        <div class="tips-box">
-        <h4>🍏 General Wellness Tips</h4>
-        <ul>
-            <li>🥑 <strong>Eat potassium-rich foods:</strong> Bananas, greens, and lentils support healthy pressure.</li>
-            <li>🏃‍♀️ <strong>Stay active:</strong> Aim for 30 minutes of walking or light cardio daily.</li>
-            <li>🧘‍♂️ <strong>Manage stress gently:</strong> Try mindful breathing, music, or nature time.</li>
-            <li>💧 <strong>Stay hydrated:</strong> Balanced fluids help regulate pressure and circulation.</li>
-        </ul>
-
-        <div style="margin-top: 1.5rem;">
-            <h4>👨‍⚕️ Who to Consult</h4>
-            <ul>
-                <li>💡 <strong>Primary:</strong> Cardiologist — specializes in heart conditions and can provide targeted treatment.</li>
-                <li>🩺 <strong>Alternate:</strong> General Physician — for initial screening and referral to a specialist if needed.</li>
-            </ul>
-        </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown('</div>', unsafe_allow_html=True)  # closes .result-section
+    if not drift.ENABLED:
+        st.info("Drift monitoring is off (`DRIFT_ENABLED=0`).")
+    else:
+        reports = drift.compare(save=False)
+        if not reports:
+            st.info("No predictions yet. Statistics start with the first prediction on any page.")
+        badges = {"stable": "🟢 stable", "moderate": "🟡 moderate", "major": "🔴 major", "warming up": "⏳ warming up"}
+        for disease, report in sorted(reports.items()):
+            st.subheader(SPECS[disease].page)
+            st.caption(
+                f"{report['n']:,} predictions since start, against {report['reference_rows']:,} rows of "
+                f"`data/{DATASETS[disease]}`"
+                + (f". Scores appear after {drift.MIN_SAMPLES:,} predictions." if report['n'] < drift.MIN_SAMPLES else "")
+            )
+            st.dataframe(
+                [
+                    {
+                        "Feature": name, "Status": badges[f['status']], "PSI": f.get('psi'), "KS": f.get('ks'),
+                        "Mean": f['mean'], "Training mean": f['ref_mean'], "Shift (SD)": f.get('shift'),
+                    }
+                    for name, f in report['features'].items()
+                ],
+                hide_index=True, use_container_width=True,
+            )
+            feature = st.selectbox("📊 Distribution of", list(report['features']), key=f"drift_{disease}")
+            st.plotly_chart(drift.histogram_figure(feature, report['features'][feature]), use_container_width=True)
+
+        st.caption(
+            f"PSI above {drift.PSI_MODERATE} is a moderate shift, above {drift.PSI_MAJOR} a major one. "
+            f"Scores are also recomputed every {drift.DRIFT_INTERVAL:.0f} s in the background"
+            + (f" and written to `{drift.DRIFT_FILE}`." if drift.DRIFT_FILE else ".")
+        )
+
+rerun_timer.stop(selected)
+metrics.flush()
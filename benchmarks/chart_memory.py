@@ -0,0 +1,87 @@
+"""Server memory over repeated chart renders.
+
+Renders the shared diabetes baseline chart ``--predictions`` times with
+random user values and samples RSS growth after a short warm-up.  ``--legacy N`` also runs
+the old per-click pattern (``plt.subplots`` + savefig, never closed) for N
+clicks to show the growth it caused.
+
+    python benchmarks/chart_memory.py --predictions 10000 --legacy 500
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diagnosis.registry import _rss_bytes  # noqa: E402
+
+LABELS = ["Pregnancies", "Glucose", "BP", "Skin", "Insulin", "BMI", "Function", "Age"]
+HEALTHY = [0, 110, 70, 20, 85, 20.0, 0.5, 25]
+
+
+def _values():
+    return [v * random.uniform(0.5, 2.0) for v in HEALTHY]
+
+
+def run_shared(n, samples):
+    from diagnosis.charts import BaselineChart
+
+    chart = BaselineChart(LABELS, HEALTHY)
+    return _run(n, samples, lambda: chart.render(_values()))
+
+
+def run_legacy(n, samples):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    def click():
+        fig, ax = plt.subplots(figsize=(8, 4))
+        ax.plot(range(len(LABELS)), HEALTHY, color='lime', marker='o', linewidth=2)
+        ax.plot(range(len(LABELS)), _values(), color='red', linestyle='--', marker='x', linewidth=2)
+        ax.set_xticks(range(len(LABELS)))
+        ax.set_xticklabels(LABELS, rotation=45)
+        fig.savefig(io.BytesIO(), format='png', dpi=200, bbox_inches='tight')
+
+    return _run(n, samples, click)
+
+
+def _run(n, samples, click, warmup=50):
+    # Warm-up renders fill matplotlib's font and glyph caches first
+    for _ in range(warmup):
+        click()
+    rows = []
+    start_rss = _rss_bytes()
+    start = time.perf_counter()
+    step = max(1, n // samples)
+    for i in range(1, n + 1):
+        click()
+        if i % step == 0 or i == n:
+            rows.append((i, (_rss_bytes() - start_rss) / 2**20, (time.perf_counter() - start) / i * 1000))
+    return rows
+
+
+def _print(title, rows):
+    print(title)
+    print(f"  {'renders':>8}  {'RSS growth':>10}  {'ms/render':>9}")
+    for i, mb, ms in rows:
+        print(f"  {i:>8}  {mb:>7.1f} MB  {ms:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--predictions', type=int, default=10000)
+    parser.add_argument('--legacy', type=int, default=0, help="also run N legacy renders")
+    parser.add_argument('--samples', type=int, default=10)
+    args = parser.parse_args()
+
+    _print("shared chart (diagnosis.charts)", run_shared(args.predictions, args.samples))
+    if args.legacy:
+        _print("legacy plt.subplots per click, never closed", run_legacy(args.legacy, args.samples))
+
+
+if __name__ == '__main__':
+    main()
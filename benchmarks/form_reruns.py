@@ -0,0 +1,98 @@
+"""Script reruns, server CPU and page bytes per completed prediction on the disease pages.
+
+Replays a visitor who opens a page, changes every input once and then
+presses Predict, ``--predictions`` times per page.  A browser reruns the
+script for each change to a widget outside a form, while changes inside a
+form wait in the browser until its submit button.  The replay follows the
+same rule, so it measures any version of the app:
+
+    python benchmarks/form_reruns.py
+    python benchmarks/form_reruns.py --app /path/to/old/checkout/app.py
+
+CPU is this process's CPU time across the replay, which is almost all
+script execution; Streamlit's ``AppTest`` runs the script in-process.
+Bytes are the serialized size of every element each rerun sends, which is
+what goes over the websocket (images and static files are fetched
+separately and not counted).
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ('Diabetes', 'Hypertension', 'Heart Disease')
+# The replay's synthetic predictions stay out of the real prediction history
+# and drift statistics
+os.environ['HISTORY_ENABLED'] = '0'
+os.environ['DRIFT_ENABLED'] = '0'
+
+
+def _change(widget, forward):
+    # Move a selectbox to its next option, or step a number input by one
+    if hasattr(widget, 'select_index'):
+        widget.select_index((widget.index + 1) % len(widget.options))
+        return
+    step = 1 if forward else -1
+    proto = widget.proto
+    if proto.has_max and widget.value + step > proto.max or proto.has_min and widget.value + step < proto.min:
+        step = -step
+    widget.set_value(widget.value + step)
+
+
+def _payload_bytes(node):
+    proto = getattr(node, 'proto', None)
+    size = proto.ByteSize() if hasattr(proto, 'ByteSize') else 0
+    return size + sum(_payload_bytes(child) for child in getattr(node, 'children', {}).values())
+
+
+def replay(app, page, predictions):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app, default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value(page).run()
+    # One untimed prediction loads the model, the chart and the caches
+    at.button[0].click()
+    at.run()
+
+    reruns = sent = 0
+    start = time.process_time()
+    for n in range(predictions):
+        for kind in ('number_input', 'selectbox'):
+            for i in range(len(getattr(at, kind))):
+                widget = getattr(at, kind)[i]
+                _change(widget, n % 2 == 0)
+                if not widget.proto.form_id:
+                    at.run()
+                    reruns += 1
+                    sent += _payload_bytes(at._tree)
+        at.button[0].click()
+        at.run()
+        reruns += 1
+        sent += _payload_bytes(at._tree)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    cpu = time.process_time() - start
+    return reruns / predictions, cpu / predictions * 1000, sent / predictions / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'), help="app.py to replay (default: this checkout)")
+    parser.add_argument('--predictions', type=int, default=10, help="predictions per page (default 10)")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    app = os.path.abspath(args.app)
+    sys.path.insert(0, os.path.dirname(app))
+    os.chdir(os.path.dirname(app))
+    print(f"{'page':<16} {'reruns/prediction':>18} {'CPU ms/prediction':>18} {'KB/prediction':>14}")
+    for page in PAGES:
+        reruns, cpu_ms, kb = replay(app, page, args.predictions)
+        print(f"{page:<16} {reruns:>18.1f} {cpu_ms:>18.1f} {kb:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
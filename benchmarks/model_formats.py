@@ -0,0 +1,84 @@
+"""Load time and resident memory of each model file format.
+
+Every (model, format) pair is measured in a fresh interpreter.  xgboost and
+numpy are imported before the clock starts, so the numbers cover only the
+deserialization itself: median wall time over ``--repeat`` loads and the
+RSS growth caused by the first load.
+
+    python benchmarks/model_formats.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from diagnosis.registry import MODEL_DIR, _STEMS  # noqa: E402
+
+FORMATS = ('pkl', 'ubj', 'json', 'npz')
+
+
+def _child(path, repeat):
+    import time
+    import warnings
+
+    import numpy  # noqa: F401
+    import xgboost  # noqa: F401
+
+    from diagnosis.registry import _load_file, _rss_bytes
+
+    warnings.filterwarnings('ignore')
+    rss_before = _rss_bytes()
+    times, models = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        models.append(_load_file(path))
+        times.append(time.perf_counter() - start)
+        if len(models) == 1:
+            rss_first = _rss_bytes() - rss_before
+    times.sort()
+    print(json.dumps({'load_ms': times[len(times) // 2] * 1000, 'rss_delta_bytes': rss_first}))
+
+
+def measure(path, repeat):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', path, '--repeat', str(repeat)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(args.child, args.repeat)
+
+    results = {}
+    for disease, stem in sorted(_STEMS.items()):
+        for fmt in FORMATS:
+            path = os.path.join(MODEL_DIR, f'{stem}.{fmt}')
+            if os.path.exists(path):
+                results.setdefault(disease, {})[fmt] = dict(
+                    measure(path, args.repeat), file_bytes=os.path.getsize(path))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'model':<13} {'format':<6} {'file':>9} {'load ms':>8} {'RSS delta':>10}")
+    for disease, formats in results.items():
+        for fmt, r in formats.items():
+            print(f"{disease:<13} {fmt:<6} {r['file_bytes'] / 1024:>7.0f} K {r['load_ms']:>8.2f} "
+                  f"{r['rss_delta_bytes'] / 2**20:>7.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Throughput and memory of the pre-forked scoring service for 1, 2, 4 and 8 workers.
+
+For each worker count this starts ``python -m diagnosis.prefork service``,
+waits for ``/readyz``, drives it with ``--clients`` load generator processes
+at once (one Python client saturates about one core), then reads the
+deployment's memory from ``/workers``.  For comparison it also measures one
+plain ``python -m diagnosis.service`` process: N independent replicas cost N
+times its RSS, since they share nothing.
+
+    python benchmarks/prefork.py
+    python benchmarks/prefork.py --workers 1 2 4 8 16 --clients 4 --duration 20
+
+Throughput only scales with workers on a machine with that many free cores
+(server and clients share the box), so note ``os.cpu_count()`` with results.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from diagnosis.prefork import memory  # noqa: E402
+
+
+def _get(url):
+    try:
+        with urlopen(url, timeout=2) as response:
+            return response.status, json.load(response)
+    except URLError as e:
+        status = getattr(e, 'code', None)
+        return status, None
+
+
+def _wait(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if _get(url)[0] == 200:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout} s")
+
+
+def _load(port, disease, clients, concurrency, duration):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'diagnosis.loadgen', disease, '--port', str(port),
+             '--concurrency', str(concurrency), '--duration', str(duration), '--json'],
+            cwd=ROOT, stdout=subprocess.PIPE)
+        for _ in range(clients)
+    ]
+    results = [json.loads(p.communicate()[0]) for p in procs]
+    return {
+        'throughput_rps': sum(r['throughput_rps'] for r in results),
+        'errors': sum(r['errors'] for r in results),
+        'p50_ms': max(r['p50_ms'] for r in results),
+        'p99_ms': max(r['p99_ms'] for r in results),
+    }
+
+
+def single_replica_rss(port):
+    """RSS in MB of one plain scoring service with every model loaded."""
+    proc = subprocess.Popen([sys.executable, '-m', 'diagnosis.service', '--port', str(port)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        _wait(f'http://127.0.0.1:{port}/healthz')
+        # /healthz answers as soon as the socket is up; models are preloaded before it binds
+        return memory(proc.pid).get('rss_mb', 0.0)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(workers, port, disease, clients, concurrency, duration):
+    admin = port + 100
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'diagnosis.prefork', 'service', '--workers', str(workers),
+         '--port', str(port), '--admin-port', str(admin)],
+        cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        _wait(f'http://127.0.0.1:{admin}/readyz')
+        result = _load(port, disease, clients, concurrency, duration)
+        result.update({k: v for k, v in _get(f'http://127.0.0.1:{admin}/workers')[1].items()
+                       if k in ('total_rss_mb', 'total_pss_mb')})
+        return result
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--disease', default='heart')
+    parser.add_argument('--port', type=int, default=8650)
+    parser.add_argument('--clients', type=int, default=2, help="load generator processes (default 2)")
+    parser.add_argument('--concurrency', type=int, default=32, help="connections per client (default 32)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per run (default 10)")
+    args = parser.parse_args()
+
+    replica = single_replica_rss(args.port)
+    print(f"{os.cpu_count()} CPUs; one independent service process: {replica:.0f} MB RSS")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>7} {'p99 ms':>7} {'errors':>6} "
+          f"{'RSS MB':>7} {'PSS MB':>7} {'replicas RSS MB':>15}")
+    for n in args.workers:
+        r = run(n, args.port, args.disease, args.clients, args.concurrency, args.duration)
+        print(f"{n:>7} {r['throughput_rps']:>9,.0f} {r['p50_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['errors']:>6} "
+              f"{r['total_rss_mb']:>7.0f} {r['total_pss_mb']:>7.0f} {n * replica:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Cold-start budget for ``app.py``.
+
+Starts a fresh interpreter under ``python -X importtime``, renders the Home
+page once through Streamlit's ``AppTest`` and then, in the same process,
+visits a disease page and clicks Predict.  Imports triggered by each step
+are attributed to that step, and the Home step is checked against
+``BUDGET``: no heavy module may be imported and the first render must fit
+the time budget.
+
+    python benchmarks/startup.py          # exits 1 if the budget is exceeded
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET = {
+    'home_first_render_ms': 300,
+    'home_import_ms': 60,
+    # Nothing the Home page needs may pull these in
+    'home_forbidden_modules': ['numpy', 'pandas', 'pyarrow', 'matplotlib', 'xgboost', 'sklearn', 'scipy'],
+}
+
+HEAVY = ['numpy', 'pandas', 'pyarrow', 'matplotlib', 'xgboost', 'sklearn', 'scipy', 'plotly']
+
+_MARK = 'startup-step:'
+_IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def _child():
+    # Runs inside the -X importtime interpreter
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    results = {}
+
+    def step(name, fn):
+        sys.stderr.write(f'{_MARK}{name}\n')
+        sys.stderr.flush()
+        before = set(sys.modules)
+        start = time.perf_counter()
+        fn()
+        results[name] = {
+            'wall_ms': (time.perf_counter() - start) * 1000,
+            'heavy_imported': sorted({m.split('.')[0] for m in set(sys.modules) - before} & set(HEAVY)),
+        }
+
+    at = AppTest.from_file('app.py', default_timeout=120)
+    step('home', at.run)
+
+    step('disease_page', lambda: at.sidebar.radio[0].set_value('Diabetes').run())
+    step('first_predict', lambda: (at.button[0].click(), at.run()))
+    print(json.dumps(results))
+
+
+def _parse(stderr):
+    # Sum the cumulative time of top-level imports between step markers
+    steps, current = {}, None
+    for line in stderr.splitlines():
+        if line.startswith(_MARK):
+            current = line[len(_MARK):]
+            steps[current] = {'import_ms': 0.0, 'top_imports': []}
+            continue
+        m = _IMPORT_LINE.match(line)
+        if m and current and len(m.group(3)) == 1:
+            ms = int(m.group(2)) / 1000
+            steps[current]['import_ms'] += ms
+            steps[current]['top_imports'].append((m.group(4), ms))
+    for info in steps.values():
+        info['top_imports'] = sorted(info['top_imports'], key=lambda x: -x[1])[:5]
+    return steps
+
+
+def measure():
+    # The Predict click stays out of the real prediction history and drift statistics
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child'],
+        capture_output=True, text=True, cwd=ROOT,
+        env=dict(os.environ, HISTORY_ENABLED='0', DRIFT_ENABLED='0'),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    results = json.loads(proc.stdout.strip().splitlines()[-1])
+    for name, info in _parse(proc.stderr).items():
+        results[name].update(info)
+    return results
+
+
+def check(results):
+    home = results['home']
+    failures = []
+    if home['wall_ms'] > BUDGET['home_first_render_ms']:
+        failures.append(f"Home first render {home['wall_ms']:.0f} ms > {BUDGET['home_first_render_ms']} ms")
+    if home['import_ms'] > BUDGET['home_import_ms']:
+        failures.append(f"Home imports {home['import_ms']:.0f} ms > {BUDGET['home_import_ms']} ms")
+    forbidden = sorted(set(home['heavy_imported']) & set(BUDGET['home_forbidden_modules']))
+    if forbidden:
+        failures.append(f"Home imported {', '.join(forbidden)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help="print the raw measurements")
+    args = parser.parse_args()
+    if args.child:
+        return _child()
+
+    results = measure()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, info in results.items():
+            heavy = ', '.join(info['heavy_imported']) or '-'
+            top = ', '.join(f"{mod} {ms:.0f}" for mod, ms in info['top_imports']) or '-'
+            print(f"{name:<14} {info['wall_ms']:7.0f} ms wall, {info['import_ms']:7.0f} ms importing "
+                  f"(heavy: {heavy}; top ms: {top})")
+    failures = check(results)
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    if not failures:
+        print("Home page is within the cold-start budget.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Offline benchmark suite with JSON results and regression checks.
+
+Covers, for each of the three models, single-row and whole-dataset
+prediction on rows from ``data/*.csv`` and model load time (in a fresh
+interpreter), plus chart rendering, full-script reruns through Streamlit's
+``AppTest``, RSS growth over repeated Predict clicks and the prediction
+history's write path.  Every metric is
+"lower is better"; inputs are fixed (dataset rows in file order, seeded
+chart values) and each figure is a median over ``--repeat`` runs.
+
+    python benchmarks/suite.py -o bench.json
+    python benchmarks/suite.py -o new.json --compare bench.json --threshold 0.15
+
+With ``--compare`` the run exits 1 if any metric got worse than the
+baseline by more than ``--threshold`` (a fraction).  Timings are only
+comparable between runs on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Every rerun and click submits the same form defaults; with the prediction
+# cache on, the rerun and memory groups would time cache hits, not the model
+os.environ['PREDICTION_CACHE_SIZE'] = '0'
+# The clicks' synthetic predictions stay out of the real prediction history
+# and drift statistics
+os.environ['HISTORY_ENABLED'] = '0'
+os.environ['DRIFT_ENABLED'] = '0'
+
+from diagnosis.registry import SERVING_MODE, _rss_bytes, get_registry  # noqa: E402
+
+DISEASES = ('diabetes', 'hypertension', 'heart')
+PAGES = {'diabetes': 'Diabetes', 'hypertension': 'Hypertension', 'heart': 'Heart Disease'}
+GROUPS = ('predict', 'load', 'chart', 'rerun', 'memory', 'history')
+
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def bench_predict(repeat):
+    from diagnosis.features import load_dataset
+
+    registry = get_registry()
+    results = {}
+    for disease in DISEASES:
+        model = registry.get(disease)
+        X = load_dataset(disease)
+        rows = [X[i:i + 1] for i in range(min(len(X), 200))]
+
+        def single():
+            for row in rows:
+                model.predict_proba(row)
+
+        results[f'predict_single_us.{disease}'] = (_median_ms(single, repeat) / len(rows) * 1000, 'us')
+        results[f'predict_batch_ms.{disease}'] = (_median_ms(lambda: model.predict_proba(X), repeat), 'ms')
+        results[f'predict_batch_rows.{disease}'] = (len(X), 'rows')
+    return results
+
+
+def bench_load(repeat):
+    from model_formats import measure
+
+    registry = get_registry()
+    results = {}
+    for disease in DISEASES:
+        r = measure(registry.path(disease), repeat)
+        results[f'load_ms.{disease}'] = (r['load_ms'], 'ms')
+        results[f'load_rss_mb.{disease}'] = (r['rss_delta_bytes'] / 2**20, 'MB')
+    return results
+
+
+def bench_chart(repeat):
+    from diagnosis.charts import BaselineChart
+
+    labels = ["Pregnancies", "Glucose", "BP", "Skin", "Insulin", "BMI", "Function", "Age"]
+    healthy = [0, 110, 70, 20, 85, 20.0, 0.5, 25]
+    rng = random.Random(0)
+    values = [[v * rng.uniform(0.5, 2.0) for v in healthy] for _ in range(repeat)]
+
+    chart = BaselineChart(labels, healthy)
+    chart.render(healthy)
+    it = iter(values)
+    # The plotly backend renders in the browser, so only matplotlib costs server time
+    return {'chart_render_ms.matplotlib': (_median_ms(lambda: chart.render(next(it)), repeat), 'ms')}
+
+
+def _app():
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+    at.run()
+    return at
+
+
+def bench_rerun(repeat):
+    at = _app()
+    results = {'rerun_ms.home': (_median_ms(at.run, repeat), 'ms')}
+    for disease, page in PAGES.items():
+        at.sidebar.radio[0].set_value(page).run()
+        results[f'rerun_ms.{disease}'] = (_median_ms(at.run, repeat), 'ms')
+
+        def click():
+            at.button[0].click()
+            at.run()
+
+        click()
+        results[f'predict_click_ms.{disease}'] = (_median_ms(click, repeat), 'ms')
+    return results
+
+
+def bench_memory(clicks):
+    at = _app()
+    at.sidebar.radio[0].set_value(PAGES['diabetes']).run()
+    # Warm-up clicks load the model and fill matplotlib's caches
+    for _ in range(20):
+        at.button[0].click()
+        at.run()
+    before = _rss_bytes()
+    for _ in range(clicks):
+        at.button[0].click()
+        at.run()
+    growth = (_rss_bytes() - before) / 2**20
+    return {'predict_clicks_rss_growth_mb': (growth, 'MB'), 'predict_clicks': (clicks, 'clicks')}
+
+
+def bench_history(rows):
+    import tempfile
+
+    from diagnosis.history import HistoryStore
+
+    features = (1.0, 110.0, 70.0, 20.0, 85.0, 20.0, 0.5, 25.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.sqlite3'))
+        start = time.perf_counter()
+        for i in range(rows):
+            store.record('diabetes', features, i / rows, 'bench')
+        queued = time.perf_counter() - start
+        store.flush()
+        total = time.perf_counter() - start
+    return {
+        'history_record_us': (queued / rows * 1e6, 'us'),
+        'history_write_us': (total / rows * 1e6, 'us'),
+        'history_rows': (rows, 'rows'),
+    }
+
+
+def environment():
+    import numpy
+
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'serving_mode': SERVING_MODE,
+    }
+    try:
+        import xgboost
+        env['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return env
+
+
+def run(groups, repeat, clicks):
+    warnings.filterwarnings('ignore')
+    runners = {
+        'predict': lambda: bench_predict(repeat),
+        'load': lambda: bench_load(max(3, repeat // 4)),
+        'chart': lambda: bench_chart(repeat),
+        'rerun': lambda: bench_rerun(max(3, repeat // 4)),
+        'memory': lambda: bench_memory(clicks),
+        'history': lambda: bench_history(20000),
+    }
+    metrics = {}
+    for group in groups:
+        start = time.perf_counter()
+        for name, (value, unit) in runners[group]().items():
+            metrics[name] = {'value': value, 'unit': unit}
+        print(f"{group:<8} done in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'settings': {'groups': list(groups), 'repeat': repeat, 'clicks': clicks},
+        'metrics': metrics,
+    }
+
+
+# Counts describe the workload rather than its cost and are never compared
+_NOT_COMPARED = ('rows', 'clicks')
+# RSS readings move by a page or an allocator arena between identical runs,
+# so memory only counts as a regression past this many MB
+_MIN_DELTA = {'MB': 2.0}
+
+
+def compare(results, baseline, threshold):
+    """Return ``(name, old, new, change, regressed)`` for metrics present in both runs."""
+    rows = []
+    for name, new in sorted(results['metrics'].items()):
+        old = baseline['metrics'].get(name)
+        if old is None or new['unit'] in _NOT_COMPARED:
+            continue
+        if old['value'] > 0:
+            change = new['value'] / old['value'] - 1
+        else:
+            change = 0.0 if new['value'] <= 0 else float('inf')
+        regressed = change > threshold and new['value'] - old['value'] > _MIN_DELTA.get(new['unit'], 0)
+        rows.append((name, old['value'], new['value'], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS), metavar='GROUP',
+                        help=f"benchmark groups to run ({', '.join(GROUPS)})")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--clicks', type=int, default=100, help="Predict clicks for the memory check")
+    parser.add_argument('--compare', metavar='BASELINE', help="baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat, args.clicks)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.compare:
+        for name, m in results['metrics'].items():
+            print(f"{name:<36} {m['value']:>12.3f} {m['unit']}")
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline.get('environment') != results['environment']:
+        print("note: baseline was recorded in a different environment", file=sys.stderr)
+    rows = compare(results, baseline, args.threshold)
+    print(f"{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<36} {old:>12.3f} {new:>12.3f} {change:>+7.1%}{flag}")
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Shared model-serving helpers for the Streamlit app and its command-line tools."""
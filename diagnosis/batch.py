@@ -0,0 +1,98 @@
+"""Bulk scoring of clinic exports in the ``data/*.csv`` column layout.
+
+The input is read ``chunksize`` rows at a time, each chunk is encoded exactly
+like the pages encode a single patient and scored with one vectorized
+``predict_proba`` call, and the scored chunk is appended to the output file
+before the next one is read.  Memory therefore depends on the chunk size,
+not on the size of the input.
+
+    python -m diagnosis.batch heart clinic_export.csv -o heart_scored.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+from diagnosis.features import FEATURE_COLUMNS, encode_frame
+
+DEFAULT_CHUNKSIZE = 5000
+
+
+class BatchResult:
+    def __init__(self, rows, positives, seconds):
+        self.rows = rows
+        self.positives = positives
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _size(f):
+    try:
+        return os.fstat(f.fileno()).st_size
+    except (AttributeError, OSError):
+        return getattr(f, 'size', 0)
+
+
+def score_csv(disease, src, dst, model, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Score every row of ``src`` and write it, plus ``probability`` and
+    ``prediction`` columns, to ``dst``.
+
+    ``src`` is a binary file object and ``dst`` a text file object.
+    ``progress(rows_done, fraction)`` is called after each chunk, where
+    ``fraction`` is how far into ``src`` the reader has got.
+    """
+    import pandas as pd
+
+    size = _size(src)
+    start_pos = src.tell()
+    rows = positives = 0
+    start = time.perf_counter()
+    for chunk in pd.read_csv(src, chunksize=chunksize):
+        proba = model.predict_proba(encode_frame(disease, chunk))[:, 1]
+        chunk['probability'] = proba.round(6)
+        chunk['prediction'] = (proba > 0.5).astype(int)
+        chunk.to_csv(dst, header=rows == 0, index=False)
+        rows += len(chunk)
+        positives += int(chunk['prediction'].sum())
+        if progress is not None:
+            fraction = (src.tell() - start_pos) / (size - start_pos) if size > start_pos else 1.0
+            progress(rows, min(fraction, 1.0))
+    if progress is not None:
+        progress(rows, 1.0)
+    return BatchResult(rows, positives, time.perf_counter() - start)
+
+
+def _progress_bar(rows, fraction, width=30):
+    filled = int(fraction * width)
+    sys.stderr.write(f"\r[{'#' * filled}{'.' * (width - filled)}] {fraction:4.0%} {rows:,} rows")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    from diagnosis.registry import get_registry
+
+    parser = argparse.ArgumentParser(description="Score a CSV export with one of the disease models.")
+    parser.add_argument('disease', choices=sorted(FEATURE_COLUMNS))
+    parser.add_argument('input', help="CSV in the same column layout as data/<disease>.csv")
+    parser.add_argument('-o', '--output', help="default: <input>_scored.csv")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk (default: %(default)s)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no progress bar")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + '_scored.csv'
+    model = get_registry().get(args.disease)
+    with open(args.input, 'rb') as src, open(output, 'w', newline='') as dst:
+        result = score_csv(args.disease, src, dst, model, args.chunksize,
+                           progress=None if args.quiet else _progress_bar)
+    if not args.quiet:
+        sys.stderr.write('\n')
+    print(f"{result.rows:,} rows scored ({result.positives:,} flagged) in {result.seconds:.2f} s "
+          f"-> {result.rows_per_second:,.0f} rows/s, written to {output}")
+
+
+if __name__ == '__main__':
+    main()
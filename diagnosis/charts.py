@@ -0,0 +1,119 @@
+"""The "Comparison with Healthy Baseline" chart shared by the disease pages.
+
+The axes, tick labels and healthy line only depend on the disease, so each
+chart is built once per process and every Predict click just swaps in the
+user's values.  The matplotlib charts use ``matplotlib.figure.Figure``
+directly rather than ``pyplot``; pyplot keeps every figure it creates alive
+until ``plt.close()``, which is how the old per-click charts leaked.
+
+``CHART_BACKEND=plotly`` switches to a Plotly figure that the browser
+renders, which takes image rendering off the server entirely.
+"""
+import io
+import os
+import threading
+
+import streamlit as st
+
+CHART_BACKEND = os.environ.get('CHART_BACKEND', 'matplotlib')
+
+BACKGROUND = '#2c2f33'
+TITLE = "Comparison with Healthy Baseline"
+
+
+class BaselineChart:
+    """Matplotlib chart rendered to PNG bytes; safe to share across sessions."""
+
+    def __init__(self, labels, healthy_vals, figsize=(8, 4), dpi=200):
+        from matplotlib.figure import Figure
+
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize)
+        self.ax = ax = self.fig.subplots()
+        index = list(range(len(labels)))
+        ax.plot(index, healthy_vals, label='Healthy', color='lime', marker='o', linewidth=2)
+        self.user_line, = ax.plot(index, healthy_vals, label='You', color='red',
+                                  linestyle='--', marker='x', linewidth=2)
+        ax.set_xticks(index)
+        ax.set_xticklabels(labels, rotation=45, color='white')
+        ax.set_ylabel("Values", color='white')
+        ax.set_title(TITLE, color='white')
+        ax.tick_params(colors='white')
+        ax.legend(facecolor=BACKGROUND, edgecolor='white')
+        self.fig.patch.set_facecolor(BACKGROUND)
+        ax.set_facecolor(BACKGROUND)
+        self._lock = threading.Lock()
+
+    def render(self, values):
+        """Return the chart for ``values`` as PNG bytes."""
+        with self._lock:
+            self.user_line.set_ydata(values)
+            self.ax.relim()
+            self.ax.autoscale_view()
+            buf = io.BytesIO()
+            self.fig.savefig(buf, format='png', dpi=self.dpi, bbox_inches='tight')
+        return buf.getvalue()
+
+    def show(self, values):
+        st.image(self.render(values), use_container_width=True)
+
+    def release(self):
+        self.fig.clear()
+
+
+class PlotlyBaselineChart:
+    """Plotly version; the figure JSON is built once and only ``y`` changes."""
+
+    def __init__(self, labels, healthy_vals):
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        fig.add_scatter(x=labels, y=healthy_vals, name='Healthy', mode='lines+markers',
+                        line=dict(color='lime', width=2), marker=dict(symbol='circle'))
+        fig.add_scatter(x=labels, y=healthy_vals, name='You', mode='lines+markers',
+                        line=dict(color='red', width=2, dash='dash'), marker=dict(symbol='x'))
+        fig.update_layout(
+            title=TITLE, yaxis_title="Values", paper_bgcolor=BACKGROUND,
+            plot_bgcolor=BACKGROUND, font=dict(color='white'), xaxis_tickangle=-45,
+        )
+        self.base = fig.to_plotly_json()
+
+    def figure(self, values):
+        healthy, user = self.base['data']
+        return {'data': [healthy, dict(user, y=[float(v) for v in values])], 'layout': self.base['layout']}
+
+    def show(self, values):
+        st.plotly_chart(self.figure(values), use_container_width=True)
+
+    def release(self):
+        pass
+
+
+_charts = {}
+_charts_lock = threading.Lock()
+
+
+def get_chart(key, labels, healthy_vals, backend=None):
+    """Return the process-wide chart for ``key``, building it on first use."""
+    backend = backend or CHART_BACKEND
+    chart = _charts.get((key, backend))
+    if chart is None:
+        with _charts_lock:
+            chart = _charts.get((key, backend))
+            if chart is None:
+                cls = PlotlyBaselineChart if backend == 'plotly' else BaselineChart
+                chart = _charts[(key, backend)] = cls(labels, healthy_vals)
+    return chart
+
+
+def render_baseline_chart(key, labels, healthy_vals, values, backend=None):
+    """Draw the user's ``values`` against the healthy baseline for ``key``."""
+    get_chart(key, labels, healthy_vals, backend).show(values)
+
+
+def release_charts():
+    """Drop every cached chart, e.g. before reloading with new labels."""
+    with _charts_lock:
+        for chart in _charts.values():
+            chart.release()
+        _charts.clear()
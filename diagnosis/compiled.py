@@ -0,0 +1,252 @@
+"""Pure-NumPy evaluator for the trained XGBoost ensembles.
+
+Scoring one row through ``XGBClassifier.predict`` builds a DMatrix and walks
+the whole sklearn wrapper; for 100 shallow trees that fixed cost dwarfs the
+tree traversal itself.  ``export`` flattens every tree of a booster into
+contiguous arrays (feature index, threshold, children, default direction,
+leaf value) and ``CompiledEnsemble`` walks all trees for all rows at once,
+one NumPy step per tree level, without importing xgboost.
+
+Export the shipped models and check them against ``predict_proba``::
+
+    python -m diagnosis.compiled
+
+or only check the exports already in ``models/``, writing nothing::
+
+    python -m diagnosis.compiled --check
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+_ARRAYS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots')
+
+
+class CompiledEnsemble:
+    """Binary ``binary:logistic`` tree ensemble with a sklearn-like interface.
+
+    Leaves point back at themselves, so every row can take exactly ``depth``
+    steps without checking whether it already reached a leaf.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 base_margin, depth, feature_names=()):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_margin = float(base_margin)
+        self.depth = int(depth)
+        self.feature_names = list(feature_names)
+        self.n_features_in_ = (
+            len(self.feature_names) if self.feature_names else int(feature.max()) + 1
+        )
+        # children[2 * node + go_right] is the next node
+        self._children = np.stack([left, right], axis=1).ravel()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Feature shape mismatch, expected: {self.n_features_in_}, got {X.shape[1]}"
+            )
+        flat = X.ravel()
+        has_nan = np.isnan(flat).any()
+        offsets = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        node = np.tile(self.roots, (len(X), 1))
+        for _ in range(self.depth):
+            x = flat.take(offsets + self.feature.take(node))
+            go_right = ~(x < self.threshold.take(node))
+            if has_nan:
+                go_right &= ~(np.isnan(x) & self.default_left.take(node))
+            node = self._children.take(2 * node + go_right)
+        return self.value.take(node).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        margin = self.decision_function(X)
+        proba = np.empty((len(margin), 2))
+        proba[:, 1] = 1.0 / (1.0 + np.exp(-margin))
+        proba[:, 0] = 1.0 - proba[:, 1]
+        return proba
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0.0).astype(np.int64)
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f,
+                **{name: getattr(self, name) for name in _ARRAYS},
+                base_margin=np.float64(self.base_margin),
+                depth=np.int64(self.depth),
+                feature_names=np.array(self.feature_names, dtype=str),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            return cls(
+                *(npz[name] for name in _ARRAYS),
+                base_margin=npz['base_margin'],
+                depth=npz['depth'],
+                feature_names=npz['feature_names'].tolist(),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def export(model):
+    """Flatten an ``XGBClassifier`` (or ``Booster``) into a ``CompiledEnsemble``."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic models can be compiled, not {objective}")
+    gbtree = learner['gradient_booster']
+    if gbtree['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be compiled, not {gbtree['name']}")
+
+    trees = gbtree['model']['trees']
+    best = booster.attr('best_iteration')
+    if best is not None:
+        # Match sklearn predict(), which stops at the early-stopping round
+        indptr = gbtree['model']['iteration_indptr']
+        trees = trees[:indptr[int(best) + 1]]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        offset = len(feature)
+        roots.append(offset)
+        lc, rc = tree['left_children'], tree['right_children']
+        depth = max(depth, _tree_depth(lc, rc))
+        for i, (l, r) in enumerate(zip(lc, rc)):
+            leaf = l == -1
+            feature.append(0 if leaf else tree['split_indices'][i])
+            threshold.append(0.0 if leaf else tree['split_conditions'][i])
+            left.append(offset + i if leaf else offset + l)
+            right.append(offset + i if leaf else offset + r)
+            default_left.append(bool(tree['default_left'][i]) and not leaf)
+            value.append(tree['split_conditions'][i] if leaf else 0.0)
+
+    base_score = float(learner['learner_model_param']['base_score'])
+    return CompiledEnsemble(
+        feature=np.array(feature, dtype=np.int32),
+        threshold=np.array(threshold, dtype=np.float32),
+        left=np.array(left, dtype=np.int32),
+        right=np.array(right, dtype=np.int32),
+        default_left=np.array(default_left, dtype=bool),
+        value=np.array(value, dtype=np.float32),
+        roots=np.array(roots, dtype=np.int32),
+        base_margin=math.log(base_score / (1.0 - base_score)),
+        depth=depth,
+        feature_names=booster.feature_names or (),
+    )
+
+
+def compiled_path(path):
+    return os.path.splitext(path)[0] + '.npz'
+
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def check(disease, model, compiled, tolerance):
+    """Compare compiled and xgboost probabilities on ``data/<disease>.csv``."""
+    from diagnosis.features import load_dataset
+
+    X = load_dataset(disease)
+    expected = model.predict_proba(X)[:, 1]
+    got = compiled.predict_proba(X)[:, 1]
+    max_err = float(np.max(np.abs(expected - got)))
+    row = X[:1]
+    return {
+        'rows': len(X),
+        'max_abs_error': max_err,
+        'ok': max_err <= tolerance,
+        'xgboost_row_us': _median_seconds(lambda: model.predict_proba(row), 200) * 1e6,
+        'compiled_row_us': _median_seconds(lambda: compiled.predict_proba(row), 200) * 1e6,
+    }
+
+
+def main(argv=None):
+    from diagnosis.registry import MODEL_FILES, ModelRegistry
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('diseases', nargs='*', help="default: every registered model")
+    parser.add_argument('--tolerance', type=float, default=1e-5,
+                        help="max allowed |p_compiled - p_xgboost| (default: %(default)s)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--no-check', action='store_true', help="export without checking")
+    mode.add_argument('--check', action='store_true', help="check the existing exports, write nothing")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(files=MODEL_FILES)
+    failed = False
+    for disease in args.diseases or sorted(registry.files):
+        model = registry.get(disease)
+        out = compiled_path(registry.path(disease))
+        if args.check:
+            if not os.path.exists(out):
+                failed = True
+                print(f"{disease}: {out} missing")
+                continue
+            compiled = CompiledEnsemble.load(out)
+            print(f"{disease}: {compiled.n_trees} trees, depth {compiled.depth}, "
+                  f"{len(compiled.feature)} nodes in {out}")
+        else:
+            compiled = export(model)
+            compiled.save(out)
+            print(f"{disease}: {compiled.n_trees} trees, depth {compiled.depth}, "
+                  f"{len(compiled.feature)} nodes -> {out}")
+        if args.no_check:
+            continue
+        result = check(disease, model, compiled, args.tolerance)
+        failed |= not result['ok']
+        print(f"  {result['rows']} rows, max |dp| = {result['max_abs_error']:.2e} "
+              f"({'ok' if result['ok'] else 'FAILED'}), single row: "
+              f"xgboost {result['xgboost_row_us']:.0f} us, compiled {result['compiled_row_us']:.0f} us")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Convert the pickled models to XGBoost's native format.
+
+The pickles in ``models/`` are ``joblib.dump``-ed ``XGBClassifier`` objects:
+loading them runs arbitrary code and only works with the library versions
+that wrote them.  This writes each model as ``<name>.ubj`` (or ``.json``)
+with XGBoost's own ``save_model`` plus a ``<name>.meta.json`` sidecar with
+the feature order, the categorical encodings the model was trained on and a
+hash of the training data.  The registry prefers these files and falls back
+to the pickles.
+
+    python -m diagnosis.convert              # all models, UBJSON
+    python -m diagnosis.convert heart --format json
+"""
+import argparse
+import json
+import os
+
+from diagnosis.features import CATEGORICAL, FEATURE_COLUMNS, dataset_path
+from diagnosis.registry import MODEL_DIR, PICKLE_FILES, ModelRegistry, _sha256, metadata_path
+
+
+def _write_json(path, payload):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def build_metadata(disease, model, model_file, source=None, training_data=None):
+    """The sidecar contents for ``model``.  ``training_data`` (file, rows and
+    sha256) is counted and hashed from ``data/<disease>.csv`` unless given."""
+    import xgboost
+
+    if training_data is None:
+        data = dataset_path(disease)
+        with open(data, 'rb') as f:
+            rows = max(sum(1 for _ in f) - 1, 0)
+        training_data = {
+            'file': os.path.relpath(data, os.path.dirname(os.path.dirname(data))),
+            'rows': rows,
+            'sha256': _sha256(data),
+        }
+    metadata = {
+        'disease': disease,
+        'model_file': os.path.basename(model_file),
+        'format': os.path.splitext(model_file)[1].lstrip('.'),
+        'xgboost_version': xgboost.__version__,
+        'n_features': int(model.n_features_in_),
+        'feature_names': list(model.get_booster().feature_names or []),
+        'app_feature_order': FEATURE_COLUMNS[disease],
+        'categorical_encodings': CATEGORICAL.get(disease, {}),
+        'training_data': training_data,
+    }
+    if source is not None:
+        metadata['source'] = {'file': os.path.basename(source), 'sha256': _sha256(source)}
+    return metadata
+
+
+def save_native(disease, model, path, source=None, extra=None):
+    """Atomically write ``model`` and its sidecar; returns the metadata."""
+    metadata = build_metadata(disease, model, path, source)
+    metadata.update(extra or {})
+    _write_json(metadata_path(path), metadata)
+    # save_model picks the format from the extension, so keep it on the temp file
+    stem, ext = os.path.splitext(path)
+    tmp = f'{stem}.tmp{ext}'
+    model.save_model(tmp)
+    os.replace(tmp, path)
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert pickled models to XGBoost's native format.")
+    parser.add_argument('diseases', nargs='*', help="default: every model")
+    parser.add_argument('--format', choices=('ubj', 'json'), default='ubj')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    args = parser.parse_args(argv)
+
+    pickles = ModelRegistry(args.model_dir, files=PICKLE_FILES)
+    for disease in args.diseases or sorted(PICKLE_FILES):
+        source = pickles.path(disease)
+        model = pickles.get(disease)
+        out = os.path.splitext(source)[0] + '.' + args.format
+        save_native(disease, model, out, source=source)
+        print(f"{disease}: {os.path.basename(source)} -> {os.path.basename(out)} "
+              f"({os.path.getsize(out):,} bytes) + {os.path.basename(metadata_path(out))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,452 @@
+"""Streaming input-drift monitor.
+
+Every prediction folds its inputs into per-feature running statistics of
+constant size: Welford mean and variance, counts over fixed bins, and a
+uniform reservoir of rows from which quantiles are read.  Nothing else about
+a request is kept, and an update costs a few microseconds.
+
+The reservoir stands in for a quantile sketch such as KLL or t-digest: it
+is as small, needs no dependency and is trivially merged by the service's
+batches, but its error is statistical rather than bounded.  A quantile ``q``
+read from ``RESERVOIR`` (512) rows is off by about ``sqrt(q(1-q)/512)`` in
+rank, some 2 percentiles at the median and 1 at the 5th and 95th, and the
+reservoir says nothing about tails thinner than 1/512.  The quantiles are
+only shown on the Drift Monitor page; PSI, KS and the mean shift come from
+the exact bin counts and moments.
+
+Every ``DRIFT_INTERVAL`` seconds a daemon thread compares the statistics with
+a reference profile of ``data/<disease>.csv``.  PSI is taken over the bins,
+a KS-style distance over their cumulative proportions, and the mean shift in
+reference standard deviations.  The result goes to the Drift Monitor page, to
+the metrics export and to a compact JSON snapshot.
+
+    DRIFT_ENABLED       default 1
+    DRIFT_CACHE_DIR     reference profiles (default .cache/drift)
+    DRIFT_FILE          snapshot path (default DRIFT_CACHE_DIR/snapshot.json, '' = none)
+    DRIFT_INTERVAL      seconds between comparisons (default 60)
+    DRIFT_MIN_SAMPLES   observations needed before a disease is scored (default 100)
+
+Bins come from the reference: the distinct values of a feature with only a
+few of them, otherwise its deciles.  The first observation of a disease
+starts loading its profile on a background thread; until it is ready,
+observations wait in a short backlog, so no request reads the CSV.  Profiles
+are stored in ``DRIFT_CACHE_DIR`` per CSV hash, or built ahead of time with:
+
+    python -m diagnosis.drift                  # build the reference profiles
+    python -m diagnosis.drift heart new.csv    # drift of a CSV export against heart.csv
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from diagnosis import metrics
+from diagnosis.features import CONSTANT_COLUMNS, DATASETS, FEATURE_COLUMNS, dataset_path
+
+ENABLED = os.environ.get('DRIFT_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+CACHE_DIR = os.environ.get(
+    'DRIFT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'drift'),
+)
+DRIFT_FILE = os.environ.get('DRIFT_FILE', os.path.join(CACHE_DIR, 'snapshot.json'))
+DRIFT_INTERVAL = float(os.environ.get('DRIFT_INTERVAL', '60'))
+MIN_SAMPLES = int(os.environ.get('DRIFT_MIN_SAMPLES', '100'))
+
+BINS = 10
+# Features with at most this many distinct values get one bin per value
+DISCRETE_MAX = 10
+RESERVOIR = 512
+# Observations held per disease while its profile loads; later ones are dropped
+BACKLOG = 1000
+QUANTILES = (0.05, 0.5, 0.95)
+# The usual PSI reading: below 0.1 stable, above 0.25 a major shift
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+# Floor for empty bins, so PSI stays finite
+_EPSILON = 1e-4
+# Bump when what goes into a profile changes, so cached profiles are rebuilt
+PROFILE_VERSION = 3
+
+_monitors = {}
+_reports = {}
+# disease -> [(Monitor method, argument)] observed while its profile loads,
+# or None if the profile failed to load
+_backlog = {}
+_lock = threading.Lock()
+_thread = None
+
+
+def _profile_path(disease, data_hash):
+    return os.path.join(CACHE_DIR, f'{disease}-{data_hash[:16]}-v{PROFILE_VERSION}.json')
+
+
+def build_profile(disease, X=None):
+    """Reference bins, proportions, mean, std and quantiles of each feature of ``X``
+    (by default every row of ``data/<disease>.csv``)."""
+    import numpy as np
+
+    from diagnosis.features import load_dataset
+
+    X = np.asarray(load_dataset(disease) if X is None else X, dtype=np.float64)
+    features = []
+    for name, x in zip(FEATURE_COLUMNS[disease], X.T):
+        values = np.unique(x)
+        if len(values) <= DISCRETE_MAX:
+            edges = (values[:-1] + values[1:]) / 2
+        else:
+            edges = np.unique(np.quantile(x, np.linspace(0, 1, BINS + 1)[1:-1]))
+        # side='right' bins exactly like bisect.bisect_right in Monitor.update
+        counts = np.bincount(np.searchsorted(edges, x, side='right'), minlength=len(edges) + 1)
+        features.append({
+            'name': name,
+            'edges': edges.tolist(),
+            'expected': (counts / len(x)).tolist(),
+            'mean': float(x.mean()),
+            'std': float(x.std()),
+            'quantiles': np.quantile(x, QUANTILES).tolist(),
+        })
+    return {'disease': disease, 'rows': len(X), 'features': features}
+
+
+def load_profile(disease):
+    """The reference profile of ``data/<disease>.csv``, built and saved on first use."""
+    from diagnosis.registry import _sha256
+
+    data_hash = _sha256(dataset_path(disease))
+    path = _profile_path(disease, data_hash)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    profile = dict(build_profile(disease), data_sha256=data_hash)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(profile, f)
+    os.replace(tmp, path)
+    return profile
+
+
+class Monitor:
+    """Running statistics of one model's inputs, compared against ``profile``."""
+
+    def __init__(self, disease, profile):
+        self.disease = disease
+        self.profile = profile
+        self.names = [f['name'] for f in profile['features']]
+        self._edges = [f['edges'] for f in profile['features']]
+        self.n = 0
+        self.mean = [0.0] * len(self.names)
+        self.m2 = [0.0] * len(self.names)
+        self.counts = [[0] * (len(edges) + 1) for edges in self._edges]
+        self.reservoir = []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def update(self, features):
+        """Fold one feature vector in; O(features) time, no allocation beyond the reservoir."""
+        row = tuple(map(float, features))
+        with self._lock:
+            self.n = n = self.n + 1
+            mean, m2, counts = self.mean, self.m2, self.counts
+            for i, edges in enumerate(self._edges):
+                x = row[i]
+                delta = x - mean[i]
+                mean[i] += delta / n
+                m2[i] += delta * (x - mean[i])
+                counts[i][bisect.bisect_right(edges, x)] += 1
+            self._sample(row, n)
+
+    def update_many(self, X):
+        """Fold a batch of rows in, merging its moments with Chan's formula."""
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float64)
+        m = len(X)
+        if not m:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0).tolist()
+        batch_mean = batch_mean.tolist()
+        batch_counts = [
+            np.bincount(np.searchsorted(edges, X[:, i], side='right'), minlength=len(edges) + 1)
+            for i, edges in enumerate(self._edges)
+        ]
+        with self._lock:
+            n0 = self.n
+            n = n0 + m
+            for i in range(len(self.names)):
+                delta = batch_mean[i] - self.mean[i]
+                self.mean[i] += delta * m / n
+                self.m2[i] += batch_m2[i] + delta * delta * n0 * m / n
+                counts = self.counts[i]
+                for b, c in enumerate(batch_counts[i].tolist()):
+                    counts[b] += c
+            for k, row in enumerate(X.tolist(), start=n0 + 1):
+                self._sample(tuple(row), k)
+            self.n = n
+
+    def _sample(self, row, n):
+        # Algorithm R: after n rows each one is in the reservoir with equal probability
+        if len(self.reservoir) < RESERVOIR:
+            self.reservoir.append(row)
+        else:
+            j = self._random.randrange(n)
+            if j < RESERVOIR:
+                self.reservoir[j] = row
+
+    def report(self):
+        """Drift scores per feature against the reference profile."""
+        with self._lock:
+            n = self.n
+            mean = list(self.mean)
+            m2 = list(self.m2)
+            counts = [list(c) for c in self.counts]
+            reservoir = list(self.reservoir)
+
+        constants = CONSTANT_COLUMNS.get(self.disease, {})
+        features = {}
+        for i, ref in enumerate(self.profile['features']):
+            if ref['name'] in constants:
+                continue
+            std = math.sqrt(m2[i] / n) if n else 0.0
+            entry = {'mean': mean[i], 'std': std, 'ref_mean': ref['mean'], 'ref_std': ref['std']}
+            if n >= MIN_SAMPLES:
+                actual = [c / n for c in counts[i]]
+                entry['psi'] = sum(
+                    (a - e) * math.log(max(a, _EPSILON) / max(e, _EPSILON))
+                    for a, e in zip(actual, ref['expected'])
+                )
+                entry['ks'] = _ks(actual, ref['expected'])
+                entry['shift'] = (mean[i] - ref['mean']) / ref['std'] if ref['std'] else 0.0
+                column = sorted(row[i] for row in reservoir)
+                entry['quantiles'] = [column[min(len(column) - 1, int(q * len(column)))] for q in QUANTILES]
+                entry['ref_quantiles'] = ref['quantiles']
+                entry['status'] = status(entry['psi'])
+            else:
+                entry['status'] = 'warming up'
+            entry['actual'] = [c / n for c in counts[i]] if n else [0.0] * len(counts[i])
+            entry['expected'] = ref['expected']
+            entry['edges'] = ref['edges']
+            features[self.names[i]] = entry
+        return {
+            'disease': self.disease,
+            'n': n,
+            'reference_rows': self.profile['rows'],
+            'data_sha256': self.profile.get('data_sha256', ''),
+            'time': time.time(),
+            'features': features,
+        }
+
+
+def _ks(actual, expected):
+    # Largest gap between the two cumulative distributions at the bin edges
+    gap = cum_a = cum_e = 0.0
+    for a, e in zip(actual, expected):
+        cum_a += a
+        cum_e += e
+        gap = max(gap, abs(cum_a - cum_e))
+    return gap
+
+
+def status(psi):
+    if psi >= PSI_MAJOR:
+        return 'major'
+    if psi >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+def _load(disease):
+    try:
+        m = Monitor(disease, load_profile(disease))
+    except Exception:
+        # Not retried: the disease goes unmonitored until the process restarts
+        metrics.inc('errors', stage='drift_profile', disease=disease)
+        with _lock:
+            _backlog[disease] = None
+        return
+    with _lock:
+        _monitors[disease] = m
+        backlog = _backlog.pop(disease, [])
+        _start()
+    for update, arg in backlog:
+        update(m, arg)
+
+
+def monitor(disease):
+    """The monitor of ``disease``, or ``None`` while its profile loads on a
+    background thread, which the first call starts."""
+    m = _monitors.get(disease)
+    if m is None:
+        with _lock:
+            m = _monitors.get(disease)
+            start = m is None and disease not in _backlog
+            if start:
+                _backlog[disease] = []
+        if start:
+            threading.Thread(target=_load, args=(disease,), name=f'drift-profile-{disease}', daemon=True).start()
+    return m
+
+
+def _observe(disease, update, arg):
+    m = monitor(disease)
+    if m is not None:
+        update(m, arg)
+        return
+    with _lock:
+        m = _monitors.get(disease)
+        backlog = _backlog.get(disease)
+        if m is None and backlog is not None and len(backlog) < BACKLOG:
+            backlog.append((update, arg))
+            return
+    if m is not None:
+        update(m, arg)
+
+
+def observe(disease, features):
+    """Record the inputs of one prediction."""
+    if ENABLED:
+        _observe(disease, Monitor.update, features)
+
+
+def observe_many(disease, X):
+    """Record the inputs of a batch of predictions."""
+    if ENABLED:
+        _observe(disease, Monitor.update_many, X)
+
+
+def compare(save=True):
+    """Score every monitored disease now; writes ``DRIFT_FILE`` unless ``save`` is false."""
+    reports = {disease: m.report() for disease, m in list(_monitors.items())}
+    _reports.update(reports)
+    if save and DRIFT_FILE and reports:
+        try:
+            write_snapshot(DRIFT_FILE, reports)
+        except OSError:
+            metrics.inc('errors', stage='drift_snapshot')
+    return reports
+
+
+def reports():
+    """The reports of the last comparison."""
+    return dict(_reports)
+
+
+def snapshot(reports):
+    """A compact summary of ``reports``: per feature PSI, KS, mean shift and status."""
+    out = {'time': round(max(r['time'] for r in reports.values())), 'diseases': {}}
+    for disease, report in sorted(reports.items()):
+        features = {}
+        for name, f in report['features'].items():
+            if 'psi' in f:
+                features[name] = [round(f['psi'], 4), round(f['ks'], 4), round(f['shift'], 3), f['status']]
+            else:
+                features[name] = [None, None, None, f['status']]
+        out['diseases'][disease] = {
+            'n': report['n'], 'data': report['data_sha256'][:16], 'features': features}
+    return out
+
+
+def write_snapshot(path, reports):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(snapshot(reports), f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _loop():
+    while True:
+        time.sleep(DRIFT_INTERVAL)
+        compare()
+
+
+def _start():
+    # Called with _lock held
+    global _thread
+    if _thread is None and DRIFT_INTERVAL > 0:
+        _thread = threading.Thread(target=_loop, name='drift-monitor', daemon=True)
+        _thread.start()
+
+
+def _bin_labels(edges):
+    if not edges:
+        return ['all']
+    return ([f'< {edges[0]:g}'] + [f'{lo:g} to {hi:g}' for lo, hi in zip(edges, edges[1:])]
+            + [f'≥ {edges[-1]:g}'])
+
+
+def histogram_figure(name, feature):
+    """Grouped bars of the reference and live proportions in each bin of one feature."""
+    from diagnosis.charts import BACKGROUND
+
+    labels = _bin_labels(feature['edges'])
+    return {
+        'data': [
+            {'type': 'bar', 'x': labels, 'y': feature['expected'], 'name': 'Training data',
+             'marker': {'color': 'rgba(153,170,181,0.7)'}},
+            {'type': 'bar', 'x': labels, 'y': feature['actual'], 'name': 'Live inputs',
+             'marker': {'color': '#7289da'}},
+        ],
+        'layout': {
+            'title': f"{name}: share of inputs per bin", 'barmode': 'group',
+            'yaxis': {'tickformat': '.0%'}, 'xaxis': {'type': 'category'},
+            'paper_bgcolor': BACKGROUND, 'plot_bgcolor': BACKGROUND, 'font': {'color': 'white'},
+            'margin': {'l': 60, 'r': 20, 't': 50, 'b': 50},
+        },
+    }
+
+
+def _samples():
+    for disease, m in sorted(_monitors.items()):
+        yield 'drift_observations_total', 'counter', {'disease': disease}, m.n
+    # The text format wants every sample of a metric in one group
+    for metric, field in (('drift_psi', 'psi'), ('drift_ks', 'ks')):
+        for disease, report in sorted(_reports.items()):
+            for name, f in report['features'].items():
+                if field in f:
+                    yield metric, 'gauge', {'disease': disease, 'feature': name}, round(f[field], 6)
+
+
+metrics.add_collector(_samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build drift reference profiles, or score a CSV export's drift.")
+    parser.add_argument('disease', nargs='?', choices=sorted(DATASETS), help="default: build every profile")
+    parser.add_argument('csv', nargs='?', help="CSV export in the data/<disease>.csv layout")
+    args = parser.parse_args(argv)
+
+    if args.csv is None:
+        for disease in [args.disease] if args.disease else sorted(DATASETS):
+            start = time.perf_counter()
+            profile = load_profile(disease)
+            print(f"{disease}: {profile['rows']:,} reference rows, {len(profile['features'])} features "
+                  f"in {time.perf_counter() - start:.2f} s")
+        return
+
+    import pandas as pd
+
+    from diagnosis.features import encode_frame
+
+    if args.disease is None:
+        parser.error("a CSV needs a disease")
+    m = Monitor(args.disease, load_profile(args.disease))
+    for chunk in pd.read_csv(args.csv, chunksize=10000):
+        m.update_many(encode_frame(args.disease, chunk))
+    report = m.report()
+    print(f"{args.disease}: {report['n']:,} rows against {report['reference_rows']:,} reference rows")
+    print(f"{'feature':<26} {'PSI':>7} {'KS':>6} {'shift':>7}  status")
+    for name, f in report['features'].items():
+        if 'psi' in f:
+            print(f"{name:<26} {f['psi']:7.3f} {f['ks']:6.3f} {f['shift']:+7.2f}  {f['status']}")
+        else:
+            print(f"{name:<26} {'':>7} {'':>6} {'':>7}  {f['status']}")
+
+
+if __name__ == '__main__':
+    main()
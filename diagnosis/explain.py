@@ -0,0 +1,214 @@
+"""Per-prediction feature attributions from XGBoost's own ``pred_contribs``.
+
+The booster computes exact TreeSHAP values natively, in well under a
+millisecond for one row, so no generic explainer is needed.  Results are
+memoized in a bounded LRU keyed by disease, model version and the encoded
+feature vector.  Misses are computed on a single background thread, so a
+page can show its verdict first and fill in the bar chart when the future
+resolves.
+
+The reference distribution is every row of ``data/*.csv`` explained by the
+same model.  It is computed on first use (also in the background), kept
+per model version, and saved under ``ATTRIBUTION_CACHE_DIR`` (default
+``.cache/attributions``):
+
+    python -m diagnosis.explain        # precompute the reference files
+
+Compiled models (``SERVING_MODE=compiled``) carry no booster, so they have
+no attributions.
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from diagnosis.cache import LRUCache
+from diagnosis.charts import BACKGROUND
+
+CACHE_SIZE = int(os.environ.get('ATTRIBUTION_CACHE_SIZE', '4096'))
+REFERENCE_DIR = os.environ.get(
+    'ATTRIBUTION_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'attributions'),
+)
+# Bump when the rows the reference is computed on change, so cached ones are rebuilt
+REFERENCE_VERSION = 3
+# How long a page waits for its bar chart before giving up for this rerun
+WAIT_SECONDS = 2.0
+
+_cache = LRUCache(CACHE_SIZE)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explain')
+_pending = {}
+_references = {}
+_lock = threading.Lock()
+
+
+def supported(model):
+    return hasattr(model, 'get_booster')
+
+
+def contributions(model, X):
+    """``(rows, features + 1)`` log-odds contributions; the last column is the bias."""
+    import numpy as np
+    from xgboost import DMatrix
+
+    booster = model.get_booster()
+    data = DMatrix(np.asarray(X, dtype=np.float32), feature_names=booster.feature_names)
+    return booster.predict(data, pred_contribs=True)
+
+
+def _submit(key, fn, *args):
+    # One in-flight computation per key; later callers share its future
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = _executor.submit(_run, key, fn, *args)
+        return future
+
+
+def _run(key, fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _explain_row(key, model, row):
+    values = contributions(model, row[None])[0]
+    _cache.put(key, values)
+    return values
+
+
+def explain(registry, disease, features):
+    """Future for the attributions of ``features``, or ``None`` if the model has none."""
+    import numpy as np
+
+    entry = registry.entry(disease)
+    if not supported(entry.model):
+        return None
+    # A copy: pages encode into a row they reuse, and this one is read later
+    row = np.array(features, dtype=np.float32)
+    key = (disease, entry.version, row.tobytes())
+    values = _cache.get(key)
+    if values is not None:
+        return _done(values)
+    return _submit(key, _explain_row, key, entry.model, row)
+
+
+def wait(future, timeout=WAIT_SECONDS):
+    """The future's attributions, or ``None`` if they are not ready within ``timeout``."""
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        return None
+
+
+def _reference_path(disease, version):
+    return os.path.join(REFERENCE_DIR, f'{disease}-{version}-v{REFERENCE_VERSION}.npy')
+
+
+def _load_reference(disease, version, model):
+    import numpy as np
+
+    from diagnosis.features import load_dataset
+
+    path = _reference_path(disease, version)
+    if os.path.exists(path):
+        values = np.load(path)
+    else:
+        values = contributions(model, load_dataset(disease))
+        os.makedirs(REFERENCE_DIR, exist_ok=True)
+        tmp = path[:-len('.npy')] + '.tmp.npy'
+        np.save(tmp, values)
+        os.replace(tmp, path)
+    summary = {
+        'p5': np.percentile(values, 5, axis=0),
+        'p50': np.percentile(values, 50, axis=0),
+        'p95': np.percentile(values, 95, axis=0),
+        'mean_abs': np.abs(values).mean(axis=0),
+        'rows': len(values),
+    }
+    _references[(disease, version)] = summary
+    return summary
+
+
+def reference(registry, disease, block=False):
+    """Percentiles of every dataset row's attributions, or ``None`` while they compute."""
+    entry = registry.entry(disease)
+    if not supported(entry.model):
+        return None
+    summary = _references.get((disease, entry.version))
+    if summary is not None:
+        return summary
+    future = _submit(('reference', disease, entry.version),
+                     _load_reference, disease, entry.version, entry.model)
+    return future.result() if block else None
+
+
+def stats():
+    return dict(_cache.stats(), pending=len(_pending))
+
+
+def figure(labels, values, summary=None, columns=None):
+    """Horizontal bar chart of the user's contributions, with the reference 5-95% band.
+
+    ``columns`` are the positions in ``values`` that ``labels`` name (default:
+    the first ``len(labels)``); the other features are left out.
+    """
+    columns = range(len(labels)) if columns is None else columns
+    order = sorted(columns, key=lambda i: abs(values[i]))
+    names = [labels[columns.index(i)] for i in order]
+    data = []
+    if summary is not None:
+        data.append({
+            'type': 'bar', 'orientation': 'h', 'y': names,
+            'base': [float(summary['p5'][i]) for i in order],
+            'x': [float(summary['p95'][i] - summary['p5'][i]) for i in order],
+            'name': f"Typical (5-95%, {summary['rows']:,} patients)",
+            'marker': {'color': 'rgba(153,170,181,0.3)'}, 'hoverinfo': 'skip',
+        })
+    data.append({
+        'type': 'bar', 'orientation': 'h', 'y': names, 'x': [float(values[i]) for i in order],
+        'name': 'You', 'marker': {'color': ['#e74c3c' if values[i] > 0 else '#2ecc71' for i in order]},
+    })
+    return {
+        'data': data,
+        'layout': {
+            'title': "What pushed your risk up (red) or down (green)", 'barmode': 'overlay',
+            'xaxis': {'title': 'Contribution to risk (log-odds)', 'zeroline': True},
+            'paper_bgcolor': BACKGROUND, 'plot_bgcolor': BACKGROUND, 'font': {'color': 'white'},
+            'height': 120 + 28 * len(labels), 'margin': {'l': 100, 'r': 20, 't': 50, 'b': 50},
+            'legend': {'orientation': 'h', 'y': -0.25},
+        },
+    }
+
+
+def main(argv=None):
+    from diagnosis.registry import MODEL_FILES, get_registry
+
+    parser = argparse.ArgumentParser(description="Precompute reference attributions for data/*.csv.")
+    parser.add_argument('diseases', nargs='*', help="default: every model")
+    args = parser.parse_args(argv)
+
+    registry = get_registry()
+    for disease in args.diseases or sorted(MODEL_FILES):
+        start = time.perf_counter()
+        summary = reference(registry, disease, block=True)
+        if summary is None:
+            print(f"{disease}: this model has no attributions (compiled serving mode?)")
+            continue
+        names = registry.get(disease).get_booster().feature_names
+        top = sorted(zip(summary['mean_abs'], names), reverse=True)[:3]
+        print(f"{disease}: {summary['rows']:,} rows in {time.perf_counter() - start:.2f} s; "
+              f"largest mean |contribution|: " + ", ".join(f"{n} {v:.2f}" for v, n in top))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Feature layouts shared by the app pages and the offline tools.
+
+Each page builds its feature vector in its model's training column order and
+encodes the heart categoricals with the maps below.  Anything that scores rows from
+``data/*.csv`` goes through ``encode_frame()`` so it sees exactly the vectors
+a page would send.
+"""
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+DATASETS = {
+    'diabetes': 'diabetes.csv',
+    'hypertension': 'hypertension.csv',
+    'heart': 'heart.csv',
+}
+
+# CSV columns in the order the models were trained on, which is the order the
+# pages assemble their feature vectors in
+FEATURE_COLUMNS = {
+    'diabetes': [
+        'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+        'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age',
+    ],
+    'hypertension': [
+        'Unnamed: 0', 'Age', 'Gender', 'Medical_History', 'Smoking',
+        'BMI', 'Sporting', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate',
+    ],
+    'heart': [
+        'Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS',
+        'RestingECG', 'MaxHR', 'ExerciseAngina', 'Oldpeak', 'ST_Slope',
+    ],
+}
+
+# Model inputs that carry no information about a patient, and the value sent
+# for them.  The hypertension notebook trained on the CSV's unnamed row index;
+# the model never splits on it.
+CONSTANT_COLUMNS = {
+    'hypertension': {'Unnamed: 0': 0},
+}
+
+# Heart Disease page encodings, keyed by the labels shown in the selectboxes
+# (in display order).  The codes are the heart notebook's LabelEncoder codes,
+# i.e. each value's position among the sorted data/heart.csv codes below;
+# that is what the model was trained on, and diagnosis.train uses them too.
+SEX_MAP = {"Female": 0, "Male": 1}
+SLOPE_MAP = {"Up": 2, "Flat": 1, "Down": 0}
+CP_MAP = {"Typical Angina": 3, "Atypical Angina": 1, "Non-anginal": 2, "Asymptomatic": 0}
+ECG_MAP = {"Normal": 1, "ST-T abnormality": 2, "Left ventricular hypertrophy": 0}
+ANGINA_MAP = {"No": 0, "Yes": 1}
+
+# The same encodings keyed by the codes used in data/heart.csv
+CATEGORICAL = {
+    'heart': {
+        'Sex': {'F': SEX_MAP["Female"], 'M': SEX_MAP["Male"]},
+        'ChestPainType': {
+            'TA': CP_MAP["Typical Angina"],
+            'ATA': CP_MAP["Atypical Angina"],
+            'NAP': CP_MAP["Non-anginal"],
+            'ASY': CP_MAP["Asymptomatic"],
+        },
+        'RestingECG': {
+            'Normal': ECG_MAP["Normal"],
+            'ST': ECG_MAP["ST-T abnormality"],
+            'LVH': ECG_MAP["Left ventricular hypertrophy"],
+        },
+        'ExerciseAngina': {'N': ANGINA_MAP["No"], 'Y': ANGINA_MAP["Yes"]},
+        'ST_Slope': {'Up': SLOPE_MAP["Up"], 'Flat': SLOPE_MAP["Flat"], 'Down': SLOPE_MAP["Down"]},
+    },
+}
+
+
+def dataset_path(disease):
+    return os.path.join(DATA_DIR, DATASETS[disease])
+
+
+def input_columns(disease):
+    """The CSV columns a file to score must have: the features minus the constants."""
+    constants = CONSTANT_COLUMNS.get(disease, {})
+    return [c for c in FEATURE_COLUMNS[disease] if c not in constants]
+
+
+def encode_frame(disease, df):
+    """Encode a DataFrame in the CSV layout into a float32 feature matrix.
+
+    Constant columns get their constant, whether or not ``df`` has them.
+    Raises ``ValueError`` if a feature column is missing or a categorical
+    column holds a code the page encodings do not know.
+    """
+    import numpy as np
+
+    missing = [c for c in input_columns(disease) if c not in df.columns]
+    if missing:
+        raise ValueError(f"{disease}: missing columns {missing}")
+
+    columns = FEATURE_COLUMNS[disease]
+    constants = CONSTANT_COLUMNS.get(disease, {})
+    maps = CATEGORICAL.get(disease, {})
+    out = np.empty((len(df), len(columns)), dtype=np.float32)
+    for i, column in enumerate(columns):
+        if column in constants:
+            out[:, i] = constants[column]
+            continue
+        values = df[column]
+        if column in maps:
+            encoded = values.map(maps[column])
+            if encoded.isna().any():
+                unknown = sorted(set(values[encoded.isna()].astype(str)))
+                raise ValueError(f"{disease}: unknown {column} values {unknown}")
+            values = encoded
+        out[:, i] = values.to_numpy(dtype=np.float32)
+    return out
+
+
+def load_dataset(disease):
+    """Return the encoded feature matrix for every row of ``data/<disease>.csv``."""
+    import pandas as pd
+    return encode_frame(disease, pd.read_csv(dataset_path(disease)))
@@ -0,0 +1,266 @@
+"""Append-only history of every prediction, in SQLite.
+
+A prediction is recorded with its disease, encoded features (page order),
+probability, model version, source and timestamp.  ``record()`` only puts a
+tuple on an in-memory queue.  A daemon thread drains the queue in batches of
+up to ``BATCH_SIZE`` rows, one transaction per batch, into a database in WAL
+mode, so a Predict click never waits on disk and readers never block the
+writer.  Rows are never updated or deleted.
+
+    HISTORY_ENABLED   default 1
+    HISTORY_DB        database path (default .cache/history.sqlite3)
+
+Queries filter on disease, time range and risk band, all covered by
+``(disease, ts)`` and ``(disease, probability)`` indexes.
+"""
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from diagnosis import metrics
+from diagnosis.features import FEATURE_COLUMNS
+
+ENABLED = os.environ.get('HISTORY_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+HISTORY_DB = os.environ.get('HISTORY_DB', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'history.sqlite3'))
+
+BATCH_SIZE = 1000
+# Records waiting beyond this are dropped (and counted) rather than held in memory
+QUEUE_SIZE = 100000
+
+# Risk bands offered by the History page, as (low, high] probabilities, so
+# 'high' is exactly what inference.predict calls positive (p > 0.5)
+RISK_BANDS = {
+    'low': (-1.0, 0.3),
+    'medium': (0.3, 0.5),
+    'high': (0.5, 1.0),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    disease TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    source TEXT NOT NULL,
+    probability REAL NOT NULL,
+    prediction INTEGER NOT NULL,
+    features TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_disease_ts ON predictions (disease, ts);
+CREATE INDEX IF NOT EXISTS predictions_disease_probability ON predictions (disease, probability);
+CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts);
+"""
+_INSERT = ("INSERT INTO predictions (ts, disease, model_version, source, probability, prediction, features) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?)")
+_COLUMNS = ('id', 'ts', 'disease', 'model_version', 'source', 'probability', 'prediction', 'features')
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        # The directory, WAL mode and schema are set up by the writer thread or
+        # the first query, so creating the store touches no disk
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+
+    def _prepare(self):
+        with self._prepare_lock:
+            if not self._prepared:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with closing(self._connect()) as conn:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.executescript(_SCHEMA)
+                self._prepared = True
+
+    def _reader(self):
+        self._prepare()
+        return closing(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL makes NORMAL durable against application crashes; only an OS
+        # crash can lose the last transactions
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def record(self, disease, features, probability, version, source='page'):
+        """Queue one prediction for writing; never blocks."""
+        self._put((time.time(), disease, version, source, (features,), (probability,)))
+
+    def record_many(self, disease, X, probabilities, version, source='service'):
+        """Queue a batch of predictions (rows of ``X``) as one item."""
+        self._put((time.time(), disease, version, source, X, probabilities))
+
+    def _put(self, item):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += len(item[4])
+            metrics.inc('errors', stage='history')
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            self._prepare()
+            conn = self._connect()
+        except (OSError, sqlite3.Error):
+            # Nothing can be written; what arrives is counted as dropped
+            metrics.inc('errors', stage='history')
+            conn = None
+        while True:
+            batch = [self._queue.get()]
+            rows = sum(len(item[4]) for item in batch)
+            while rows < BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[4])
+            try:
+                if conn is None:
+                    self.dropped += rows
+                else:
+                    self._write(conn, batch)
+            except sqlite3.Error:
+                metrics.inc('errors', stage='history')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn, batch):
+        rows = []
+        for ts, disease, version, source, X, probabilities in batch:
+            if hasattr(X, 'tolist'):
+                X = X.tolist()
+            for features, p in zip(X, probabilities):
+                p = float(p)
+                rows.append((ts, disease, version, source, p, int(p > 0.5),
+                             json.dumps([float(x) for x in features])))
+        with conn:
+            conn.executemany(_INSERT, rows)
+        self.written += len(rows)
+
+    def flush(self):
+        """Wait until everything recorded so far is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _where(self, disease=None, since=None, until=None, band=None):
+        clauses, params = [], []
+        if disease:
+            clauses.append('disease = ?')
+            params.append(disease)
+        if since is not None:
+            clauses.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('ts < ?')
+            params.append(until)
+        if band:
+            low, high = RISK_BANDS[band]
+            clauses.append('probability > ? AND probability <= ?')
+            params += [low, high]
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self._reader() as conn:
+            return conn.execute('SELECT COUNT(*) FROM predictions' + where, params).fetchone()[0]
+
+    def query(self, limit=500, **filters):
+        """The newest matching predictions as dicts, ``features`` decoded."""
+        where, params = self._where(**filters)
+        with self._reader() as conn:
+            cursor = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM predictions{where} ORDER BY ts DESC, id DESC LIMIT ?",
+                params + [limit])
+            rows = [dict(zip(_COLUMNS, row)) for row in cursor]
+        for row in rows:
+            row['features'] = json.loads(row['features'])
+        return rows
+
+    def export_csv(self, f, **filters):
+        """Write every matching prediction to the text file ``f``, oldest first.
+
+        With a ``disease`` filter the features get their CSV column names,
+        otherwise they stay one JSON array per row.  Returns the row count.
+        """
+        where, params = self._where(**filters)
+        disease = filters.get('disease')
+        columns = FEATURE_COLUMNS[disease] if disease else ['features']
+        writer = csv.writer(f)
+        writer.writerow(['time', 'disease', 'model_version', 'source', 'probability', 'prediction'] + columns)
+        n = 0
+        with self._reader() as conn:
+            cursor = conn.execute(
+                'SELECT ts, disease, model_version, source, probability, prediction, features '
+                f'FROM predictions{where} ORDER BY ts, id', params)
+            for ts, disease_, version, source, p, prediction, features in cursor:
+                values = json.loads(features) if disease else [features]
+                stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts))
+                writer.writerow([stamp, disease_, version, source, p, prediction] + values)
+                n += 1
+        return n
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store at ``HISTORY_DB``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
+
+
+def record(disease, features, probability, version, source='page'):
+    if ENABLED:
+        get_store().record(disease, features, probability, version, source)
+
+
+def record_many(disease, X, probabilities, version, source='service'):
+    if ENABLED:
+        get_store().record_many(disease, X, probabilities, version, source)
+
+
+def _samples():
+    if _store is None:
+        return
+    info = _store.stats()
+    yield 'history_written_total', 'counter', {}, info['written']
+    yield 'history_dropped_total', 'counter', {}, info['dropped']
+    yield 'history_queue_depth', 'gauge', {}, info['queued']
+
+
+metrics.add_collector(_samples)
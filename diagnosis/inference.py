@@ -0,0 +1,83 @@
+"""Predictions through a cache shared by every session.
+
+Many sessions submit the same vectors, above all the form defaults.  Each
+answer is cached under ``(disease, model version, feature tuple)``.  The
+version is the model file's hash, so a retrained model can never answer
+from its predecessor's entries.  When the registry swaps a model in, that
+disease's entries are purged too, so they do not sit in the cache until
+evicted.
+
+    PREDICTION_CACHE_SIZE   entries kept (default 10000, 0 disables the cache)
+    PREDICTION_CACHE_TTL    seconds an entry lives (default 3600, 0 = no expiry)
+
+Hit, miss, eviction and expiry counters are exported with the other metrics.
+Every answer is also handed to ``diagnosis.shadow`` for any candidate models.
+"""
+import os
+from array import array
+
+from diagnosis import metrics
+from diagnosis.cache import LRUCache
+
+CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
+
+_cache = LRUCache(CACHE_SIZE, CACHE_TTL or None)
+_watched = set()
+
+
+def _flush(disease, entry):
+    _cache.purge(lambda key: key[0] == disease)
+
+
+def predict_proba(registry, disease, features, source='page'):
+    """Probability of the positive class for one feature vector.
+
+    Every call, cached or not, is recorded in the drift monitor and the
+    prediction history under ``source``.
+    """
+    # Imported here: sqlite3 and the drift and shadow machinery are not
+    # needed until the first prediction, and the Home page imports this module
+    from diagnosis import drift, history, shadow
+
+    # Values are rounded to float32, what the model computes in, so the same
+    # inputs make the same key whether they come as a float32 row (the pages),
+    # a float64 array or a list of Python numbers.  A float32 row is taken as is.
+    is_row = getattr(features, 'dtype', None) == 'float32'
+    row = tuple(features.tolist() if is_row else array('f', features).tolist())
+    drift.observe(disease, row)
+    entry = registry.entry(disease)
+    X = features[None] if is_row else [row]
+    if not CACHE_SIZE:
+        probability = float(entry.model.predict_proba(X)[0, 1])
+    else:
+        key = (disease, entry.version, row)
+        probability = _cache.get(key)
+        if probability is None:
+            if id(registry) not in _watched:
+                _watched.add(id(registry))
+                registry.add_listener(_flush)
+            probability = float(entry.model.predict_proba(X)[0, 1])
+            _cache.put(key, probability)
+    history.record(disease, row, probability, entry.version, source)
+    shadow.submit(disease, row, (probability,), entry)
+    return probability
+
+
+def predict(registry, disease, features, source='page'):
+    """0/1 prediction, thresholded at 0.5 like ``XGBClassifier.predict``."""
+    return int(predict_proba(registry, disease, features, source) > 0.5)
+
+
+def stats():
+    return _cache.stats()
+
+
+def _samples():
+    info = _cache.stats()
+    for name in ('hits', 'misses', 'evictions', 'expirations'):
+        yield f'prediction_cache_{name}_total', 'counter', {}, info[name]
+    yield 'prediction_cache_entries', 'gauge', {}, info['size']
+
+
+metrics.add_collector(_samples)
@@ -0,0 +1,112 @@
+"""Load generator for ``diagnosis.service``.
+
+Opens ``--concurrency`` keep-alive connections, each sending single-row
+``/predict/<disease>`` requests (rows drawn from ``data/<disease>.csv``) back
+to back for ``--duration`` seconds, then reports throughput and latency
+percentiles along with the service's batch-size histogram.
+
+    python -m diagnosis.service &
+    python -m diagnosis.loadgen heart --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from diagnosis.features import FEATURE_COLUMNS, load_dataset
+
+
+async def _request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: loadgen\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = header.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(host, port, path, rows, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, 'POST', path, {'features': random.choice(rows)})
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(host, port, disease, concurrency, duration):
+    rows = load_dataset(disease).tolist()
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, f'/predict/{disease}', rows, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await _request(reader, writer, 'GET', '/stats')
+    writer.close()
+
+    latencies.sort()
+    return {
+        'disease': disease,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'service': stats.get('batchers', {}).get(disease, {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive diagnosis.service with concurrent single-row requests.")
+    parser.add_argument('disease', choices=sorted(FEATURE_COLUMNS))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds (default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="print the raw result as JSON")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.host, args.port, args.disease, args.concurrency, args.duration))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['requests']:,} requests in {result['seconds']:.1f} s with {args.concurrency} clients "
+          f"({result['errors']} errors)")
+    print(f"throughput {result['throughput_rps']:,.0f} req/s, "
+          f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    histogram = result['service'].get('batch_size_histogram', {})
+    if histogram:
+        print("batch sizes: " + ", ".join(f"{k.replace('le_', '<=')}: {v}" for k, v in histogram.items()))
+
+
+if __name__ == '__main__':
+    main()
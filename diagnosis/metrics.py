@@ -0,0 +1,225 @@
+"""Per-stage latency metrics for the app, exported in Prometheus text format.
+
+Off unless ``METRICS_ENABLED=1``; while off, ``timer()`` hands back one shared
+no-op object, so instrumented code pays a function call and nothing else.
+When on, each (stage, disease) pair keeps a count, a sum and a bounded
+window of recent samples for p50/p95/p99.  Export goes to
+
+* ``METRICS_FILE=/path/metrics.prom`` - rewritten at most every
+  ``METRICS_FILE_INTERVAL`` seconds (default 5) from ``flush()``, and/or
+* ``METRICS_PORT=9464`` - a ``/metrics`` endpoint on a daemon thread, bound
+  to ``METRICS_HOST`` (default 127.0.0.1; ``0.0.0.0`` exposes it on every
+  interface).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes', 'on')
+METRICS_FILE = os.environ.get('METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.environ.get('METRICS_FILE_INTERVAL', '5'))
+METRICS_PORT = os.environ.get('METRICS_PORT')
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 2048
+
+_lock = threading.Lock()
+_summaries = {}
+_counters = {}
+_collectors = []
+
+
+class _Summary:
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=WINDOW)
+
+
+def observe(stage, seconds, disease=''):
+    """Record one ``seconds`` sample for ``stage``."""
+    key = (stage, disease)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            summary = _summaries[key] = _Summary()
+        summary.count += 1
+        summary.total += seconds
+        summary.samples.append(seconds)
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to the counter ``name`` with ``labels``."""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class _Timer:
+    __slots__ = ('stage', 'disease', 'start')
+
+    def __init__(self, stage, disease):
+        self.stage = stage
+        self.disease = disease
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        if exc_type is not None:
+            inc('errors', disease=self.disease, stage=self.stage)
+        return False
+
+    def stop(self, disease=None):
+        if disease is not None:
+            self.disease = disease
+        observe(self.stage, time.perf_counter() - self.start, self.disease)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def stop(self, disease=None):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(stage, disease=''):
+    """Time a block: ``with timer('predict', 'heart'): ...``.
+
+    Also usable as a stopwatch, ``t = timer('rerun'); ...; t.stop(disease)``.
+    Exceptions leaving the block count towards ``errors_total``.
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(stage, disease)
+
+
+def add_collector(fn):
+    """Export samples owned by another module: ``fn()`` yields
+    ``(name, type, labels, value)`` and is only called at export time."""
+    _collectors.append(fn)
+
+
+def _quantile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}' if pairs else ''
+
+
+def export_text():
+    """Current metrics in the Prometheus text exposition format."""
+    from diagnosis.registry import _rss_bytes, get_registry
+
+    with _lock:
+        summaries = {k: (s.count, s.total, sorted(s.samples)) for k, s in _summaries.items()}
+        counters = dict(_counters)
+
+    lines = [
+        '# HELP diagnosis_stage_seconds Time spent per app stage and disease.',
+        '# TYPE diagnosis_stage_seconds summary',
+    ]
+    for (stage, disease), (count, total, samples) in sorted(summaries.items()):
+        labels = [('disease', disease), ('stage', stage)]
+        for q in QUANTILES:
+            lines.append(f'diagnosis_stage_seconds{_labels(labels + [("quantile", q)])} '
+                         f'{_quantile(samples, q):.6f}')
+        lines.append(f'diagnosis_stage_seconds_sum{_labels(labels)} {total:.6f}')
+        lines.append(f'diagnosis_stage_seconds_count{_labels(labels)} {count}')
+
+    names = sorted({name for name, _ in counters})
+    for name in names:
+        lines.append(f'# TYPE diagnosis_{name}_total counter')
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f'diagnosis_{name}_total{_labels(labels)} {value}')
+
+    lines += [
+        '# TYPE process_resident_memory_bytes gauge',
+        f'process_resident_memory_bytes {_rss_bytes()}',
+        '# TYPE diagnosis_model_rss_delta_bytes gauge',
+    ]
+    models = get_registry().stats()
+    for disease, info in models.items():
+        lines.append(f'diagnosis_model_rss_delta_bytes{{disease="{disease}"}} {info["rss_delta_bytes"]}')
+    lines.append('# TYPE diagnosis_model_load_seconds gauge')
+    for disease, info in models.items():
+        lines.append(f'diagnosis_model_load_seconds{{disease="{disease}"}} {info["load_ms"] / 1000:.6f}')
+
+    typed = set()
+    for collect in _collectors:
+        for name, kind, labels, value in collect():
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE diagnosis_{name} {kind}')
+            lines.append(f'diagnosis_{name}{_labels(sorted(labels.items()))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+_last_flush = 0.0
+
+
+def flush(force=False):
+    """Write ``METRICS_FILE`` if it is configured and the interval has passed."""
+    global _last_flush
+    if not ENABLED or not METRICS_FILE:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < METRICS_FILE_INTERVAL:
+        return
+    _last_flush = now
+    tmp = METRICS_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(export_text())
+    os.replace(tmp, METRICS_FILE)
+
+
+_server = None
+
+
+def start_exporter():
+    """Serve ``/metrics`` on ``METRICS_HOST:METRICS_PORT`` once per process."""
+    global _server
+    if not ENABLED or not METRICS_PORT or _server is not None:
+        return
+    with _lock:
+        if _server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = export_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((METRICS_HOST, int(METRICS_PORT)), Handler)
+        threading.Thread(target=_server.serve_forever, name='metrics-exporter', daemon=True).start()
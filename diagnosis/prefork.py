@@ -0,0 +1,455 @@
+"""Pre-forked multi-worker deployment.
+
+One Python process runs on one core at a time, and every independent
+replica imports xgboost, matplotlib and Streamlit and loads the three
+models itself.  Here a parent process does all of that once: it imports the
+app's modules, loads and warms every model, then calls ``gc.freeze()`` and
+forks ``--workers`` children.  The children share those pages copy-on-write
+(the frozen objects are never touched by the cyclic GC, which would
+otherwise dirty, and so copy, every page holding one).
+
+    python -m diagnosis.prefork service --workers 4 --port 8600
+        The scoring service.  The parent binds the port and every worker
+        accepts on the inherited socket, so the kernel spreads connections.
+
+    python -m diagnosis.prefork streamlit --workers 4 --port 8501
+        The Streamlit app.  Worker ``i`` listens on ``port + i``.  A session
+        keeps its state in one worker, so put a load balancer with sticky
+        sessions in front, for example nginx ``ip_hash`` over the ports.
+
+The parent restarts workers that exit, ready workers that stop sending
+heartbeats for ``3 * HEARTBEAT`` seconds, and workers that send none within
+``STARTUP_TIMEOUT`` seconds of starting.  It serves
+``--admin-port`` (default ``port + 100``):
+
+    GET /healthz   200 while the parent runs, with each worker's state
+    GET /readyz    200 once every worker is ready, else 503
+    GET /workers   per-worker pid, state, restarts and RSS/PSS/shared memory
+
+PSS divides each shared page among the processes mapping it, so the sum of
+``pss_mb`` is the deployment's real memory; the sum of ``rss_mb`` counts
+shared pages once per worker.  Linux only (``fork``, ``/proc``).
+"""
+import argparse
+import gc
+import importlib
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# libgomp's thread pool does not survive fork, and N workers each starting
+# one thread per core would oversubscribe the machine anyway
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+
+# Seconds between worker heartbeats
+HEARTBEAT = 2.0
+STALE = 3 * HEARTBEAT
+# Seconds a new worker has to send its first heartbeat
+STARTUP_TIMEOUT = 60.0
+# A worker that exits sooner than this after starting, or before it was ever
+# ready, is restarted after a delay that doubles with each such exit in a
+# row, up to MAX_RESTART_DELAY
+MIN_UPTIME = 5.0
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+
+# What the Streamlit app imports, lazily or not
+STREAMLIT_MODULES = (
+    'streamlit', 'streamlit.web.bootstrap', 'diagnosis.charts', 'diagnosis.explain',
+    'diagnosis.whatif', 'diagnosis.screening', 'diagnosis.inference', 'diagnosis.history',
+    'diagnosis.drift', 'diagnosis.specs',
+)
+SERVICE_MODULES = ('diagnosis.service',)
+
+
+def memory(pid):
+    """RSS, PSS, shared and private memory of ``pid`` in MB (``/proc/<pid>/smaps_rollup``)."""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return {}
+
+    def mb(kb):
+        return round(kb / 1024, 1)
+
+    return {
+        'rss_mb': mb(fields.get('Rss', 0)),
+        'pss_mb': mb(fields.get('Pss', 0)),
+        'shared_mb': mb(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)),
+        'private_mb': mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)),
+    }
+
+
+def preload(app):
+    """Import, load and warm everything the workers will use, then freeze it."""
+    for name in STREAMLIT_MODULES if app == 'streamlit' else SERVICE_MODULES:
+        importlib.import_module(name)
+    from diagnosis.registry import get_registry
+    registry = get_registry()
+    for disease in sorted(registry.files):
+        registry.get(disease)
+    if app == 'streamlit':
+        from diagnosis.charts import get_chart
+        from diagnosis.specs import SPECS
+        for spec in SPECS.values():
+            get_chart(spec.key, spec.labels, spec.healthy)
+    gc.collect()
+    gc.freeze()
+
+
+def _per_worker(index):
+    # Files and ports every process would otherwise fight over get a worker suffix
+    from diagnosis import drift, metrics, shadow
+    if metrics.METRICS_PORT:
+        metrics.METRICS_PORT = str(int(metrics.METRICS_PORT) + index)
+    if metrics.METRICS_FILE:
+        metrics.METRICS_FILE = f'{metrics.METRICS_FILE}.{index}'
+    if drift.DRIFT_FILE:
+        stem, ext = os.path.splitext(drift.DRIFT_FILE)
+        drift.DRIFT_FILE = f'{stem}.{index}{ext}'
+    if shadow.SHADOW_FILE:
+        stem, ext = os.path.splitext(shadow.SHADOW_FILE)
+        shadow.SHADOW_FILE = f'{stem}.{index}{ext}'
+
+
+def _run_service(sock, beat, window, max_batch):
+    import asyncio
+
+    from diagnosis.service import ScoringService
+
+    service = ScoringService(window=window, max_batch=max_batch)
+
+    async def heartbeat():
+        # Sent from the event loop, so a blocked loop stops the heartbeat
+        while True:
+            beat()
+            await asyncio.sleep(HEARTBEAT)
+
+    async def serve():
+        server = await asyncio.start_server(service.handle, sock=sock, backlog=1024)
+        asyncio.get_running_loop().create_task(heartbeat())
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _run_streamlit(host, port, beat):
+    from urllib.request import urlopen
+
+    from streamlit.web import bootstrap
+
+    def probe():
+        url = f'http://127.0.0.1:{port}/_stcore/health'
+        while True:
+            try:
+                with urlopen(url, timeout=HEARTBEAT) as response:
+                    if response.status == 200:
+                        beat()
+            except OSError:
+                pass
+            time.sleep(HEARTBEAT)
+
+    threading.Thread(target=probe, name='prefork-heartbeat', daemon=True).start()
+    flags = {
+        'server_address': host,
+        'server_port': port,
+        'server_headless': True,
+        'server_fileWatcherType': 'none',
+    }
+    bootstrap.load_config_options(flag_options=flags)
+    bootstrap.run(APP, False, [], flags)
+
+
+class Worker:
+    def __init__(self, index):
+        self.index = index
+        self.pid = None
+        self.pipe = None
+        self.state = 'stopped'
+        self.started = None
+        self.last_beat = None
+        self.restarts = 0
+        self.last_exit = None
+        self.respawn_at = 0.0
+        self.quick_exits = 0
+
+    def info(self):
+        now = time.time()
+        info = {
+            'index': self.index,
+            'pid': self.pid,
+            'state': self.state,
+            'restarts': self.restarts,
+            'uptime_s': round(now - self.started, 1) if self.started else None,
+            'last_heartbeat_s': round(now - self.last_beat, 1) if self.last_beat else None,
+            'last_exit': self.last_exit,
+        }
+        if self.pid:
+            info.update(memory(self.pid))
+        return info
+
+
+class Supervisor:
+    def __init__(self, app, workers, host, port, admin_port, window=None, max_batch=None):
+        self.app = app
+        self.workers = [Worker(i) for i in range(workers)]
+        self.host = host
+        self.port = port
+        self.admin_port = admin_port
+        self.window = window
+        self.max_batch = max_batch
+        self.started = time.time()
+        self.stopping = False
+        self.selector = selectors.DefaultSelector()
+        self.sock = None
+        self.admin = None
+
+    # -- workers --
+
+    def spawn(self, worker):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._child(worker, write_fd)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        worker.pid, worker.pipe = pid, read_fd
+        worker.state, worker.started, worker.last_beat = 'starting', time.time(), None
+        self.selector.register(read_fd, selectors.EVENT_READ, worker)
+
+    def _child(self, worker, write_fd):
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            self.selector.close()
+            for other in self.workers:
+                if other.pipe is not None:
+                    os.close(other.pipe)
+            if self.admin is not None:
+                self.admin.socket.close()
+            _per_worker(worker.index)
+
+            def beat():
+                try:
+                    os.write(write_fd, b'.')
+                except OSError:
+                    pass
+
+            if self.app == 'service':
+                _run_service(self.sock, beat, self.window, self.max_batch)
+            else:
+                _run_streamlit(self.host, self.port + worker.index, beat)
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _beat(self, worker):
+        try:
+            data = os.read(worker.pipe, 4096)
+        except BlockingIOError:
+            return
+        if data:
+            worker.last_beat = time.time()
+            worker.state = 'ready'
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            for worker in self.workers:
+                if worker.pid == pid:
+                    self._exited(worker, status)
+
+    def _exited(self, worker, status):
+        self.selector.unregister(worker.pipe)
+        os.close(worker.pipe)
+        worker.pipe = None
+        worker.pid = None
+        worker.last_exit = (f'signal {-os.waitstatus_to_exitcode(status)}' if os.WIFSIGNALED(status)
+                            else f'exit {os.waitstatus_to_exitcode(status)}')
+        worker.state = 'stopped'
+        if self.stopping:
+            return
+        worker.restarts += 1
+        worker.state = 'restarting'
+        if time.time() - worker.started < MIN_UPTIME or worker.last_beat is None:
+            worker.respawn_at = time.time() + min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** worker.quick_exits)
+            worker.quick_exits += 1
+        else:
+            worker.respawn_at = time.time()
+            worker.quick_exits = 0
+        print(f"prefork: worker {worker.index} {worker.last_exit}, restarting", file=sys.stderr)
+
+    def _check(self):
+        now = time.time()
+        for worker in self.workers:
+            if worker.state == 'restarting' and now >= worker.respawn_at:
+                self.spawn(worker)
+            elif worker.state == 'ready' and now - worker.last_beat > STALE:
+                worker.state = 'unresponsive'
+                print(f"prefork: worker {worker.index} missed its heartbeat, killing it", file=sys.stderr)
+                os.kill(worker.pid, signal.SIGKILL)
+            elif worker.state == 'starting' and now - worker.started > STARTUP_TIMEOUT:
+                worker.state = 'unresponsive'
+                print(f"prefork: worker {worker.index} not ready after {STARTUP_TIMEOUT:.0f} s, killing it",
+                      file=sys.stderr)
+                os.kill(worker.pid, signal.SIGKILL)
+
+    # -- admin endpoint --
+
+    def status(self):
+        workers = [w.info() for w in self.workers]
+        ready = sum(w['state'] == 'ready' for w in workers)
+        processes = [memory(os.getpid())] + [w for w in workers if w['pid']]
+        return {
+            'app': self.app,
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started, 1),
+            'workers_ready': ready,
+            'workers_total': len(workers),
+            'parent': memory(os.getpid()),
+            'total_rss_mb': round(sum(p.get('rss_mb', 0) for p in processes), 1),
+            'total_pss_mb': round(sum(p.get('pss_mb', 0) for p in processes), 1),
+            'workers': workers,
+        }
+
+    def _admin_server(self):
+        supervisor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Requests are served inside the supervisor loop, so a client that
+            # connects and sends nothing may hold it for this long at most
+            timeout = HEARTBEAT / 2
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                status = supervisor.status()
+                if path == '/healthz':
+                    code = 200
+                    body = {'status': 'ok', 'workers': {w['index']: w['state'] for w in status['workers']}}
+                elif path == '/readyz':
+                    ready = status['workers_ready'] == status['workers_total']
+                    code = 200 if ready else 503
+                    body = {'ready': ready, 'workers': {w['index']: w['state'] for w in status['workers']}}
+                elif path == '/workers':
+                    code, body = 200, status
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer((self.host, self.admin_port), Handler)
+        server.timeout = 0
+        return server
+
+    # -- main loop --
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        if self.app == 'service':
+            self.sock = socket.create_server((self.host, self.port), backlog=1024)
+        # Served from this loop, not a thread, so the parent stays single-threaded and safe to fork
+        self.admin = self._admin_server()
+        self.selector.register(self.admin.socket, selectors.EVENT_READ, None)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for worker in self.workers:
+            self.spawn(worker)
+        target = (f"http://{self.host}:{self.port}" if self.app == 'service'
+                  else f"http://{self.host}:{self.port}-{self.port + len(self.workers) - 1}")
+        print(f"prefork: {len(self.workers)} {self.app} workers on {target}, "
+              f"admin on http://{self.host}:{self.admin_port}", file=sys.stderr)
+
+        while not self.stopping:
+            for key, _ in self.selector.select(timeout=0.5):
+                if key.data is None:
+                    self.admin.handle_request()
+                else:
+                    self._beat(key.data)
+            self._reap()
+            self._check()
+        self.shutdown()
+
+    def shutdown(self, timeout=10.0):
+        for worker in self.workers:
+            if worker.pid:
+                os.kill(worker.pid, signal.SIGTERM)
+        deadline = time.time() + timeout
+        while any(w.pid for w in self.workers) and time.time() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for worker in self.workers:
+            if worker.pid:
+                os.kill(worker.pid, signal.SIGKILL)
+        self._reap()
+        self.admin.server_close()
+        if self.sock is not None:
+            self.sock.close()
+
+
+def main(argv=None):
+    from diagnosis.service import DEFAULT_MAX_BATCH, DEFAULT_WINDOW
+
+    parser = argparse.ArgumentParser(description="Run the scoring service or the app as pre-forked workers.")
+    parser.add_argument('app', choices=('service', 'streamlit'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core, %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="service port (default 8600) or first app port (default 8501)")
+    parser.add_argument('--admin-port', type=int, help="health/readiness port (default: port + 100)")
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW * 1000,
+                        help="service micro-batching window (default: %(default)s ms)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="service's largest coalesced batch (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    port = args.port or (8600 if args.app == 'service' else 8501)
+    start = time.perf_counter()
+    preload(args.app)
+    print(f"prefork: preloaded in {time.perf_counter() - start:.1f} s, "
+          f"parent RSS {memory(os.getpid()).get('rss_mb', 0):.0f} MB", file=sys.stderr)
+    Supervisor(args.app, args.workers, args.host, port, args.admin_port or port + 100,
+               window=args.window_ms / 1000, max_batch=args.max_batch).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Process-wide registry of the trained disease models.
+
+Streamlit re-executes ``app.py`` on every widget change, but imported modules
+live for the whole server process.  Keeping the models here means every
+session shares one copy, each model is loaded the first time a page asks
+for it, and a model is only reloaded when its file actually changes.
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import threading
+import time
+
+MODEL_DIR = os.environ.get(
+    'MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'),
+)
+
+PICKLE_FILES = {
+    'diabetes': 'diabetes_model.pkl',
+    'hypertension': 'hypertension_model.pkl',
+    'heart': 'heart_model.pkl',
+}
+_STEMS = {d: os.path.splitext(f)[0] for d, f in PICKLE_FILES.items()}
+
+# XGBoost's native UBJSON/JSON formats (see diagnosis.convert), falling back
+# to the original pickles for models that have not been converted yet
+NATIVE_FILES = {d: (stem + '.ubj', stem + '.json') for d, stem in _STEMS.items()}
+MODEL_FILES = {d: NATIVE_FILES[d] + (PICKLE_FILES[d],) for d in PICKLE_FILES}
+
+# SERVING_MODE=compiled serves the NumPy exports from diagnosis.compiled
+# instead, so xgboost is never imported by the app
+SERVING_MODE = os.environ.get('SERVING_MODE', 'xgboost')
+COMPILED_FILES = {d: stem + '.npz' for d, stem in _STEMS.items()}
+
+
+def _rss_bytes():
+    # Current resident set size; falls back to the peak RSS off Linux
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _sha256(path):
+    # Hash through a read-only mapping instead of copying the file into Python
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def metadata_path(path):
+    return os.path.splitext(path)[0] + '.meta.json'
+
+
+def _load_file(path):
+    ext = os.path.splitext(path)[1]
+    if ext == '.npz':
+        from diagnosis.compiled import CompiledEnsemble
+        return CompiledEnsemble.load(path)
+    if ext in ('.ubj', '.json'):
+        # Parsed by XGBoost itself; no arbitrary code runs while loading
+        from xgboost import XGBClassifier
+        model = XGBClassifier()
+        model.load_model(path)
+        return model
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _warm(model):
+    # One dummy prediction so the first real request does not pay for lazy setup
+    import numpy as np
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features:
+        model.predict_proba(np.zeros((1, n_features), dtype=np.float32))
+
+
+class ModelEntry:
+    """A loaded model plus the file stamp and cost of loading it."""
+
+    def __init__(self, model, path, stamp, sha256, load_seconds, warm_seconds, rss_delta,
+                 metadata=None):
+        self.model = model
+        self.metadata = metadata or {}
+        self.path = path
+        self.stamp = stamp
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        self.warm_seconds = warm_seconds
+        self.rss_delta = rss_delta
+        self.loaded_at = time.time()
+
+    @property
+    def version(self):
+        return self.sha256[:12]
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'format': os.path.splitext(self.path)[1].lstrip('.'),
+            'version': self.version,
+            'file_bytes': self.stamp[1],
+            'load_ms': self.load_seconds * 1000,
+            'warm_ms': self.warm_seconds * 1000,
+            'rss_delta_bytes': self.rss_delta,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Loads models lazily and hot-reloads them when their file changes.
+
+    Each disease maps to one file name or a tuple of candidates, the first
+    existing one wins.  ``.ubj``/``.json`` files go through XGBoost's native
+    loader, ``.npz`` files are loaded as ``CompiledEnsemble`` and anything
+    else is unpickled.  A ``<model>.meta.json`` sidecar, if present, is kept
+    as the entry's ``metadata``.
+
+    ``get()`` costs one ``os.stat`` when nothing changed.  If the mtime or
+    size moved, the file is hashed and only reloaded when its content differs.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, files=None):
+        self.model_dir = model_dir
+        self.files = {
+            d: (f,) if isinstance(f, str) else tuple(f)
+            for d, f in (files or MODEL_FILES).items()
+        }
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def _stat(self, disease):
+        candidates = [os.path.join(self.model_dir, f) for f in self.files[disease]]
+        for path in candidates:
+            try:
+                return path, os.stat(path)
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"No model file for {disease}: tried {', '.join(candidates)}")
+
+    def path(self, disease):
+        """The file ``disease`` is (or would be) loaded from."""
+        try:
+            return self._stat(disease)[0]
+        except FileNotFoundError:
+            return os.path.join(self.model_dir, self.files[disease][0])
+
+    def get(self, disease):
+        """Return the current model for ``disease``, loading it if needed.
+
+        Raises ``FileNotFoundError`` when the model file is missing.
+        """
+        return self.entry(disease).model
+
+    def entry(self, disease):
+        path, info = self._stat(disease)
+        stamp = (info.st_mtime_ns, info.st_size)
+        entry = self._entries.get(disease)
+        if entry is not None and entry.stamp == stamp and entry.path == path:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(disease)
+            if entry is not None and entry.stamp == stamp and entry.path == path:
+                return entry
+            sha256 = _sha256(path)
+            if entry is not None and entry.sha256 == sha256 and entry.path == path:
+                # Touched but unchanged: keep the loaded model
+                entry.stamp = stamp
+                return entry
+            previous, entry = entry, self._load(path, stamp, sha256)
+            self._entries[disease] = entry
+        if previous is not None:
+            for listener in self._listeners:
+                listener(disease, entry)
+        return entry
+
+    def add_listener(self, listener):
+        """Call ``listener(disease, entry)`` whenever a loaded model is replaced."""
+        self._listeners.append(listener)
+
+    def _load(self, path, stamp, sha256):
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = _load_file(path)
+        loaded = time.perf_counter()
+        _warm(model)
+        warmed = time.perf_counter()
+        metadata = None
+        if os.path.exists(metadata_path(path)):
+            with open(metadata_path(path)) as f:
+                metadata = json.load(f)
+        return ModelEntry(
+            model, path, stamp, sha256,
+            load_seconds=loaded - start,
+            warm_seconds=warmed - loaded,
+            rss_delta=_rss_bytes() - rss_before,
+            metadata=metadata,
+        )
+
+    def loaded(self):
+        return sorted(self._entries)
+
+    def stats(self):
+        """Load time, warm-up time and memory cost of every loaded model."""
+        return {disease: entry.stats() for disease, entry in sorted(self._entries.items())}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the registry shared by every session in this process."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                files = COMPILED_FILES if SERVING_MODE == 'compiled' else MODEL_FILES
+                _registry = ModelRegistry(files=files)
+    return _registry
@@ -0,0 +1,66 @@
+"""Score one set of answers against all three models at once.
+
+The "Screen All" page asks for the union of the three forms once, builds
+each model's feature vector from it and runs the models side by side on a
+process-wide thread pool, so a full check-up costs about as much as the
+slowest single model.  XGBoost and NumPy both release the GIL while they
+predict, so the threads really do overlap.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnosis import inference, metrics
+from diagnosis.features import ANGINA_MAP, CONSTANT_COLUMNS, CP_MAP, ECG_MAP, SEX_MAP, SLOPE_MAP
+
+DISEASES = ('diabetes', 'hypertension', 'heart')
+
+# Shared by every session; one slot per model is all a screening needs
+_executor = ThreadPoolExecutor(max_workers=len(DISEASES), thread_name_prefix='screening')
+
+
+def build_rows(a):
+    """Each model's feature vector, in model feature order, from the combined answers ``a``.
+
+    The shared answers are ``age``, ``sex`` (a ``SEX_MAP`` label), ``bmi``,
+    ``systolic_bp`` and ``diastolic_bp``.  The diabetes model's blood
+    pressure is diastolic, and the heart model's resting BP is systolic.
+    """
+    sex = SEX_MAP[a['sex']]
+    return {
+        'diabetes': [
+            a['pregnancies'], a['glucose'], a['diastolic_bp'], a['skin_thickness'],
+            a['insulin'], a['bmi'], a['pedigree'], a['age'],
+        ],
+        'hypertension': [
+            CONSTANT_COLUMNS['hypertension']['Unnamed: 0'], a['age'], sex, a['medical_history'], a['smoking'],
+            a['bmi'], a['sporting'], a['systolic_bp'], a['diastolic_bp'], a['heart_rate'],
+        ],
+        'heart': [
+            a['age'], sex, CP_MAP[a['chest_pain']], a['systolic_bp'], a['cholesterol'], a['fasting_bs'],
+            ECG_MAP[a['ecg']], a['max_hr'], ANGINA_MAP[a['angina']], a['oldpeak'],
+            SLOPE_MAP[a['slope']],
+        ],
+    }
+
+
+class ScreeningResult:
+    def __init__(self, disease, prediction, probability, seconds):
+        self.disease = disease
+        self.prediction = prediction
+        self.probability = probability
+        self.seconds = seconds
+
+
+def _score(registry, disease, row):
+    start = time.perf_counter()
+    with metrics.timer("predict", disease):
+        probability = inference.predict_proba(registry, disease, row, source='screen_all')
+    prediction = int(probability > 0.5)
+    metrics.inc("predictions", disease=disease, outcome="positive" if prediction else "negative")
+    return ScreeningResult(disease, prediction, probability, time.perf_counter() - start)
+
+
+def screen(registry, rows):
+    """Score ``rows`` (disease -> feature vector) concurrently; returns results in order."""
+    futures = [_executor.submit(_score, registry, disease, rows[disease]) for disease in DISEASES]
+    return [f.result() for f in futures]
@@ -0,0 +1,240 @@
+"""Latency-aware hyperparameter search for the disease models.
+
+Sweeps ``n_estimators`` (an upper bound, cut short by early stopping),
+``max_depth`` and ``learning_rate`` with ``tree_method='hist'``.  Each
+candidate is scored by 5-fold cross-validated AUC on the training split
+used by ``diagnosis.train``.  Early stopping picks the number of trees on a
+slice of each fold's training part, and the median across folds becomes
+the candidate's fixed ``n_estimators``.  The candidate is then refit on the
+whole training split, and its single-row and batch latency are measured as
+the app would serve it (``SERVING_MODE``).
+
+The report lists every candidate and marks the Pareto front of
+(CV AUC, single-row latency, batch latency).  The pick is the cheapest
+candidate, by ``--objective``, whose CV AUC is within ``--tolerance`` of the
+best; latencies within 5% count as a tie, which the smaller model wins.
+``--export`` retrains the pick with ``diagnosis.train`` so the
+model, sidecar and compiled export are written the usual way.  Later plain
+``python -m diagnosis.train`` runs keep the tuned hyperparameters.
+
+    python -m diagnosis.search                       # report only
+    python -m diagnosis.search heart --tolerance 0.005 --export
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from diagnosis.registry import MODEL_DIR, SERVING_MODE
+from diagnosis.train import PARAMS, SPLIT_SEED, TARGETS, TEST_SIZE, load_training_data, train_one
+
+GRID = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [2, 3, 4, 6],
+    'learning_rate': [0.1, 0.3],
+}
+FOLDS = 5
+EARLY_STOPPING_ROUNDS = 10
+# Share of each fold's training part held back to decide when to stop
+EARLY_STOPPING_FRACTION = 0.15
+
+OBJECTIVES = ('single', 'batch', 'size')
+
+
+def candidates(grid=GRID):
+    keys = sorted(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        yield dict(zip(keys, values), tree_method='hist')
+
+
+def _split(X, y, test_size, seed):
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=test_size, stratify=y, random_state=seed)
+
+
+def evaluate(disease, candidate):
+    """Cross-validate one candidate; returns its fixed params, CV AUC and refit model bytes."""
+    import numpy as np
+    import pandas as pd
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+    from xgboost import XGBClassifier
+
+    columns, X, y, _ = load_training_data(disease)
+    X = pd.DataFrame(np.asarray(X), columns=columns)
+    y = np.asarray(y)
+    X_train, X_test, y_train, y_test = _split(X, y, TEST_SIZE, SPLIT_SEED)
+
+    aucs, rounds = [], []
+    folds = StratifiedKFold(FOLDS, shuffle=True, random_state=SPLIT_SEED)
+    for fit_idx, val_idx in folds.split(X_train, y_train):
+        X_fit, X_stop, y_fit, y_stop = _split(
+            X_train.iloc[fit_idx], y_train[fit_idx], EARLY_STOPPING_FRACTION, SPLIT_SEED)
+        model = XGBClassifier(**PARAMS, **candidate, early_stopping_rounds=EARLY_STOPPING_ROUNDS, n_jobs=1)
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+        rounds.append(model.best_iteration + 1)
+        aucs.append(roc_auc_score(y_train[val_idx], model.predict_proba(X_train.iloc[val_idx])[:, 1]))
+
+    params = dict(candidate, n_estimators=int(statistics.median(rounds)))
+    model = XGBClassifier(**PARAMS, **params, n_jobs=1)
+    model.fit(X_train, y_train)
+    return {
+        'grid_point': candidate,
+        'params': params,
+        'cv_auc': float(np.mean(aucs)),
+        'cv_auc_std': float(np.std(aucs)),
+        'holdout_auc': float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+        'model': bytes(model.get_booster().save_raw('ubj')),
+    }
+
+
+def measure_latency(raw, X, serving_mode=SERVING_MODE, repeat=7, rows=200):
+    """Median single-row and per-row batch latency (µs) of a saved booster."""
+    import numpy as np
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(bytearray(raw))
+    n_trees = model.get_booster().num_boosted_rounds()
+    if serving_mode == 'compiled':
+        from diagnosis.compiled import export
+        model = export(model)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    singles = [X[i:i + 1] for i in range(min(rows, len(X)))]
+    model.predict_proba(X[:1])
+
+    single, batch = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in singles:
+            model.predict_proba(row)
+        single.append((time.perf_counter() - start) / len(singles))
+        start = time.perf_counter()
+        model.predict_proba(X)
+        batch.append((time.perf_counter() - start) / len(X))
+    return {
+        'single_us': statistics.median(single) * 1e6,
+        'batch_us_per_row': statistics.median(batch) * 1e6,
+        'n_trees': n_trees,
+        'model_bytes': len(raw),
+    }
+
+
+def pareto_front(results):
+    """Indices of results not dominated on (cv_auc up, single_us down, batch_us_per_row down)."""
+    def key(r):
+        return (-r['cv_auc'], r['single_us'], r['batch_us_per_row'])
+
+    front = []
+    for i, a in enumerate(results):
+        ka = key(a)
+        dominated = any(
+            all(x <= y for x, y in zip(key(b), ka)) and key(b) != ka
+            for j, b in enumerate(results) if j != i
+        )
+        if not dominated:
+            front.append(i)
+    return front
+
+
+# Latencies closer than this are treated as a tie and the smaller model wins;
+# single-row timings of near-identical models wobble by about this much
+TIE = 0.05
+
+
+def choose(results, tolerance, objective='single'):
+    """Cheapest result by ``objective`` whose CV AUC is within ``tolerance`` of the best."""
+    best = max(r['cv_auc'] for r in results)
+    eligible = [r for r in results if r['cv_auc'] >= best - tolerance]
+    cost = {
+        'single': lambda r: r['single_us'],
+        'batch': lambda r: r['batch_us_per_row'],
+        'size': lambda r: r['model_bytes'],
+    }[objective]
+    cheapest = min(cost(r) for r in eligible)
+    tied = [r for r in eligible if cost(r) <= cheapest * (1 + TIE)]
+    return min(tied, key=lambda r: (r['model_bytes'], -r['cv_auc']))
+
+
+def search(disease, grid=GRID, workers=None, serving_mode=SERVING_MODE):
+    """Evaluate every candidate for ``disease``; returns the results with latencies."""
+    import numpy as np
+
+    # Parse (or warm) the dataset cache once before the workers read it
+    _, X, _, _ = load_training_data(disease)
+    grid_points = list(candidates(grid))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        evaluated = list(pool.map(evaluate, [disease] * len(grid_points), grid_points))
+
+    # Early stopping maps several grid points onto the same final model
+    results, seen = [], set()
+    for r in evaluated:
+        key = json.dumps(r['params'], sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            results.append(r)
+
+    # Latency is measured here, one model at a time, so the fits running in
+    # the pool never compete with the clock
+    X = np.asarray(X)
+    for r in results:
+        r.update(measure_latency(r.pop('model'), X, serving_mode))
+    for i in pareto_front(results):
+        results[i]['pareto'] = True
+    return results
+
+
+def _describe(params):
+    return f"n={params['n_estimators']:<4} depth={params['max_depth']} lr={params['learning_rate']}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search for the fastest model within an AUC budget.")
+    parser.add_argument('diseases', nargs='*', help="default: every model")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="allowed CV AUC drop from the best candidate (default: %(default)s)")
+    parser.add_argument('--objective', choices=OBJECTIVES, default='single',
+                        help="what 'cheapest' means (default: %(default)s-row latency)")
+    parser.add_argument('--serving-mode', choices=('xgboost', 'compiled'), default=SERVING_MODE,
+                        help="predictor to time (default: SERVING_MODE, %(default)s)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--export', action='store_true', help="retrain and write the chosen models")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--report', help="write every candidate and the picks as JSON")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for disease in args.diseases or sorted(TARGETS):
+        start = time.perf_counter()
+        results = search(disease, workers=args.workers, serving_mode=args.serving_mode)
+        pick = choose(results, args.tolerance, args.objective)
+        report[disease] = {'candidates': results, 'chosen': pick['params']}
+
+        print(f"{disease}: {len(results)} distinct candidates in {time.perf_counter() - start:.1f} s "
+              f"({args.serving_mode} latency)")
+        print(f"  {'':<3}{'params':<30} {'CV AUC':>13} {'holdout':>8} {'trees':>6} "
+              f"{'single µs':>10} {'batch µs/row':>13} {'KB':>6}")
+        front = sorted((r for r in results if r.get('pareto')), key=lambda r: -r['cv_auc'])
+        for r in front + ([pick] if pick not in front else []):
+            mark = '*' if r is pick else ' '
+            print(f"  {mark}  {_describe(r['params']):<30} {r['cv_auc']:.4f}±{r['cv_auc_std']:.3f} "
+                  f"{r['holdout_auc']:>8.4f} {r['n_trees']:>6} {r['single_us']:>10.1f} "
+                  f"{r['batch_us_per_row']:>13.2f} {r['model_bytes'] / 1024:>6.0f}")
+        print(f"  (Pareto front shown; * = pick within {args.tolerance} AUC of the best, "
+              f"cheapest by {args.objective})")
+
+        if args.export:
+            result = train_one(disease, args.model_dir, params=pick['params'], force=True)
+            print(f"  exported -> {os.path.basename(result['path'])} "
+                  f"(holdout AUC {result['metrics']['auc']:.4f})")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Headless HTTP scoring service for the three disease models.
+
+A small asyncio HTTP/1.1 server (standard library only) that serves the
+models held by the shared registry:
+
+    POST /predict/<disease>        {"features": [...]}
+    POST /predict_batch/<disease>  {"rows": [[...], ...]}
+    GET  /stats                    queue depth and batch-size histograms
+    GET  /healthz
+
+Concurrent single-row requests for the same disease are coalesced: the first
+request opens a window of ``window`` seconds, everything that arrives in the
+meantime (up to ``max_batch`` rows) is scored with one ``predict_proba`` call
+in a worker thread, and each caller gets its own row back.
+
+    python -m diagnosis.service --port 8600 --window-ms 2
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import numpy as np
+
+from diagnosis import drift, history, shadow
+from diagnosis.registry import get_registry
+
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _bucket(n):
+    # Power-of-two histogram bucket: 1, 2, 4, 8, ...
+    return 1 << (n - 1).bit_length()
+
+
+def _score(entry, disease, X):
+    # Runs in a worker thread, so the drift, history and shadow updates stay off the event loop
+    drift.observe_many(disease, X)
+    proba = entry.model.predict_proba(X)
+    history.record_many(disease, X, proba[:, 1], entry.version, 'service')
+    shadow.submit(disease, X, proba[:, 1], entry)
+    return proba
+
+
+class MicroBatcher:
+    """Coalesces single-row requests for one model into batched calls."""
+
+    def __init__(self, registry, disease, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.registry = registry
+        self.disease = disease
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+        self.rows = 0
+        self._task = None
+
+    async def submit(self, row):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((row, future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            self.batch_sizes[_bucket(len(batch))] += 1
+            self.rows += len(batch)
+            try:
+                entry = self.registry.entry(self.disease)
+                X = np.array([row for row, _ in batch], dtype=np.float32)
+                proba = await loop.run_in_executor(None, _score, entry, self.disease, X)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), p in zip(batch, proba[:, 1]):
+                if not future.done():
+                    future.set_result(float(p))
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'rows': self.rows,
+            'batches': sum(self.batch_sizes.values()),
+            'batch_size_histogram': {f'le_{k}': v for k, v in sorted(self.batch_sizes.items())},
+        }
+
+
+class ScoringService:
+    def __init__(self, registry=None, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.registry = registry or get_registry()
+        self.window = window
+        self.max_batch = max_batch
+        self.batchers = {}
+        self.requests = Counter()
+        self.started = time.time()
+
+    def _model(self, disease):
+        if disease not in self.registry.files:
+            raise HTTPError(404, f"unknown disease '{disease}'")
+        try:
+            return self.registry.get(disease)
+        except FileNotFoundError as e:
+            raise HTTPError(500, str(e))
+
+    def _rows(self, model, rows):
+        try:
+            X = np.array(rows, dtype=np.float32)
+        except (TypeError, ValueError):
+            raise HTTPError(400, "features must be numbers")
+        if X.ndim != 2 or X.shape[1] != model.n_features_in_:
+            raise HTTPError(400, f"model expects {model.n_features_in_} features per row")
+        return X
+
+    async def predict(self, disease, body):
+        model = self._model(disease)
+        row = self._rows(model, [body.get('features')])[0]
+        batcher = self.batchers.get(disease)
+        if batcher is None:
+            batcher = self.batchers[disease] = MicroBatcher(
+                self.registry, disease, self.window, self.max_batch)
+        p = await batcher.submit(row)
+        return {
+            'disease': disease,
+            'probability': p,
+            'prediction': int(p > 0.5),
+            'model_version': self.registry.entry(disease).version,
+        }
+
+    async def predict_batch(self, disease, body):
+        X = self._rows(self._model(disease), body.get('rows'))
+        entry = self.registry.entry(disease)
+        proba = await asyncio.get_running_loop().run_in_executor(None, _score, entry, disease, X)
+        return {
+            'disease': disease,
+            'probabilities': proba[:, 1].tolist(),
+            'predictions': (proba[:, 1] > 0.5).astype(int).tolist(),
+            'model_version': self.registry.entry(disease).version,
+        }
+
+    def stats(self):
+        return {
+            'uptime_s': time.time() - self.started,
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'requests': dict(self.requests),
+            'batchers': {d: b.stats() for d, b in sorted(self.batchers.items())},
+            'models': self.registry.stats(),
+        }
+
+    async def dispatch(self, method, path, body):
+        parts = path.strip('/').split('/')
+        if parts[0] in ('predict', 'predict_batch') and len(parts) == 2:
+            if method != 'POST':
+                raise HTTPError(405, "use POST")
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "body must be a JSON object")
+            handler = self.predict if parts[0] == 'predict' else self.predict_batch
+            self.requests[parts[0]] += 1
+            return await handler(parts[1], payload)
+        if path == '/stats':
+            return self.stats()
+        if path == '/healthz':
+            return {'status': 'ok'}
+        raise HTTPError(404, f"no route for {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+
+                try:
+                    status, payload = 200, await self.dispatch(method, target.split('?')[0], body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, preload=()):
+        for disease in preload:
+            self.registry.get(disease)
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"Scoring service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the disease models over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW * 1000,
+                        help="micro-batching window (default: %(default)s ms, 0 disables waiting)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="largest coalesced batch (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    service = ScoringService(window=args.window_ms / 1000, max_batch=args.max_batch)
+    try:
+        asyncio.run(service.serve(args.host, args.port, preload=sorted(service.registry.files)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
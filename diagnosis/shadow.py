@@ -0,0 +1,443 @@
+"""Shadow scoring of candidate models on live inputs.
+
+Each prediction the primary model serves can also go, after the answer is
+ready, to a bounded queue drained by background threads.  For every
+candidate of that disease a thread scores the same inputs with the
+candidate and, right beside it, with the primary model that served them.
+It then records whether the two agree on the 0/1 prediction, the
+probability delta and both latencies, so the timings are taken under the
+same conditions.  Users only ever see the primary's answer.
+
+On the request path a prediction costs one ``put_nowait``.  Work is shed,
+and counted by reason, when the queue is full (``queue_full``), when an
+item waited longer than ``SHADOW_MAX_AGE`` (``stale``) or when it falls
+outside ``SHADOW_SAMPLE`` (``sampled_out``).  The threads also run at a
+lower OS priority (``SHADOW_NICE``).
+
+    SHADOW_MODELS     candidates as disease:path pairs, comma separated, with
+                      paths relative to MODEL_DIR, e.g.
+                      "heart:heart_model.npz,heart:versions/heart_model.6366fdd31d2d.ubj"
+                      (default: none, shadowing off)
+    SHADOW_WORKERS    scoring threads (default 1)
+    SHADOW_QUEUE      queued predictions before shedding (default 1000)
+    SHADOW_SAMPLE     share of predictions shadowed (default 1.0)
+    SHADOW_MAX_AGE    seconds a queued prediction stays worth scoring (default 2)
+    SHADOW_FILE       stats snapshot (default .cache/shadow/stats.json, '' = none)
+    SHADOW_INTERVAL   seconds between snapshots (default 30)
+
+The snapshot keeps the last ``WINDOW`` deltas and latencies per candidate.
+``python -m diagnosis.shadow`` merges the snapshots (a pre-forked
+deployment writes one per worker) and says, per candidate, whether it is
+faster and agrees closely enough to promote.
+"""
+import argparse
+import atexit
+import glob
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from diagnosis import metrics
+from diagnosis.registry import MODEL_DIR, _load_file, _sha256, _warm
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'shadow')
+SHADOW_MODELS = os.environ.get('SHADOW_MODELS', '')
+SHADOW_WORKERS = int(os.environ.get('SHADOW_WORKERS', '1'))
+SHADOW_QUEUE = int(os.environ.get('SHADOW_QUEUE', '1000'))
+SHADOW_SAMPLE = float(os.environ.get('SHADOW_SAMPLE', '1.0'))
+SHADOW_MAX_AGE = float(os.environ.get('SHADOW_MAX_AGE', '2'))
+SHADOW_FILE = os.environ.get('SHADOW_FILE', os.path.join(CACHE_DIR, 'stats.json'))
+SHADOW_INTERVAL = float(os.environ.get('SHADOW_INTERVAL', '30'))
+SHADOW_NICE = int(os.environ.get('SHADOW_NICE', '10'))
+
+WINDOW = 2048
+# Promotion defaults for the report
+MIN_SAMPLES = 200
+MIN_AGREEMENT = 0.99
+MAX_P99_DELTA = 0.05
+# Candidate p50 latency must beat the primary's by this factor; timing noise
+# alone moves an identical model a few percent either way
+MIN_SPEEDUP = 1.05
+
+
+def parse_candidates(spec, model_dir=MODEL_DIR):
+    """``{disease: [(name, path), ...]}`` from a ``SHADOW_MODELS`` string; the name is the path as written."""
+    candidates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        disease, sep, name = item.partition(':')
+        name = name.strip()
+        if not sep or not name:
+            raise ValueError(f"SHADOW_MODELS entry '{item}' is not disease:path")
+        candidates.setdefault(disease.strip(), []).append((name, os.path.join(model_dir, name)))
+    return candidates
+
+
+class Comparison:
+    """Running agreement, probability deltas and latencies of one candidate against the primary."""
+
+    def __init__(self, disease, name):
+        self.disease = disease
+        self.name = name
+        self.version = None
+        self.primary_version = None
+        self.n = 0
+        self.agree = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.errors = 0
+        self.deltas = deque(maxlen=WINDOW)
+        self.primary_seconds = deque(maxlen=WINDOW)
+        self.candidate_seconds = deque(maxlen=WINDOW)
+
+    def update(self, primary, candidate, primary_seconds, candidate_seconds):
+        rows = len(primary)
+        for p, c in zip(primary, candidate):
+            delta = c - p
+            self.agree += (p > 0.5) == (c > 0.5)
+            self.delta_sum += delta
+            self.abs_delta_sum += abs(delta)
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+            self.deltas.append(delta)
+        self.n += rows
+        # Latency per row, so batches and single rows stay comparable
+        self.primary_seconds.append(primary_seconds / rows)
+        self.candidate_seconds.append(candidate_seconds / rows)
+
+    def state(self):
+        return {
+            'disease': self.disease, 'candidate': self.name, 'version': self.version,
+            'primary_version': self.primary_version, 'n': self.n, 'agree': self.agree,
+            'delta_sum': self.delta_sum, 'abs_delta_sum': self.abs_delta_sum,
+            'max_abs_delta': self.max_abs_delta, 'errors': self.errors,
+            'deltas': [round(d, 6) for d in self.deltas],
+            'primary_seconds': [round(s, 9) for s in self.primary_seconds],
+            'candidate_seconds': [round(s, 9) for s in self.candidate_seconds],
+        }
+
+
+class ShadowScorer:
+    def __init__(self, candidates, workers=SHADOW_WORKERS, queue_size=SHADOW_QUEUE, sample=SHADOW_SAMPLE,
+                 max_age=SHADOW_MAX_AGE, path=SHADOW_FILE, interval=SHADOW_INTERVAL):
+        self.candidates = candidates
+        self.workers = workers
+        self.sample = sample
+        self.max_age = max_age
+        self.path = path
+        self.interval = interval
+        self.submitted = 0
+        self.shed = {'queue_full': 0, 'stale': 0, 'sampled_out': 0}
+        self.comparisons = {}
+        self._models = {}
+        self._queue = queue.Queue(queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        # Shadow threads and the atexit hook all write through one temp file
+        self._write_lock = threading.Lock()
+        self._last_write = time.monotonic()
+
+    def submit(self, disease, X, probabilities, entry):
+        """Queue a served prediction for shadowing; never blocks.
+
+        ``X`` is one feature tuple or a 2-D batch the caller will not
+        modify, ``probabilities`` what ``entry``'s model answered.
+        """
+        if disease not in self.candidates:
+            return
+        self.submitted += 1
+        if self.sample < 1.0 and random.random() >= self.sample:
+            self.shed['sampled_out'] += 1
+            return
+        if not self._threads:
+            self._start()
+        try:
+            self._queue.put_nowait((time.monotonic(), disease, X, probabilities, entry))
+        except queue.Full:
+            self.shed['queue_full'] += 1
+
+    def _start(self):
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'shadow-{i}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+                if self.path:
+                    atexit.register(self.write)
+
+    def _run(self):
+        try:
+            # Linux applies a thread id's nice value to that thread alone
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SHADOW_NICE)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self._queue.get()
+            try:
+                if time.monotonic() - item[0] > self.max_age:
+                    self.shed['stale'] += 1
+                else:
+                    self._score(*item[1:])
+            except Exception:
+                metrics.inc('errors', stage='shadow')
+            finally:
+                self._queue.task_done()
+            if self.path and time.monotonic() - self._last_write > self.interval:
+                self.write()
+
+    def _model(self, path):
+        # Candidates load on first use, in a shadow thread, and reload when the
+        # file's mtime or size changes, like the registry's models.  A file that
+        # is missing or fails to load gives None until it changes.
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        stamp = (info.st_mtime_ns, info.st_size)
+        cached = self._models.get(path)
+        if cached is None or cached[0] != stamp:
+            try:
+                model = _load_file(path)
+                _warm(model)
+                loaded = (model, _sha256(path)[:12])
+            except Exception:
+                loaded = None
+            cached = self._models[path] = (stamp, loaded)
+        return cached[1]
+
+    def _score(self, disease, X, probabilities, entry):
+        import numpy as np
+
+        X = np.array([X] if isinstance(X, tuple) else X, dtype=np.float32)
+        start = time.perf_counter()
+        entry.model.predict_proba(X)
+        primary_seconds = time.perf_counter() - start
+        primary = [float(p) for p in probabilities]
+        for name, path in self.candidates[disease]:
+            key = (disease, name)
+            comparison = self.comparisons.get(key)
+            if comparison is None:
+                comparison = self.comparisons.setdefault(key, Comparison(*key))
+            loaded = self._model(path)
+            if loaded is None:
+                comparison.errors += 1
+                continue
+            model, version = loaded
+            if comparison.n and (comparison.version, comparison.primary_version) != (version, entry.version):
+                # Either model was replaced; its numbers start over
+                with self._lock:
+                    comparison = self.comparisons[key] = Comparison(*key)
+            # Hand the GIL back between models so a request thread waiting for it gets it now
+            time.sleep(0)
+            start = time.perf_counter()
+            candidate = model.predict_proba(X)[:, 1]
+            candidate_seconds = time.perf_counter() - start
+            with self._lock:
+                comparison.version, comparison.primary_version = version, entry.version
+                comparison.update(primary, candidate.tolist(), primary_seconds, candidate_seconds)
+
+    def flush(self):
+        """Wait for the queued predictions, then write the snapshot."""
+        if self._threads:
+            self._queue.join()
+        if self.path:
+            self.write()
+
+    def snapshot(self):
+        with self._lock:
+            comparisons = [c.state() for _, c in sorted(self.comparisons.items())]
+        return {'time': round(time.time()), 'pid': os.getpid(), 'submitted': self.submitted,
+                'shed': dict(self.shed), 'comparisons': comparisons}
+
+    def write(self):
+        with self._write_lock:
+            self._last_write = time.monotonic()
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(self.snapshot(), f, separators=(',', ':'))
+                os.replace(tmp, self.path)
+            except OSError:
+                metrics.inc('errors', stage='shadow_snapshot')
+
+    def stats(self):
+        return {'submitted': self.submitted, 'queued': self._queue.qsize(), 'shed': dict(self.shed)}
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+_configured = False
+
+
+def get_scorer():
+    """The process-wide scorer for ``SHADOW_MODELS``, or None when no candidates are set."""
+    global _scorer, _configured
+    if not _configured:
+        with _scorer_lock:
+            if not _configured:
+                candidates = parse_candidates(SHADOW_MODELS)
+                if candidates:
+                    # Settings are read now, so prefork's per-worker SHADOW_FILE applies
+                    _scorer = ShadowScorer(candidates, SHADOW_WORKERS, SHADOW_QUEUE, SHADOW_SAMPLE,
+                                           SHADOW_MAX_AGE, SHADOW_FILE, SHADOW_INTERVAL)
+                _configured = True
+    return _scorer
+
+
+def submit(disease, X, probabilities, entry):
+    scorer = get_scorer()
+    if scorer is not None:
+        scorer.submit(disease, X, probabilities, entry)
+
+
+def _quantile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(snapshots, min_samples=MIN_SAMPLES, min_agreement=MIN_AGREEMENT, max_p99_delta=MAX_P99_DELTA,
+              min_speedup=MIN_SPEEDUP):
+    """Merge snapshots and give each candidate a verdict: ``promote``, ``wait`` or ``reject``."""
+    merged = {}
+    for snap in snapshots:
+        for c in snap['comparisons']:
+            key = (c['disease'], c['candidate'])
+            m = merged.setdefault(key, dict(c, deltas=[], primary_seconds=[], candidate_seconds=[],
+                                            n=0, agree=0, delta_sum=0.0, abs_delta_sum=0.0,
+                                            max_abs_delta=0.0, errors=0))
+            for field in ('n', 'agree', 'delta_sum', 'abs_delta_sum', 'errors'):
+                m[field] += c[field]
+            m['max_abs_delta'] = max(m['max_abs_delta'], c['max_abs_delta'])
+            for field in ('deltas', 'primary_seconds', 'candidate_seconds'):
+                m[field] += c[field]
+
+    rows = []
+    for (disease, name), m in sorted(merged.items()):
+        n = m['n']
+        primary_p50 = _quantile(m['primary_seconds'], 0.5)
+        candidate_p50 = _quantile(m['candidate_seconds'], 0.5)
+        row = {
+            'disease': disease, 'candidate': name, 'version': m['version'],
+            'primary_version': m['primary_version'], 'n': n, 'errors': m['errors'],
+            'agreement': m['agree'] / n if n else None,
+            'mean_delta': m['delta_sum'] / n if n else None,
+            'mean_abs_delta': m['abs_delta_sum'] / n if n else None,
+            'p99_abs_delta': _quantile([abs(d) for d in m['deltas']], 0.99),
+            'max_abs_delta': m['max_abs_delta'],
+            'primary_p50_us': primary_p50 * 1e6 if primary_p50 is not None else None,
+            'candidate_p50_us': candidate_p50 * 1e6 if candidate_p50 is not None else None,
+            'primary_p99_us': (_quantile(m['primary_seconds'], 0.99) or 0) * 1e6,
+            'candidate_p99_us': (_quantile(m['candidate_seconds'], 0.99) or 0) * 1e6,
+        }
+        row['speedup'] = (primary_p50 / candidate_p50) if primary_p50 and candidate_p50 else None
+        row['faster'] = row['speedup'] is not None and row['speedup'] > 1.0
+        fast_enough = min_speedup <= 0 or row['speedup'] is not None and row['speedup'] >= min_speedup
+        if not n and m['errors']:
+            row['verdict'], row['reason'] = 'reject', "failed to load"
+        elif n < min_samples:
+            row['verdict'], row['reason'] = 'wait', f"{n} of {min_samples} samples"
+        elif row['agreement'] < min_agreement:
+            row['verdict'], row['reason'] = 'reject', f"agreement {row['agreement']:.2%} < {min_agreement:.2%}"
+        elif row['p99_abs_delta'] > max_p99_delta:
+            row['verdict'], row['reason'] = 'reject', f"p99 |delta| {row['p99_abs_delta']:.3f} > {max_p99_delta}"
+        elif not fast_enough:
+            row['verdict'] = 'reject'
+            row['reason'] = (f"agrees, but speedup {row['speedup']:.2f}x < {min_speedup}x" if row['speedup']
+                             else "agrees, but no latency measured")
+        else:
+            row['verdict'] = 'promote'
+            row['reason'] = f"agrees, speedup {row['speedup']:.2f}x" if row['speedup'] else "agrees"
+        rows.append(row)
+    return rows
+
+
+def snapshot_files(path=SHADOW_FILE):
+    """``path`` and the per-worker snapshots next to it."""
+    stem, ext = os.path.splitext(path)
+    return sorted(set(glob.glob(path) + glob.glob(f'{stem}.*{ext}')))
+
+
+def _samples():
+    if _scorer is None:
+        return
+    yield 'shadow_submitted_total', 'counter', {}, _scorer.submitted
+    yield 'shadow_queue_depth', 'gauge', {}, _scorer._queue.qsize()
+    for reason, n in sorted(_scorer.shed.items()):
+        yield 'shadow_shed_total', 'counter', {'reason': reason}, n
+    comparisons = [({'disease': disease, 'candidate': name}, c)
+                   for (disease, name), c in sorted(_scorer.comparisons.items())]
+    # The text format wants every sample of a metric in one group
+    for labels, c in comparisons:
+        yield 'shadow_scored_total', 'counter', labels, c.n
+    for labels, c in comparisons:
+        if c.n:
+            yield 'shadow_agreement', 'gauge', labels, round(c.agree / c.n, 6)
+    for labels, c in comparisons:
+        if c.n:
+            yield 'shadow_mean_abs_delta', 'gauge', labels, round(c.abs_delta_sum / c.n, 6)
+
+
+metrics.add_collector(_samples)
+
+
+def _cell(value, spec, suffix=''):
+    # A report column, '-' when the value was never measured
+    if value is None:
+        return '-'.rjust(int(spec.split('.')[0]) + len(suffix))
+    return format(value, spec) + suffix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize shadow scoring: which candidates could be promoted.")
+    parser.add_argument('files', nargs='*', help="snapshots (default: SHADOW_FILE and its per-worker siblings)")
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES)
+    parser.add_argument('--min-agreement', type=float, default=MIN_AGREEMENT,
+                        help="share of identical 0/1 predictions (default: %(default)s)")
+    parser.add_argument('--max-p99-delta', type=float, default=MAX_P99_DELTA,
+                        help="largest p99 probability difference (default: %(default)s)")
+    parser.add_argument('--min-speedup', type=float, default=MIN_SPEEDUP,
+                        help="primary p50 / candidate p50 needed to promote; 0 ignores latency "
+                             "(default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    files = args.files or snapshot_files()
+    if not files:
+        parser.exit(1, f"no shadow snapshots at {SHADOW_FILE}; set SHADOW_MODELS and serve some predictions\n")
+    snapshots = []
+    for path in files:
+        with open(path) as f:
+            snapshots.append(json.load(f))
+    rows = summarize(snapshots, args.min_samples, args.min_agreement, args.max_p99_delta, args.min_speedup)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    submitted = sum(s['submitted'] for s in snapshots)
+    shed = {}
+    for s in snapshots:
+        for reason, n in s['shed'].items():
+            shed[reason] = shed.get(reason, 0) + n
+    print(f"{len(files)} snapshot(s), {submitted:,} submissions (a service batch is one), shed: "
+          + ", ".join(f"{reason} {n:,}" for reason, n in sorted(shed.items())))
+    print(f"{'disease':<13} {'candidate':<34} {'n':>7} {'agree':>7} {'mean|d|':>8} {'p99|d|':>7} "
+          f"{'primary us':>10} {'cand. us':>9} {'speedup':>7}  verdict")
+    for r in rows:
+        if not r['n']:
+            print(f"{r['disease']:<13} {r['candidate']:<34} {0:>7}  {r['verdict']} ({r['reason']})")
+            continue
+        print(f"{r['disease']:<13} {r['candidate']:<34} {r['n']:>7,} {_cell(r['agreement'], '7.2%')} "
+              f"{_cell(r['mean_abs_delta'], '8.4f')} {_cell(r['p99_abs_delta'], '7.4f')} "
+              f"{_cell(r['primary_p50_us'], '10.1f')} {_cell(r['candidate_p50_us'], '9.1f')} "
+              f"{_cell(r['speedup'], '6.2f', 'x')}  {r['verdict']} ({r['reason']})")
+
+
+if __name__ == '__main__':
+    main()
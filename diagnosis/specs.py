@@ -0,0 +1,260 @@
+"""Declarative specs for the disease pages.
+
+A spec lists one page's inputs in model feature order, each with its
+widget, range or options, any label -> code encoding, its chart label and
+its healthy baseline value, plus the page copy.  A model input that says
+nothing about the patient is a hidden ``constant`` field: it is encoded
+but never shown, charted or offered in the what-if panel.  ``app.py`` renders every
+disease page from its spec.  Adding a disease means adding a spec to
+``SPECS``, its CSV columns to ``features.py`` and its model file.
+
+Each spec compiles an ``Encoder`` that turns the widget values into the
+model's float32 feature row in one slice assignment.
+"""
+from diagnosis.features import ANGINA_MAP, CONSTANT_COLUMNS, CP_MAP, ECG_MAP, FEATURE_COLUMNS, SEX_MAP, SLOPE_MAP
+
+
+class Field:
+    """One input.  A number box has ``min_value``/``max_value``/``default``;
+    a select box has ``options`` and, if they are labels, an ``encoding``.
+    ``side`` is the form column (0 left, 1 right) it is shown in.  A
+    ``hidden`` field is not shown and always sends its ``default``."""
+
+    def __init__(self, label, short, healthy, side, min_value=None, max_value=None, default=None,
+                 options=None, encoding=None, hidden=False):
+        self.label = label
+        self.short = short
+        self.healthy = healthy
+        self.side = side
+        self.min_value = min_value
+        self.max_value = max_value
+        self.default = default
+        self.options = options
+        self.encoding = encoding
+        self.hidden = hidden
+
+
+def number(label, short, min_value, max_value, default, healthy=None, side=0):
+    return Field(label, short, default if healthy is None else healthy, side, min_value, max_value, default)
+
+
+def select(label, short, options, healthy, side=0, encoding=None):
+    options = list(encoding) if encoding is not None else options
+    return Field(label, short, healthy, side, options=options, encoding=encoding)
+
+
+def constant(short, value):
+    return Field(None, short, value, None, default=value, hidden=True)
+
+
+class Encoder:
+    """Widget values -> model feature row.
+
+    The positions that need a label -> code lookup are worked out once, so
+    encoding is a few dict lookups and one float32 slice assignment into a
+    row the caller allocated with ``row()``.
+    """
+
+    def __init__(self, fields, columns=None):
+        self.size = len(fields)
+        self.columns = columns
+        self._lookups = [(i, f.encoding) for i, f in enumerate(fields) if f.encoding is not None]
+
+    def row(self):
+        import numpy as np
+        return np.zeros(self.size, dtype=np.float32)
+
+    def __call__(self, values, out):
+        values = list(values)
+        for i, encoding in self._lookups:
+            values[i] = encoding[values[i]]
+        out[:] = values
+        return out
+
+    def check(self, model):
+        """Raise ``ValueError`` unless ``model`` takes rows of this size and,
+        where it records them, these columns in this order."""
+        expected = getattr(model, 'n_features_in_', None)
+        if expected is not None and expected != self.size:
+            raise ValueError(
+                f"Feature shape mismatch! Model expects {expected} features, but got {self.size}.")
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None:
+            names = getattr(model, 'feature_names', None)
+        if self.columns is not None and names is not None and len(names) and list(names) != self.columns:
+            raise ValueError(f"Feature order mismatch! Model expects {list(names)}, but got {self.columns}.")
+
+
+class DiseaseSpec:
+    def __init__(self, key, page, icon, title, requires, intro, fields, tips_icon, tips, consult, card):
+        if len(fields) != len(FEATURE_COLUMNS[key]):
+            raise ValueError(f"{key}: {len(fields)} fields but {len(FEATURE_COLUMNS[key])} CSV columns")
+        hidden = {column for column, field in zip(FEATURE_COLUMNS[key], fields) if field.hidden}
+        if hidden != set(CONSTANT_COLUMNS.get(key, {})):
+            raise ValueError(f"{key}: hidden fields {sorted(hidden)} are not the constant columns")
+        self.key = key
+        self.page = page
+        self.icon = icon
+        self.title = title
+        # Lines of the "It Requires" note
+        self.requires = requires
+        self.intro = intro
+        self.fields = fields
+        self.tips_icon = tips_icon
+        # (emoji, heading, text) per wellness tip and per "Who to Consult" line
+        self.tips = tips
+        self.consult = consult
+        # Home page card: icon, about, causes, risks, precautions, consultation
+        self.card = card
+        # Positions of the shown fields in the feature row; labels and
+        # healthy values are only kept for those
+        self.shown = [i for i, f in enumerate(fields) if not f.hidden]
+        self.labels = [fields[i].short for i in self.shown]
+        self.healthy = [fields[i].healthy for i in self.shown]
+        self.encode = Encoder(fields, FEATURE_COLUMNS[key])
+
+
+DIABETES = DiseaseSpec(
+    key='diabetes',
+    page="Diabetes",
+    icon=":material/water_drop:",
+    title="🧪 Diabetes Risk Prediction",
+    requires=(
+        "**It Requires:**",
+        "🩸 Fasting Blood Sugar (FBS), 🍽️ Oral Glucose Tolerance Test (OGTT), 💉 Hemoglobin A1c (HbA1c),",
+        "⚖️ Body Mass Index (BMI), 🧬 Family Medical History",
+        "These assessments help understand how your body processes sugar and stores energy.",
+    ),
+    intro="Fill out your health information below:",
+    fields=[
+        number("👶 Pregnancies", "Pregnancies", 0, 20, 1, healthy=0),
+        number("🩸 Glucose", "Glucose", 0, 300, 110, side=1),
+        number("💓 Blood Pressure", "BP", 0, 200, 70),
+        number("🧫 Skin Thickness", "Skin", 0, 100, 20, side=1),
+        number("💉 Insulin", "Insulin", 0, 900, 85),
+        number("⚖️ BMI", "BMI", 0.0, 70.0, 20.0, side=1),
+        number("📊 Diabetes Pedigree Function", "Function", 0.0, 2.5, 0.5),
+        number("🎂 Age", "Age", 10, 100, 25, side=1),
+    ],
+    tips_icon="🌿",
+    tips=[
+        ("🥗", "Eat whole & colorful meals", "Add veggies, fruits & whole grains daily."),
+        ("💧", "Hydrate consistently", "Water supports digestion & energy balance."),
+        ("🧘", "Stress less, breathe more", "Use meditation, journaling, or music therapy."),
+        ("🏃", "Move your body", "Even light walks can help balance blood sugar."),
+        ("😴", "Sleep is self-care", "Aim for 7–8 hours to reset and repair."),
+    ],
+    consult=[
+        ("💡", "Primary Recommendation",
+         "Endocrinologist — expert in hormonal and metabolic disorders including diabetes."),
+        ("🩺", "Alternate Recommendation",
+         "Diabetologist or General Physician — for routine management and lifestyle guidance."),
+    ],
+    card={
+        'icon': "🩸",
+        'about': "A long-term condition that disrupts how your body regulates blood sugar and insulin.",
+        'causes': "Insulin resistance, unhealthy diet, genetic factors",
+        'risks': "Vision loss, nerve damage, kidney dysfunction",
+        'precautions': "Balanced eating, regular exercise, blood sugar tracking",
+        'consultation': "Endocrinologist",
+    },
+)
+
+HYPERTENSION = DiseaseSpec(
+    key='hypertension',
+    page="Hypertension",
+    icon=":material/thermostat:",
+    title="💢 Hypertension Risk Prediction",
+    requires=(
+        "**It Requires:**",
+        "🩺 Systolic & Diastolic Blood Pressure, 💓 Heart Rate, ⚖️ Body Mass Index (BMI),",
+        "🚬 Lifestyle Factors (Smoking & Activity), 📁 Medical History",
+        "These help evaluate your cardiovascular strain and overall blood pressure trends.",
+    ),
+    intro="Fill out your health information below:",
+    fields=[
+        constant("Index", CONSTANT_COLUMNS['hypertension']['Unnamed: 0']),
+        number("🎂 Age", "Age", 10, 100, 25),
+        select("🧑 Gender", "Gender", None, 1, side=1, encoding=SEX_MAP),
+        select("📁 Medical History (1=Yes)", "History", [0, 1], 0, side=1),
+        select("🚬 Smoking", "Smoking", [0, 1], 0, side=1),
+        number("⚖️ BMI", "BMI", 10.0, 50.0, 21.5),
+        select("🏃 Physically Active", "Active", [0, 1], 1, side=1),
+        number("🔺 Systolic BP", "SysBP", 80, 200, 115),
+        number("🔻 Diastolic BP", "DiaBP", 50, 150, 75),
+        number("💓 Heart Rate", "HeartRate", 50, 200, 72),
+    ],
+    tips_icon="🍏",
+    tips=[
+        ("🍌", "Eat potassium-rich foods", "Bananas, greens, and lentils support healthy pressure."),
+        ("🏃", "Stay active", "Aim for 30 minutes of walking or light cardio daily."),
+        ("🧘", "Manage stress gently", "Try mindful breathing, music, or nature time."),
+        ("💧", "Stay hydrated", "Balanced fluids help regulate pressure and circulation."),
+        ("🩺", "Monitor regularly", "Know your numbers and get routine checkups."),
+    ],
+    consult=[
+        ("💡", "Primary Recommendation",
+         "Cardiologist — for advanced evaluation and blood pressure management."),
+        ("🩺", "Alternate Recommendation",
+         "Internal Medicine Specialist or General Physician — for ongoing monitoring and medication adjustments."),
+    ],
+    card={
+        'icon': "💢",
+        'about': "A silent condition where blood pressure stays high, placing strain on your cardiovascular system.",
+        'causes': "High sodium diet, obesity, chronic stress",
+        'risks': "Stroke, aneurysms, heart attack",
+        'precautions': "Low-salt meals, stress relief, routine BP checks",
+        'consultation': "Cardiologist / General Practitioner",
+    },
+)
+
+HEART = DiseaseSpec(
+    key='heart',
+    page="Heart Disease",
+    icon=":material/cardiology:",
+    title="❤️ Heart Disease Prediction",
+    requires=(
+        "**It Requires:**",
+        "🧪 ECG or EKG, 🩸 Cholesterol & Blood Pressure readings, 🧬 Family History, 🍬 Fasting Blood Sugar,",
+        "🏃 Stress Test & Physical Activity Assessment",
+        "These help evaluate your cardiac function, rhythm patterns, and risk profile.",
+    ),
+    intro="Fill out the fields below:",
+    fields=[
+        number("🎂 Age", "Age", 10, 100, 30),
+        select("🧑 Sex", "Sex", None, 1, side=1, encoding=SEX_MAP),
+        select("💥 Chest Pain Type", "CP", None, CP_MAP["Typical Angina"], encoding=CP_MAP),
+        number("🔴 Resting BP", "BP", 80, 200, 120),
+        number("🥩 Cholesterol", "Chol", 100, 400, 180, side=1),
+        select("🍬 Fasting Blood Sugar > 120", "FBS", [0, 1], 0, side=1),
+        select("📉 Resting ECG", "ECG", None, ECG_MAP["Normal"], encoding=ECG_MAP),
+        number("🏃 Max Heart Rate", "MaxHR", 70, 220, 160, side=1),
+        select("🏋️ Exercise Induced Angina", "Angina", None, 0, encoding=ANGINA_MAP),
+        number("📉 Oldpeak", "Oldpeak", 0.0, 6.0, 0.0, side=1),
+        select("📈 ST Slope", "Slope", None, SLOPE_MAP["Flat"], encoding=SLOPE_MAP),
+    ],
+    tips_icon="🍏",
+    tips=[
+        ("🥑", "Eat potassium-rich foods", "Bananas, greens, and lentils support healthy pressure."),
+        ("🏃‍♀️", "Stay active", "Aim for 30 minutes of walking or light cardio daily."),
+        ("🧘‍♂️", "Manage stress gently", "Try mindful breathing, music, or nature time."),
+        ("💧", "Stay hydrated", "Balanced fluids help regulate pressure and circulation."),
+    ],
+    consult=[
+        ("💡", "Primary",
+         "Cardiologist — specializes in heart conditions and can provide targeted treatment."),
+        ("🩺", "Alternate",
+         "General Physician — for initial screening and referral to a specialist if needed."),
+    ],
+    card={
+        'icon': "❤️",
+        'about': "A broad range of heart-related issues that interfere with normal cardiac function.",
+        'causes': "Smoking, elevated cholesterol, sedentary habits",
+        'risks': "Arrhythmia, cardiac arrest, congestive heart failure",
+        'precautions': "Heart-healthy diet, regular movement, quit smoking",
+        'consultation': "Cardiologist",
+    },
+)
+
+# In sidebar order
+SPECS = {spec.key: spec for spec in (DIABETES, HYPERTENSION, HEART)}
@@ -0,0 +1,254 @@
+"""Train the three disease models from ``data/*.csv``.
+
+Scriptable replacement for the ``train_*_model.ipynb`` notebooks.  It uses
+the same preprocessing, split and XGBoost settings, so a retrained model is
+a drop-in replacement for the one the pages already use:
+
+* diabetes: every column except ``Outcome``
+* heart: ``LabelEncoder`` codes (sorted category order) for the text columns,
+  as recorded in ``diagnosis.features.CATEGORICAL``
+* hypertension: every column except ``Hypertension_Tests``, including the
+  unnamed index column the notebook trained on
+
+The diseases train in parallel worker processes.  Each parsed dataset is
+cached under ``.cache/datasets`` as ``.npy`` files named by the CSV's
+content hash, so a refresh only re-parses the files that changed.  A model
+whose data hash and hyperparameters match the ones recorded in its sidecar
+is skipped.  The model, its ``.meta.json`` sidecar (with the training key
+and holdout metrics) and the compiled ``.npz`` export are each replaced
+atomically.
+
+    python -m diagnosis.train                 # retrain what changed
+    python -m diagnosis.train heart --force
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from diagnosis.features import CATEGORICAL, dataset_path
+from diagnosis.registry import COMPILED_FILES, MODEL_DIR, NATIVE_FILES, _sha256, metadata_path
+
+CACHE_DIR = os.environ.get(
+    'TRAIN_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'datasets'),
+)
+
+# Bump when the CSV -> matrix step changes so old cache entries are ignored
+PREPROCESS_VERSION = 1
+
+TARGETS = {
+    'diabetes': 'Outcome',
+    'hypertension': 'Hypertension_Tests',
+    'heart': 'HeartDisease',
+}
+
+PARAMS = {
+    'eval_metric': 'logloss',
+    'random_state': 0,
+}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def _encodings_hash(disease):
+    # The categorical codes are part of the CSV -> matrix step, so a change
+    # to them invalidates cached datasets and trained models like new data
+    return hashlib.sha256(json.dumps(CATEGORICAL.get(disease, {}), sort_keys=True).encode()).hexdigest()
+
+
+def _cache_files(disease, data_hash):
+    stem = os.path.join(
+        CACHE_DIR, f'{disease}-v{PREPROCESS_VERSION}-{data_hash[:16]}-{_encodings_hash(disease)[:8]}')
+    return stem + '.X.npy', stem + '.y.npy', stem + '.columns.json'
+
+
+def _parse(disease, path=None):
+    """Parse ``path`` (default ``data/<disease>.csv``).  Text columns get the
+    codes in ``CATEGORICAL``, the ones the pages send."""
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(path or dataset_path(disease))
+    for column, mapping in CATEGORICAL.get(disease, {}).items():
+        unknown = set(df[column].unique()) - set(mapping)
+        if unknown:
+            raise ValueError(f"{column}: unknown values {sorted(map(str, unknown))}")
+        df[column] = df[column].map(mapping)
+    target = TARGETS[disease]
+    X = df.drop(columns=target)
+    return (X.columns.tolist(), X.to_numpy(dtype=np.float32),
+            df[target].to_numpy(dtype=np.int32))
+
+
+def load_training_data(disease, data_hash=None):
+    """Return ``(columns, X, y, cached)`` for ``disease``, parsing the CSV on a cache miss."""
+    import numpy as np
+
+    data_hash = data_hash or _sha256(dataset_path(disease))
+    x_path, y_path, columns_path = _cache_files(disease, data_hash)
+    if all(os.path.exists(p) for p in (x_path, y_path, columns_path)):
+        with open(columns_path) as f:
+            columns = json.load(f)
+        return columns, np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r'), True
+
+    columns, X, y = _parse(disease)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for path, array in ((x_path, X), (y_path, y)):
+        tmp = path[:-len('.npy')] + '.tmp.npy'
+        np.save(tmp, array)
+        os.replace(tmp, path)
+    tmp = columns_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(columns, f)
+    os.replace(tmp, columns_path)
+    return columns, X, y, False
+
+
+def training_key(disease, data_hash, params):
+    from importlib.metadata import version
+
+    payload = {
+        'data_sha256': data_hash,
+        'preprocess_version': PREPROCESS_VERSION,
+        'encodings_sha256': _encodings_hash(disease),
+        'params': params,
+        'test_size': TEST_SIZE,
+        'split_seed': SPLIT_SEED,
+        'xgboost_version': version('xgboost'),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def recorded_params(model_path):
+    """Hyperparameters the current model at ``model_path`` was trained with, if known."""
+    try:
+        with open(metadata_path(model_path)) as f:
+            return json.load(f).get('training', {}).get('params')
+    except (OSError, ValueError):
+        return None
+
+
+def up_to_date(model_path, key):
+    """True if ``model_path`` was written by a run with this training ``key``."""
+    try:
+        with open(metadata_path(model_path)) as f:
+            training = json.load(f).get('training', {})
+        return training.get('key') == key and training.get('model_sha256') == _sha256(model_path)
+    except (OSError, ValueError):
+        return False
+
+
+def fit(columns, X, y, params, n_jobs=None):
+    """Fit on the notebooks' stratified 80/20 split; returns ``(model, metrics)``."""
+    import pandas as pd
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from xgboost import XGBClassifier
+
+    X = pd.DataFrame(X, columns=columns)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, stratify=y, random_state=SPLIT_SEED)
+    model = XGBClassifier(**params, n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    seconds = time.perf_counter() - start
+    proba = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'holdout_rows': int(len(y_test)),
+        'auc': float(roc_auc_score(y_test, proba)),
+        'accuracy': float(accuracy_score(y_test, proba > 0.5)),
+        'logloss': float(log_loss(y_test, proba)),
+        'fit_seconds': round(seconds, 3),
+    }
+    return model, metrics
+
+
+def write_model(disease, model, path, extra, training_data=None):
+    """Write ``model`` plus sidecar and compiled export, each replaced atomically.
+
+    The model goes to a temp file first so the sidecar can record its hash;
+    a crash between the two replaces leaves a sidecar that no longer
+    matches, and the next run retrains instead of skipping.  The sidecar's
+    ``categorical_encodings`` are ``features.CATEGORICAL``, the codes
+    ``_parse`` trains on.  ``training_data`` is passed to ``build_metadata``.
+    """
+    from diagnosis.compiled import export
+    from diagnosis.convert import _write_json, build_metadata
+
+    stem, ext = os.path.splitext(path)
+    tmp = f'{stem}.tmp{ext}'
+    model.save_model(tmp)
+    extra['training']['model_sha256'] = _sha256(tmp)
+    metadata = build_metadata(disease, model, path, training_data=training_data)
+    metadata.update(extra)
+    _write_json(metadata_path(path), metadata)
+    os.replace(tmp, path)
+    export(model).save(os.path.join(os.path.dirname(path), COMPILED_FILES[disease]))
+    return metadata
+
+
+def train_one(disease, model_dir=MODEL_DIR, params=None, force=False, n_jobs=None):
+    """Retrain one model.  Without ``params`` it keeps the hyperparameters its
+    sidecar records (e.g. from ``diagnosis.search``), else uses ``PARAMS``."""
+    start = time.perf_counter()
+    path = os.path.join(model_dir, NATIVE_FILES[disease][0])
+    params = dict(PARAMS, **(params or recorded_params(path) or {}))
+    data_hash = _sha256(dataset_path(disease))
+    key = training_key(disease, data_hash, params)
+    if not force and up_to_date(path, key):
+        return {'disease': disease, 'status': 'skipped', 'path': path,
+                'seconds': time.perf_counter() - start}
+
+    columns, X, y, cached = load_training_data(disease, data_hash)
+    model, metrics = fit(columns, X, y, params, n_jobs)
+    write_model(disease, model, path, {
+        'training': {'key': key, 'params': params, 'test_size': TEST_SIZE, 'split_seed': SPLIT_SEED,
+                     'preprocess_version': PREPROCESS_VERSION, 'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'metrics': metrics,
+    })
+    return {'disease': disease, 'status': 'trained', 'path': path, 'dataset_cached': cached,
+            'metrics': metrics, 'seconds': time.perf_counter() - start}
+
+
+def train_all(diseases, model_dir=MODEL_DIR, params=None, force=False, workers=None):
+    """Train ``diseases`` in a process pool; returns one result dict per disease."""
+    workers = workers or min(len(diseases), os.cpu_count() or 1)
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    if workers == 1:
+        return [train_one(d, model_dir, params, force, n_jobs) for d in diseases]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(train_one, d, model_dir, params, force, n_jobs) for d in diseases]
+        return [f.result() for f in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the disease models from data/*.csv.")
+    parser.add_argument('diseases', nargs='*', help="default: every model")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--force', action='store_true', help="retrain even if nothing changed")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per model, up to the CPU count)")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = train_all(args.diseases or sorted(TARGETS), args.model_dir, force=args.force,
+                        workers=args.workers)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        if r['status'] == 'skipped':
+            print(f"{r['disease']:<13} unchanged, skipped")
+            continue
+        m = r['metrics']
+        print(f"{r['disease']:<13} AUC {m['auc']:.4f}  accuracy {m['accuracy']:.3f}  "
+              f"fit {m['fit_seconds']:.2f} s  ({'cached' if r['dataset_cached'] else 'parsed'} data) "
+              f"-> {os.path.basename(r['path'])}")
+    print(f"done in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
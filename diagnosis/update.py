@@ -0,0 +1,251 @@
+"""Incremental model updates by continued boosting on newly labeled records.
+
+A full retrain costs time in proportion to all the labeled data.  Instead,
+this loads the current model from ``models/`` and parses a delta CSV of new
+records (the same columns as ``data/<disease>.csv``, target included).  It
+then fits ``--rounds`` more trees to the delta only, starting from the
+existing ensemble (XGBoost's ``xgb_model``).  The cost grows with the
+delta, not with the history.
+
+Nothing is written until the current and the updated model have been
+scored on the same unseen rows: a stratified ``--holdout`` share of the
+delta, which the new trees do not see, plus up to ``REFERENCE_ROWS`` rows
+of the holdout split ``diagnosis.train`` uses for ``data/<disease>.csv``.
+The update is rejected (exit status 1) if AUC drops by more than
+``--tolerance``.
+
+An accepted model replaces the served one through
+``diagnosis.train.write_model``, which replaces the model, its sidecar and
+its compiled export atomically.  The CSV's hash, row count and parsed
+matrix come from the current sidecar and the ``.npy`` cache of
+``diagnosis.train``, so an update never re-reads ``data/<disease>.csv``
+while those are current.  Both the replaced and the new model are
+kept in ``models/versions/`` under their versions (the first 12 hex digits
+of the file's SHA-256).  The sidecar appends a record of every update.  A
+later ``python -m diagnosis.train`` keeps the updated model until the CSV
+changes or ``--force`` is given.  Append the delta files to the CSV to fold
+them into the next full retrain.
+
+    python -m diagnosis.update heart new_cases.csv
+    python -m diagnosis.update diabetes week42.csv --rounds 20 --dry-run
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from diagnosis.registry import MODEL_DIR, MODEL_FILES, NATIVE_FILES, ModelRegistry, _sha256, metadata_path
+from diagnosis.train import (PARAMS, SPLIT_SEED, TARGETS, TEST_SIZE, _cache_files, _parse, load_training_data,
+                             recorded_params, write_model)
+
+ROUNDS = 10
+# The new trees take smaller, shallower steps than a full fit, so a few
+# hundred rows nudge the ensemble instead of overfitting it
+UPDATE_PARAMS = {'learning_rate': 0.05, 'max_depth': 3}
+HOLDOUT = 0.2
+# Rows of the full-data holdout split scored alongside the delta's own
+# holdout; a fixed cap keeps validation cost independent of the history
+REFERENCE_ROWS = 2000
+VERSIONS_DIR = 'versions'
+
+
+def _split(X, y, test_size, seed):
+    from sklearn.model_selection import train_test_split
+    try:
+        return train_test_split(X, y, test_size=test_size, stratify=y, random_state=seed)
+    except ValueError:
+        # Too few rows of a class to stratify
+        return train_test_split(X, y, test_size=test_size, random_state=seed)
+
+
+def reference_holdout(disease, rows=REFERENCE_ROWS, data_hash=None):
+    """Up to ``rows`` rows of ``diagnosis.train``'s holdout split of ``data/<disease>.csv``.
+
+    With the ``data_hash`` the sidecar records and its parse still cached,
+    the CSV is neither hashed nor read.
+    """
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+
+    if data_hash and not all(os.path.exists(p) for p in _cache_files(disease, data_hash)):
+        data_hash = None
+    _, X, y, _ = load_training_data(disease, data_hash)
+    # Splitting row numbers with the same labels and seed gives train's partition
+    _, test = train_test_split(np.arange(len(y)), test_size=TEST_SIZE, stratify=y, random_state=SPLIT_SEED)
+    if len(test) > rows:
+        test = np.sort(np.random.default_rng(SPLIT_SEED).choice(test, rows, replace=False))
+    return np.asarray(X[test]), np.asarray(y[test])
+
+
+def _scores(y, proba):
+    from sklearn.metrics import log_loss, roc_auc_score
+    if len(set(y.tolist())) < 2:
+        return {'rows': int(len(y))}
+    return {'rows': int(len(y)), 'auc': float(roc_auc_score(y, proba)),
+            'logloss': float(log_loss(y, proba, labels=[0, 1]))}
+
+
+def evaluate(model, columns, slices):
+    """AUC and log loss of ``model`` on each ``(name, X, y)`` slice and on all of them together."""
+    import numpy as np
+    import pandas as pd
+
+    result, ys, probas = {}, [], []
+    for name, X, y in slices:
+        if not len(y):
+            continue
+        proba = model.predict_proba(pd.DataFrame(X, columns=columns))[:, 1]
+        result[name] = _scores(y, proba)
+        ys.append(y)
+        probas.append(proba)
+    result['all'] = _scores(np.concatenate(ys), np.concatenate(probas))
+    return result
+
+
+def continue_training(model, columns, X, y, params, rounds, n_jobs=None):
+    """A new model: ``model``'s trees plus ``rounds`` more fitted to ``X``, ``y``."""
+    import pandas as pd
+    from xgboost import XGBClassifier
+
+    if len(set(y.tolist())) < 2:
+        raise ValueError("the delta's training rows need both classes")
+    updated = XGBClassifier(**dict(params, n_estimators=rounds), n_jobs=n_jobs)
+    updated.fit(pd.DataFrame(X, columns=columns), y, xgb_model=model.get_booster())
+    return updated
+
+
+def _archive(path, version, versions_dir):
+    # Copy a model and its sidecar to versions/<stem>.<version><ext>, atomically
+    os.makedirs(versions_dir, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    target = os.path.join(versions_dir, f'{stem}.{version}{ext}')
+    for src, dst in ((path, target), (metadata_path(path), metadata_path(target))):
+        if os.path.exists(src) and not os.path.exists(dst):
+            shutil.copyfile(src, dst + '.tmp')
+            os.replace(dst + '.tmp', dst)
+    return target
+
+
+def _metadata(path):
+    try:
+        with open(metadata_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update(disease, delta_path, model_dir=MODEL_DIR, rounds=ROUNDS, holdout=HOLDOUT, tolerance=0.0,
+           learning_rate=None, dry_run=False, n_jobs=None):
+    """Continue training ``disease``'s model on ``delta_path``; returns a result dict.
+
+    ``status`` is ``accepted`` (written unless ``dry_run``) or ``rejected``.
+    """
+    start = time.perf_counter()
+    current = ModelRegistry(model_dir, files=MODEL_FILES).entry(disease)
+    columns, X, y = _parse(disease, delta_path)
+    expected = list(current.model.get_booster().feature_names or [])
+    if expected and columns != expected:
+        raise ValueError(f"{os.path.basename(delta_path)} has columns {columns}, the model expects {expected} "
+                         f"(plus the target '{TARGETS[disease]}')")
+
+    if holdout:
+        X_train, X_hold, y_train, y_hold = _split(X, y, holdout, SPLIT_SEED)
+    else:
+        X_train, y_train, X_hold, y_hold = X, y, X[:0], y[:0]
+    previous = _metadata(current.path)
+    X_ref, y_ref = reference_holdout(disease, data_hash=previous.get('training_data', {}).get('sha256'))
+    slices = [('reference', X_ref, y_ref), ('delta', X_hold, y_hold)]
+
+    params = dict(PARAMS, **(recorded_params(current.path) or {}))
+    params.update(UPDATE_PARAMS)
+    if learning_rate is not None:
+        params['learning_rate'] = learning_rate
+    fit_start = time.perf_counter()
+    model = continue_training(current.model, columns, X_train, y_train, params, rounds, n_jobs)
+    fit_seconds = time.perf_counter() - fit_start
+
+    before = evaluate(current.model, columns, slices)
+    after = evaluate(model, columns, slices)
+    accepted = after['all']['auc'] >= before['all']['auc'] - tolerance
+    result = {
+        'disease': disease,
+        'status': 'accepted' if accepted else 'rejected',
+        'delta_rows': int(len(y)),
+        'trained_rows': int(len(y_train)),
+        'rounds': rounds,
+        'trees': current.model.get_booster().num_boosted_rounds() + rounds,
+        'fit_seconds': round(fit_seconds, 3),
+        'before': before,
+        'after': after,
+        'base_version': current.version,
+        'path': None,
+        'version': None,
+    }
+    if accepted and not dry_run:
+        path = os.path.join(model_dir, NATIVE_FILES[disease][0])
+        versions_dir = os.path.join(model_dir, VERSIONS_DIR)
+        _archive(current.path, current.version, versions_dir)
+        extra = {k: previous[k] for k in ('source', 'metrics') if k in previous}
+        extra['training'] = previous.get('training', {})
+        extra['updates'] = previous.get('updates', []) + [{
+            'base_version': current.version,
+            'delta_file': os.path.basename(delta_path),
+            'delta_sha256': _sha256(delta_path),
+            'delta_rows': result['delta_rows'],
+            'trained_rows': result['trained_rows'],
+            'rounds': rounds,
+            'params': params,
+            'auc_before': before['all']['auc'],
+            'auc_after': after['all']['auc'],
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }]
+        write_model(disease, model, path, extra, previous.get('training_data'))
+        version = _sha256(path)[:12]
+        _archive(path, version, versions_dir)
+        result.update(path=path, version=version)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continue training a model on newly labeled records.")
+    parser.add_argument('disease', choices=sorted(TARGETS))
+    parser.add_argument('delta', help="CSV with the columns of data/<disease>.csv, target included")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="trees to add (default: %(default)s)")
+    parser.add_argument('--learning-rate', type=float,
+                        help=f"for the new trees (default: {UPDATE_PARAMS['learning_rate']})")
+    parser.add_argument('--holdout', type=float, default=HOLDOUT,
+                        help="share of the delta held out for validation (default: %(default)s)")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="largest AUC drop still accepted (default: %(default)s)")
+    parser.add_argument('--dry-run', action='store_true', help="validate only, write nothing")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    r = update(args.disease, args.delta, args.model_dir, args.rounds, args.holdout, args.tolerance,
+               args.learning_rate, args.dry_run)
+    if args.json:
+        print(json.dumps(r, indent=2))
+    else:
+        print(f"{r['disease']}: +{r['rounds']} trees ({r['trees']} total) on {r['trained_rows']:,} of "
+              f"{r['delta_rows']:,} delta rows in {r['fit_seconds']:.2f} s")
+        for name in ('reference', 'delta', 'all'):
+            before, after = r['before'].get(name, {}), r['after'].get(name, {})
+            if 'auc' in before:
+                print(f"  {name:<10} {before['rows']:>6,} rows  AUC {before['auc']:.4f} -> {after['auc']:.4f}  "
+                      f"logloss {before['logloss']:.4f} -> {after['logloss']:.4f}")
+        if r['status'] == 'rejected':
+            print(f"rejected: AUC regressed by more than {args.tolerance}; {r['base_version']} stays")
+        elif r['path'] is None:
+            print("accepted (dry run, nothing written)")
+        else:
+            print(f"accepted: {r['base_version']} -> {r['version']} ({os.path.basename(r['path'])})")
+    if r['status'] == 'rejected':
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
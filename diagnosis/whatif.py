@@ -0,0 +1,122 @@
+"""What-if sensitivity curves for the disease pages.
+
+Holds every input at the user's value except one (or two), sweeps that
+input over a grid and scores the whole grid with a single batched
+``predict_proba`` call.  A few hundred rows cost about as much as one
+prediction, because the per-call overhead dominates at these sizes.
+
+Grids come from ``data/*.csv``: a feature with a handful of distinct
+values (the categoricals and yes/no answers) is swept over those values,
+anything else over its 1st-99th percentile range, widened to include the
+user's value.
+"""
+import threading
+
+import streamlit as st
+
+from diagnosis.charts import BACKGROUND
+
+CURVE_POINTS = 200
+HEATMAP_POINTS = 40
+# Features with at most this many distinct values are swept over exactly those
+DISCRETE_MAX = 10
+
+_columns = {}
+_columns_lock = threading.Lock()
+
+
+def _column(disease, index):
+    # Sorted distinct values and percentiles of one page-order feature column
+    key = (disease, index)
+    info = _columns.get(key)
+    if info is None:
+        import numpy as np
+
+        from diagnosis.features import load_dataset
+
+        with _columns_lock:
+            if key not in _columns:
+                X = load_dataset(disease)
+                for i in range(X.shape[1]):
+                    _columns[(disease, i)] = (np.unique(X[:, i]), np.percentile(X[:, i], [1, 99]))
+            info = _columns[key]
+    return info
+
+
+def feature_grid(disease, index, current, points=CURVE_POINTS):
+    """Values to sweep feature ``index`` of ``disease`` over, including ``current``."""
+    import numpy as np
+
+    values, (lo, hi) = _column(disease, index)
+    if len(values) <= DISCRETE_MAX:
+        return np.union1d(values, [current]).astype(np.float32)
+    lo, hi = min(lo, current), max(hi, current)
+    return np.linspace(lo, hi, points, dtype=np.float32)
+
+
+def sensitivity(model, features, index, grid):
+    """Risk for each value of ``grid`` in position ``index``, others fixed."""
+    import numpy as np
+
+    X = np.repeat(np.asarray([features], dtype=np.float32), len(grid), axis=0)
+    X[:, index] = grid
+    return model.predict_proba(X)[:, 1]
+
+
+def sensitivity_2d(model, features, i, j, grid_i, grid_j):
+    """Risk over the ``grid_j`` x ``grid_i`` mesh of features ``i`` and ``j``."""
+    import numpy as np
+
+    X = np.repeat(np.asarray([features], dtype=np.float32), len(grid_i) * len(grid_j), axis=0)
+    X[:, i] = np.tile(grid_i, len(grid_j))
+    X[:, j] = np.repeat(grid_j, len(grid_i))
+    return model.predict_proba(X)[:, 1].reshape(len(grid_j), len(grid_i))
+
+
+_LAYOUT = dict(paper_bgcolor=BACKGROUND, plot_bgcolor=BACKGROUND, font=dict(color='white'),
+               margin=dict(l=60, r=20, t=50, b=50))
+
+
+def curve_figure(label, grid, risk, current):
+    current_risk = float(risk[abs(grid - current).argmin()])
+    mode = 'lines+markers' if len(grid) <= DISCRETE_MAX + 1 else 'lines'
+    return {
+        'data': [
+            {'type': 'scatter', 'x': grid.tolist(), 'y': risk.tolist(), 'mode': mode,
+             'name': 'Risk', 'line': {'color': '#7289da', 'width': 3}},
+            {'type': 'scatter', 'x': [float(current)], 'y': [current_risk], 'mode': 'markers',
+             'name': 'You', 'marker': {'color': 'red', 'size': 12, 'symbol': 'x'}},
+        ],
+        'layout': dict(_LAYOUT, title=f"Predicted risk as {label} changes",
+                       xaxis={'title': label}, yaxis={'title': 'Risk', 'range': [0, 1], 'tickformat': '.0%'}),
+    }
+
+
+def heatmap_figure(label_i, label_j, grid_i, grid_j, risk, current_i, current_j):
+    return {
+        'data': [
+            {'type': 'heatmap', 'x': grid_i.tolist(), 'y': grid_j.tolist(), 'z': risk.tolist(),
+             'zmin': 0, 'zmax': 1, 'colorscale': 'RdYlGn', 'reversescale': True,
+             'colorbar': {'title': 'Risk', 'tickformat': '.0%'}},
+            {'type': 'scatter', 'x': [float(current_i)], 'y': [float(current_j)], 'mode': 'markers',
+             'name': 'You', 'marker': {'color': 'white', 'size': 12, 'symbol': 'x'}},
+        ],
+        'layout': dict(_LAYOUT, title=f"Predicted risk by {label_i} and {label_j}",
+                       xaxis={'title': label_i}, yaxis={'title': label_j}),
+    }
+
+
+def show_curve(disease, model, features, labels, index):
+    grid = feature_grid(disease, index, features[index])
+    risk = sensitivity(model, features, index, grid)
+    st.plotly_chart(curve_figure(labels[index], grid, risk, features[index]), use_container_width=True)
+
+
+def show_heatmap(disease, model, features, labels, i, j):
+    grid_i = feature_grid(disease, i, features[i], HEATMAP_POINTS)
+    grid_j = feature_grid(disease, j, features[j], HEATMAP_POINTS)
+    risk = sensitivity_2d(model, features, i, j, grid_i, grid_j)
+    st.plotly_chart(
+        heatmap_figure(labels[i], labels[j], grid_i, grid_j, risk, features[i], features[j]),
+        use_container_width=True,
+    )
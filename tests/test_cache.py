@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from diagnosis import cache, drift, history, inference
+from diagnosis.cache import LRUCache
+from diagnosis.features import load_dataset
+from diagnosis.registry import MODEL_FILES, ModelRegistry
+
+
+def test_least_recently_used_entry_is_evicted():
+    lru = LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()['evictions'] == 1 and len(lru) == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    lru = LRUCache(maxsize=10, ttl=60)
+    lru.put('a', 1)
+    now[0] += 59
+    assert lru.get('a') == 1
+    now[0] += 2
+    assert lru.get('a') is None
+    assert len(lru) == 0
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+
+
+def test_prediction_key_ignores_the_input_type(monkeypatch):
+    monkeypatch.setattr(inference, 'CACHE_SIZE', 100)
+    monkeypatch.setattr(inference, '_cache', LRUCache(100))
+    monkeypatch.setattr(history, 'ENABLED', False)
+    monkeypatch.setattr(drift, 'ENABLED', False)
+    registry = ModelRegistry(files=MODEL_FILES)
+    row = load_dataset('heart')[0]
+    first = inference.predict_proba(registry, 'heart', row.astype(np.float32))
+    assert inference.predict_proba(registry, 'heart', row.astype(np.float64)) == first
+    assert inference.predict_proba(registry, 'heart', row.tolist()) == first
+    assert inference.stats()['hits'] == 2
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from diagnosis.compiled import CompiledEnsemble, compiled_path, export
+from diagnosis.features import load_dataset
+from diagnosis.registry import MODEL_FILES, ModelRegistry
+
+TOLERANCE = 1e-5
+
+registry = ModelRegistry(files=MODEL_FILES)
+DISEASES = sorted(registry.files)
+
+
+def _with_missing(X, seed=0):
+    # Knock out about a fifth of the values, so rows take the default branches
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < 0.2] = np.nan
+    return X
+
+
+@pytest.mark.parametrize('disease', DISEASES)
+def test_export_matches_xgboost(disease):
+    model = registry.get(disease)
+    compiled = export(model)
+    X = load_dataset(disease)
+    for rows in (X, _with_missing(X), np.full((3, X.shape[1]), np.nan, dtype=np.float32)):
+        expected = model.predict_proba(rows)[:, 1]
+        np.testing.assert_allclose(compiled.predict_proba(rows)[:, 1], expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('disease', DISEASES)
+def test_saved_export_matches_xgboost(disease):
+    model = registry.get(disease)
+    compiled = CompiledEnsemble.load(compiled_path(registry.path(disease)))
+    X = _with_missing(load_dataset(disease), seed=1)
+    np.testing.assert_allclose(compiled.predict_proba(X)[:, 1], model.predict_proba(X)[:, 1],
+                               rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
@@ -0,0 +1,41 @@
+import numpy as np
+
+from diagnosis import drift, metrics
+from diagnosis.features import load_dataset
+
+
+def _families(text):
+    # Metric names in the order their sample groups appear
+    names = []
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name = line.split('{')[0].split(' ')[0]
+            if not names or names[-1] != name:
+                names.append(name)
+    return names
+
+
+def test_exported_drift_metrics_are_grouped(monkeypatch):
+    m = drift.Monitor('heart', drift.build_profile('heart'))
+    m.update_many(load_dataset('heart'))
+    monkeypatch.setattr(drift, '_monitors', {'heart': m})
+    monkeypatch.setattr(drift, '_reports', {'heart': m.report()})
+    families = _families(metrics.export_text())
+    assert len(families) == len(set(families))
+    assert 'diagnosis_drift_psi' in families and 'diagnosis_drift_ks' in families
+
+
+def test_batch_merge_matches_one_row_at_a_time():
+    X = load_dataset('heart')
+    profile = drift.build_profile('heart')
+    single, batched = drift.Monitor('heart', profile), drift.Monitor('heart', profile)
+    for row in X:
+        single.update(row)
+    for start in range(0, len(X), 100):
+        batched.update_many(X[start:start + 100])
+    assert batched.n == single.n == len(X)
+    assert batched.counts == single.counts
+    np.testing.assert_allclose(batched.mean, single.mean, rtol=1e-12)
+    np.testing.assert_allclose(batched.m2, single.m2, rtol=1e-9)
+    # Both sampled the same row numbers from the same seed
+    assert batched.reservoir == single.reservoir
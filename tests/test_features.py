@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from diagnosis.features import (CATEGORICAL, CONSTANT_COLUMNS, FEATURE_COLUMNS, dataset_path, encode_frame,
+                                input_columns, load_dataset)
+from diagnosis.registry import MODEL_FILES, ModelRegistry, metadata_path
+from diagnosis.specs import SPECS
+
+registry = ModelRegistry(files=MODEL_FILES)
+
+
+@pytest.mark.parametrize('disease', sorted(FEATURE_COLUMNS))
+def test_feature_columns_are_the_model_inputs(disease):
+    assert registry.get(disease).get_booster().feature_names == FEATURE_COLUMNS[disease]
+
+
+@pytest.mark.parametrize('disease', sorted(SPECS))
+def test_spec_matches_model(disease):
+    SPECS[disease].encode.check(registry.get(disease))
+
+
+def test_constant_columns_are_optional():
+    df = pd.read_csv(dataset_path('hypertension'), nrows=50)
+    full = encode_frame('hypertension', df)
+    assert (full[:, 0] == 0).all()
+    assert (encode_frame('hypertension', df[input_columns('hypertension')]) == full).all()
+
+
+def _label_encoder_codes(disease):
+    # What the training notebook did: sklearn's LabelEncoder on each text column
+    from sklearn.preprocessing import LabelEncoder
+
+    df = pd.read_csv(dataset_path(disease))
+    return {column: {value: i for i, value in enumerate(LabelEncoder().fit(df[column]).classes_.tolist())}
+            for column in CATEGORICAL.get(disease, {})}
+
+
+@pytest.mark.parametrize('disease', sorted(FEATURE_COLUMNS))
+def test_encodings_are_the_training_encodings(disease):
+    assert CATEGORICAL.get(disease, {}) == _label_encoder_codes(disease)
+
+
+@pytest.mark.parametrize('disease', sorted(FEATURE_COLUMNS))
+def test_sidecar_records_the_training_encodings(disease):
+    with open(metadata_path(registry.path(disease))) as f:
+        recorded = json.load(f)['categorical_encodings']
+    assert recorded == _label_encoder_codes(disease)
+
+
+@pytest.mark.parametrize('disease', sorted(FEATURE_COLUMNS))
+def test_page_encoding_scores_like_training(disease):
+    from sklearn.metrics import roc_auc_score
+
+    from diagnosis.train import _parse
+
+    model = registry.get(disease)
+    _, X_train, y = _parse(disease)
+    X = load_dataset(disease)
+    keep = [i for i, c in enumerate(FEATURE_COLUMNS[disease]) if c not in CONSTANT_COLUMNS.get(disease, {})]
+    np.testing.assert_array_equal(X[:, keep], X_train[:, keep])
+    assert roc_auc_score(y, model.predict_proba(X)[:, 1]) >= 0.95
@@ -0,0 +1,46 @@
+from diagnosis import history
+
+
+def test_risk_bands_split_where_predict_does(tmp_path):
+    store = history.HistoryStore(str(tmp_path / 'history.sqlite3'))
+    for p in (0.0, 0.3, 0.31, 0.5, 0.51, 1.0):
+        store.record('heart', [1.0, 2.0], p, 'v1')
+    store.flush()
+    bands = {band: sorted(row['probability'] for row in store.query(band=band)) for band in history.RISK_BANDS}
+    assert bands == {'low': [0.0, 0.3], 'medium': [0.31, 0.5], 'high': [0.51, 1.0]}
+    assert store.count(band='high') == sum(row['prediction'] for row in store.query())
+
+
+def test_store_touches_no_disk_until_the_writer_runs(tmp_path):
+    path = tmp_path / 'new' / 'history.sqlite3'
+    store = history.HistoryStore(str(path))
+    assert not path.parent.exists()
+    store.record('heart', [1.0, 2.0], 0.7, 'v1')
+    store.flush()
+    assert store.count() == 1
+
+
+def test_record_flush_query_round_trip(tmp_path):
+    import io
+
+    import numpy as np
+
+    store = history.HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.record('heart', (40.0, 1.0), 0.8, 'v1', 'page')
+    store.record_many('diabetes', np.array([[1.0, 2.0], [3.0, 4.0]]), np.array([0.1, 0.6]), 'v2')
+    store.flush()
+
+    assert store.count() == 3 and store.count(disease='diabetes') == 2
+    [heart] = store.query(disease='heart')
+    assert heart['features'] == [40.0, 1.0]
+    assert (heart['probability'], heart['prediction'], heart['model_version'], heart['source']) == \
+        (0.8, 1, 'v1', 'page')
+    diabetes = store.query(disease='diabetes')
+    assert [row['features'] for row in diabetes] == [[3.0, 4.0], [1.0, 2.0]]  # newest first
+    assert {row['source'] for row in diabetes} == {'service'}
+    assert store.count(since=heart['ts'] + 3600) == 0
+
+    out = io.StringIO()
+    assert store.export_csv(out) == 3
+    assert out.getvalue().count('\n') == 4
+    assert store.stats()['written'] == 3
@@ -0,0 +1,41 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from diagnosis import prefork
+
+
+def _idle_worker(sock, beat, window, max_batch):
+    while True:
+        beat()
+        time.sleep(0.1)
+
+
+def test_idle_admin_client_does_not_stall_the_supervisor(monkeypatch):
+    monkeypatch.setattr(prefork, '_run_service', _idle_worker)
+    supervisor = prefork.Supervisor('service', 1, '127.0.0.1', 0, 0)
+    worker = supervisor.workers[0]
+    result = {}
+
+    def drive():
+        try:
+            deadline = time.time() + 10
+            while worker.state != 'ready' and time.time() < deadline:
+                time.sleep(0.05)
+            # Connect to the admin port and send nothing, then kill the worker
+            idle = socket.create_connection(supervisor.admin.server_address)
+            time.sleep(0.2)
+            os.kill(worker.pid, signal.SIGKILL)
+            while worker.restarts == 0 and time.time() < deadline:
+                time.sleep(0.05)
+            result['last_exit'] = worker.last_exit
+            idle.close()
+        finally:
+            supervisor.stopping = True
+
+    # run() installs signal handlers, so it has to stay on the main thread
+    threading.Thread(target=drive, daemon=True).start()
+    supervisor.run()
+    assert result['last_exit'] == f'signal {signal.SIGKILL}'
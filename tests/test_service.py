@@ -0,0 +1,47 @@
+import asyncio
+import json
+from http.client import HTTPConnection
+
+import numpy as np
+
+from diagnosis import drift, history
+from diagnosis.features import load_dataset
+from diagnosis.registry import MODEL_FILES, ModelRegistry
+from diagnosis.service import ScoringService
+
+
+def _post(port, path, payload):
+    conn = HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_predict_batch_over_http(monkeypatch):
+    monkeypatch.setattr(history, 'ENABLED', False)
+    monkeypatch.setattr(drift, 'ENABLED', False)
+    registry = ModelRegistry(files=MODEL_FILES)
+    service = ScoringService(registry)
+    rows = load_dataset('heart')[:20].tolist()
+
+    async def run():
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        loop = asyncio.get_running_loop()
+        async with server:
+            batch = await loop.run_in_executor(None, _post, port, '/predict_batch/heart', {'rows': rows})
+            single = await loop.run_in_executor(None, _post, port, '/predict/heart', {'features': rows[0]})
+            bad = await loop.run_in_executor(None, _post, port, '/predict_batch/heart', {'rows': [[1.0]]})
+        return batch, single, bad
+
+    (status, batch), (_, single), (bad_status, _) = asyncio.run(run())
+    assert status == 200
+    expected = registry.get('heart').predict_proba(np.array(rows, dtype=np.float32))[:, 1]
+    np.testing.assert_allclose(batch['probabilities'], expected, rtol=1e-6)
+    assert batch['predictions'] == (expected > 0.5).astype(int).tolist()
+    assert batch['model_version'] == registry.entry('heart').version
+    assert single['probability'] == batch['probabilities'][0]
+    assert bad_status == 400
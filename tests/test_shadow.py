@@ -0,0 +1,65 @@
+import json
+
+from diagnosis import metrics, shadow
+
+
+def _snapshot(n=300, agree=300, delta=0.001, primary_seconds=(), candidate_seconds=(), errors=0):
+    return {
+        'time': 0, 'pid': 1, 'submitted': n, 'shed': {},
+        'comparisons': [{
+            'disease': 'heart', 'candidate': 'heart_model.npz', 'version': 'b', 'primary_version': 'a',
+            'n': n, 'agree': agree, 'delta_sum': delta * n, 'abs_delta_sum': delta * n,
+            'max_abs_delta': delta if n else 0.0, 'errors': errors, 'deltas': [delta] * n,
+            'primary_seconds': list(primary_seconds), 'candidate_seconds': list(candidate_seconds),
+        }],
+    }
+
+
+def test_report_without_latencies(tmp_path, capsys):
+    snapshot = _snapshot()
+    [row] = shadow.summarize([snapshot])
+    assert row['speedup'] is None and row['primary_p50_us'] is None and row['candidate_p50_us'] is None
+    assert (row['verdict'], row['reason']) == ('reject', "agrees, but no latency measured")
+
+    path = tmp_path / 'stats.json'
+    path.write_text(json.dumps(snapshot))
+    shadow.main([str(path)])
+    line = capsys.readouterr().out.splitlines()[-1]
+    # primary us, candidate us and speedup are blank
+    assert line.split()[6:10] == ['-', '-', '-', 'reject']
+
+
+def test_exported_shadow_metrics_are_grouped(monkeypatch):
+    from test_drift import _families
+
+    scorer = shadow.ShadowScorer({'heart': []}, path='')
+    for name in ('a.ubj', 'b.ubj'):
+        comparison = scorer.comparisons['heart', name] = shadow.Comparison('heart', name)
+        comparison.update([0.2, 0.7], [0.3, 0.6], 1e-4, 1e-4)
+    monkeypatch.setattr(shadow, '_scorer', scorer)
+    families = _families(metrics.export_text())
+    assert len(families) == len(set(families))
+    assert 'diagnosis_shadow_agreement' in families
+
+
+def test_verdicts():
+    fast, slow = [1e-4] * 10, [2e-4] * 10
+
+    def verdict(**kwargs):
+        [row] = shadow.summarize([_snapshot(**kwargs)])
+        return row['verdict'], row['reason'].split(' ')[0]
+
+    assert verdict(primary_seconds=slow, candidate_seconds=fast) == ('promote', 'agrees,')
+    assert verdict(n=50, agree=50, primary_seconds=slow, candidate_seconds=fast) == ('wait', '50')
+    assert verdict(agree=250, primary_seconds=slow, candidate_seconds=fast) == ('reject', 'agreement')
+    assert verdict(delta=0.2, primary_seconds=slow, candidate_seconds=fast) == ('reject', 'p99')
+    # Agrees, but no faster than the primary
+    assert verdict(primary_seconds=fast, candidate_seconds=fast) == ('reject', 'agrees,')
+    assert verdict(n=0, agree=0, errors=3) == ('reject', 'failed')
+
+
+def test_snapshots_are_merged():
+    half = _snapshot(n=150, agree=150, primary_seconds=[2e-4] * 5, candidate_seconds=[1e-4] * 5)
+    [row] = shadow.summarize([half, half])
+    assert row['n'] == 300 and row['agreement'] == 1.0
+    assert row['verdict'] == 'promote' and round(row['speedup'], 6) == 2.0
@@ -0,0 +1,25 @@
+import json
+
+from sklearn.metrics import roc_auc_score
+
+from diagnosis import train
+from diagnosis.features import load_dataset
+from diagnosis.registry import metadata_path
+
+from test_features import _label_encoder_codes
+
+
+def test_retrained_sidecar_records_the_training_encodings(tmp_path, monkeypatch):
+    monkeypatch.setattr(train, 'CACHE_DIR', str(tmp_path / 'datasets'))
+    result = train.train_one('heart', model_dir=str(tmp_path), force=True, n_jobs=1)
+    with open(metadata_path(result['path'])) as f:
+        metadata = json.load(f)
+    assert metadata['categorical_encodings'] == _label_encoder_codes('heart')
+
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(result['path'])
+    _, _, y = train._parse('heart')
+    assert roc_auc_score(y, model.predict_proba(load_dataset('heart'))[:, 1]) >= 0.95
+    assert train.train_one('heart', model_dir=str(tmp_path), n_jobs=1)['status'] == 'skipped'
@@ -0,0 +1,39 @@
+import builtins
+import json
+import os
+import shutil
+
+from diagnosis import train, update
+from diagnosis.features import dataset_path
+from diagnosis.registry import MODEL_DIR, NATIVE_FILES, metadata_path
+
+
+def test_update_takes_the_training_data_from_the_sidecar_and_cache(tmp_path, monkeypatch):
+    shipped = os.path.join(MODEL_DIR, NATIVE_FILES['heart'][0])
+    model = str(tmp_path / NATIVE_FILES['heart'][0])
+    shutil.copyfile(shipped, model)
+    shutil.copyfile(metadata_path(shipped), metadata_path(model))
+    monkeypatch.setattr(train, 'CACHE_DIR', str(tmp_path / 'datasets'))
+    train.load_training_data('heart')
+    delta = tmp_path / 'delta.csv'
+    with open(dataset_path('heart')) as f:
+        delta.write_text(''.join(f.readlines()[:201]))
+
+    opened = []
+    real_open = builtins.open
+
+    def spy(file, *args, **kwargs):
+        opened.append(str(file))
+        return real_open(file, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, 'open', spy)
+    result = update.update('heart', str(delta), model_dir=str(tmp_path), rounds=2, tolerance=1.0)
+    monkeypatch.undo()
+
+    assert result['status'] == 'accepted'
+    assert dataset_path('heart') not in opened
+    with open(metadata_path(model)) as f:
+        metadata = json.load(f)
+    with open(metadata_path(shipped)) as f:
+        assert metadata['training_data'] == json.load(f)['training_data']
+    assert len(metadata['updates']) == 1